@@ -3,17 +3,18 @@
 import sys
 import os
 from pathlib import Path
-import toml
 import pandas as pd
 import logging
 import altair as alt
 
 import streamlit as st
 
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.engine.url import make_url
 
-from utils.service.financial_service import FinancialService
+from utils.config_loader import ConfigLoader
+from utils.service.financial_service import FinancialService, FinancialSummaryDTO
 import utils.service.unitofwork as uow
 
 # 環境対応型パス設定（Streamlitベストプラクティス）
@@ -34,41 +35,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# streamlitの設定読み込み
-def load_config():
-    """環境に応じて設定ファイルを読み込む関数
+# 設定の読み込み（プロセス内でキャッシュされ、config.tomlの更新時のみ再読み込みされる）
+config = ConfigLoader().config
 
-    Returns:
-        dict: 設定ファイルの内容、または空のdict
-    """
-    # 環境に応じた設定ファイルパスを試行
-    config_paths = [
-        "/config/config.toml",  # Docker環境
-        "./config/config.toml",  # ローカル環境（プロジェクトルートから実行）
-        "config/config.toml",  # ローカル環境（相対パス）
-    ]
-
-    for config_path in config_paths:
-        if os.path.exists(config_path):
-            try:
-                config = toml.load(config_path)
-                logger.info("設定ファイル読み込み成功:%s", config_path)
-                return config
-            except Exception as e:
-                logger.error("設定ファイル読み込み失敗:%s", e)
-                continue
-
-    logger.warning("設定ファイルが見つかりません。デフォルト設定を使用します。")
-    return {}
-
-
-# 設定の読み込み
-config = load_config()
+# 読み取り結果のキャッシュ有効期間（秒）と、データの版を確認する間隔（秒）
+app_config = config.get("app", {})
+CACHE_TTL_SECONDS = int(app_config.get("cache_ttl_seconds", 600))
+DATA_VERSION_TTL_SECONDS = int(app_config.get("data_version_ttl_seconds", 30))
 
-# db接続
-db_url = os.environ.get("DATABASE_URL")
 
-if db_url:
+@st.cache_resource
+def get_session_factory(db_url: str) -> sessionmaker:
+    """DBエンジンとsessionmakerを、全ユーザー・全再実行で共有するリソースとして保持する。"""
     url_object = make_url(db_url)
     db_connection_info = {
         "dialect": url_object.drivername,
@@ -79,17 +57,64 @@ if db_url:
         "password": url_object.password,
     }
     engine = st.connection("sql", type="sql", **db_connection_info).engine
-else:
+    return sessionmaker(bind=engine)
+
+
+def create_financial_service() -> FinancialService:
+    """共有のsessionmakerからFinancialServiceを作成する。
+
+    UnitOfWorkはトランザクション中のセッションを保持するため、同時に実行される
+    複数の再実行で共有せず、呼び出しごとに作成する（作成のコストは小さい）。
+    """
+    return FinancialService(uow.SqlAlchemyUnitOfWork(get_session_factory(db_url)))
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL_SECONDS, show_spinner=False)
+def load_data_version() -> str:
+    """DBのデータの版を取得する。取り込みが成功すると値が変わり、下記のキャッシュが無効になる。"""
+    try:
+        return create_financial_service().get_data_version()
+    except SQLAlchemyError as e:
+        logger.error("データの版を取得できませんでした:%s", e)
+        return ""
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_company_list(data_version: str) -> list[tuple[str, str]]:
+    """セレクトボックス用の企業名とEDINETコードの一覧を、データの版ごとにキャッシュする。"""
+    return create_financial_service().get_company_selection_list()
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_financial_summary(
+    edinet_code: str, data_version: str
+) -> FinancialSummaryDTO | None:
+    """企業ごとの財務サマリーを、データの版ごとにキャッシュする。"""
+    return create_financial_service().get_financial_summary(edinet_code)
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_financial_timeseries(edinet_code: str, data_version: str) -> pd.DataFrame:
+    """企業ごとの財務項目の推移を、データの版ごとにキャッシュする。"""
+    return create_financial_service().get_financial_timeseries(edinet_code)
+
+
+# db接続
+db_url = os.environ.get("DATABASE_URL")
+
+if not db_url:
     st.error(
         "データベース接続URLが設定されていません。.envファイルを確認してください。"
     )
     st.stop()
 
+# 取り込み直後など、最新のデータをすぐに表示したい場合はキャッシュを破棄する
+if st.sidebar.button("最新のデータを再読み込み"):
+    st.cache_data.clear()
+
 # セレクトボックス用データの取得
-SessionFactory = sessionmaker(bind=engine)
-uow_instance = uow.SqlAlchemyUnitOfWork(SessionFactory)
-financial_service = FinancialService(uow_instance)
-company_list = financial_service.get_company_selection_list()
+data_version = load_data_version()
+company_list = load_company_list(data_version)
 
 # 辞書型に変換してキーに企業名とEDINETコードを設定
 company_dict = {name: code for name, code in company_list}
@@ -99,7 +124,7 @@ selected_company = st.sidebar.selectbox("Choose Company", list(company_dict.keys
 
 # サイドバーで選択した企業に対応するEDINET codeから財務データを取得
 edinet_code = company_dict[selected_company]
-financial_summary = financial_service.get_financial_summary(edinet_code)
+financial_summary = load_financial_summary(edinet_code, data_version)
 
 if financial_summary:
     # TODO チャートにいれる具体的な計算結果やロジックは後ほど実装予定
@@ -187,5 +212,29 @@ if financial_summary:
     )
 
     st.altair_chart(chart, use_container_width=True)
+
+    # 過去の期間との比較（期間×項目の表を縦持ちに変換して折れ線グラフを描画）
+    timeseries_df = load_financial_timeseries(edinet_code, data_version)
+    if len(timeseries_df) > 1:
+        trend_data = timeseries_df.rename(
+            columns={
+                "period_name": "期間",
+                "NetSales": "売上高",
+                "OperationIncome": "営業利益",
+                "OrdinaryIncome": "経常利益",
+                "Profit": "純利益",
+            }
+        ).melt(id_vars=["期間", "fiscal_year_end"], var_name="項目", value_name="金額")
+        trend_chart = (
+            alt.Chart(trend_data)
+            .mark_line(point=True)
+            .encode(
+                x=alt.X("期間", sort=None),
+                y=alt.Y("金額", scale=alt.Scale(zero=True)),
+                color=alt.Color("項目", sort=None),
+            )
+        )
+        st.subheader("過去の期間との比較(百万円)")
+        st.altair_chart(trend_chart, use_container_width=True)
 else:
     st.write("データが取得できませんでした。")
@@ -0,0 +1,142 @@
+"""
+ベンチマーク用の合成EDINET CSV（UTF-16・タブ区切り）を生成するモジュール。
+
+`download/`配下の実際のCSVをテンプレートとして読み込み、
+- 報告書・企業情報などの財務データ以外の行（jpdei_cor, jpcrp_corなど）は
+  1件目のテンプレートからそのまま引き継ぎ、
+- 財務データの行（jppfs_cor, jpigp_cor）は全テンプレートの
+  (要素ID, コンテキストID)の組み合わせを巡回して、指定した件数まで複製します。
+
+テンプレートの組み合わせを一巡するごとに要素IDと項目名に連番の接尾辞を付けるため、
+件数を増やすと財務項目の数も実際の取り込みと同じように増えます。
+数値は乱数で揺らしますが、`seed`が同じであれば同じ内容のCSVを生成します。
+
+実行方法（1万件の財務データを持つCSVを生成する場合）：
+$ PYTHONPATH=. python benchmarks/synthetic_csv.py --facts 10000 --output /tmp/synthetic.csv
+"""
+
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.decoding import read_edinet_csv
+
+DEFAULT_TEMPLATE_GLOB = os.path.join("download", "**", "*.csv")
+SYNTHETIC_EDINET_CODE = "E99999"
+
+_FINANCIAL_ELEMENT_PATTERN = "jppfs_cor:|jpigp_cor:"
+
+
+def load_templates(pattern: str = DEFAULT_TEMPLATE_GLOB) -> list[pd.DataFrame]:
+    """テンプレートとなる実際のEDINET CSVを、ファイル名順に読み込む。
+
+    Raises:
+        FileNotFoundError: パターンに一致するCSVが存在しない場合。
+    """
+    paths = sorted(glob.glob(pattern, recursive=True))
+    if not paths:
+        raise FileNotFoundError(f"テンプレートのCSVが見つかりません: {pattern}")
+    templates = []
+    for path in paths:
+        with open(path, "rb") as csv_file:
+            templates.append(read_edinet_csv(csv_file.read()))
+    return templates
+
+
+def generate_edinet_dataframe(
+    fact_count: int,
+    templates: list[pd.DataFrame],
+    seed: int = 0,
+    edinet_code: str = SYNTHETIC_EDINET_CODE,
+) -> pd.DataFrame:
+    """財務データの行を`fact_count`件持つ、EDINET CSVと同じカラムのDataFrameを生成する。
+
+    Args:
+        fact_count (int): 生成する財務データ(jppfs_cor, jpigp_cor)の行数。
+        templates (list[pd.DataFrame]): `load_templates`で読み込んだテンプレート。
+        seed (int): 数値を揺らす乱数のシード。
+        edinet_code (str): 生成するCSVの企業のEDINETコード。
+
+    Returns:
+        pd.DataFrame: 財務データ以外の行と、財務データの行を連結したDataFrame。
+    """
+    if fact_count < 0:
+        raise ValueError(f"財務データの件数が不正です: {fact_count}")
+    rng = np.random.default_rng(seed)
+
+    header_template = templates[0]
+    is_financial = header_template["要素ID"].str.contains(
+        _FINANCIAL_ELEMENT_PATTERN, na=False
+    )
+    header_rows = header_template[~is_financial].copy()
+    header_rows.loc[header_rows["要素ID"] == "jpdei_cor:EDINETCodeDEI", "値"] = (
+        edinet_code
+    )
+
+    fact_pool = pd.concat(
+        [
+            template[
+                template["要素ID"].str.contains(_FINANCIAL_ELEMENT_PATTERN, na=False)
+            ]
+            for template in templates
+        ],
+        ignore_index=True,
+    ).drop_duplicates(subset=["要素ID", "コンテキストID"], ignore_index=True)
+
+    positions = np.arange(fact_count)
+    facts = fact_pool.iloc[positions % len(fact_pool)].reset_index(drop=True)
+    # テンプレートを一巡するごとに、新しい財務項目として扱われるよう接尾辞を付ける
+    cycles = pd.Series(positions // len(fact_pool))
+    suffix = cycles.map(lambda cycle: f"Synthetic{cycle}" if cycle else "")
+    facts["要素ID"] = facts["要素ID"] + suffix
+    facts["項目名"] = facts["項目名"] + suffix.map(
+        lambda text: f"（{text}）" if text else ""
+    )
+
+    values = pd.to_numeric(facts["値"], errors="coerce")
+    is_numeric = values.notna()
+    scaled = (values[is_numeric] * rng.uniform(0.5, 1.5, is_numeric.sum())).round()
+    facts.loc[is_numeric, "値"] = scaled.astype("int64").astype(str)
+
+    return pd.concat([header_rows, facts], ignore_index=True)
+
+
+def generate_edinet_csv(
+    fact_count: int,
+    templates: list[pd.DataFrame],
+    seed: int = 0,
+    edinet_code: str = SYNTHETIC_EDINET_CODE,
+) -> bytes:
+    """`generate_edinet_dataframe`の結果を、EDINETと同じUTF-16(BOM付き)のTSVで返す。"""
+    synthetic_df = generate_edinet_dataframe(fact_count, templates, seed, edinet_code)
+    return synthetic_df.to_csv(sep="\t", index=False).encode("utf-16")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="ベンチマーク用の合成EDINET CSVを生成する"
+    )
+    parser.add_argument(
+        "--facts", type=int, required=True, help="生成する財務データの行数"
+    )
+    parser.add_argument("--output", required=True, help="出力するCSVのパス")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument(
+        "--templates",
+        default=DEFAULT_TEMPLATE_GLOB,
+        help=f"テンプレートのCSVのglobパターン (既定値: {DEFAULT_TEMPLATE_GLOB})",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    csv_bytes = generate_edinet_csv(
+        args.facts, load_templates(args.templates), seed=args.seed
+    )
+    with open(args.output, "wb") as output_file:
+        output_file.write(csv_bytes)
+    print(f"{args.facts} facts written to {args.output} ({len(csv_bytes)} bytes).")
@@ -4,30 +4,92 @@
 このスクリプトは以下を順次実行します：
 1. 実行時にテーブルが存在しない場合、定義済みモデルに基づきDDLを実行（初期化）
 2. `download`ディレクトリ内の全CSVファイルを再帰的に検索
-3. 各CSVファイルをPandasのDataFrameに変換し、DBに永続化
+3. 取り込み台帳を参照し、同じdocID・同じ内容で取り込み済みのCSVを解析前にスキップ
+4. 各CSVファイルをPandasのDataFrameに変換し、DBに永続化（結果を取り込み台帳に記録）
+
+各CSVファイルは1回だけ読み込み、そのバイト列を内容のハッシュの計算とDataFrameへの変換の
+両方に利用します。取り込み台帳は`LEDGER_BATCH_SIZE`件ごとにまとめて参照するため、
+メモリに保持するCSVの内容もその件数分までです。
 
 主に環境構築時の初回データ導入や、API利用できない環境でのバックアップや復元に利用します。
+docIDは`download/{docID}/XBRL_TO_CSV/*.csv`のディレクトリ名から取得します。
+前回失敗したCSVは台帳に失敗として記録されるため、再実行時に再取り込みされます。
+
+`--staging-dir DIR`を指定すると、標準化済みのDataFrameをCSVの内容のハッシュをキーに
+Parquetとして保存し、次回以降は同じ内容のCSVを解析せずにParquetから読み込みます。
+
+`--workers N`を指定すると、文字コード判定・CSV読み込み・標準化・マッピングを
+N個のプロセスで並列に実行し、マッピング済みのデータを`--db-writers`個のDB接続で
+書き込みます。実行後、ファイルごとの成否とスループット（files/s, facts/s）を表示します。
+
+実行の最後に、ステージ（decode, standardize, map_models, fact_loadなど）ごとの処理時間の
+パーセンタイル・行数・SQL文の件数と、財務項目IDキャッシュのヒット率を表示します。`--metrics-log`で計測結果を1件ずつログに出力し、
+`--metrics-file`/`--metrics-port`でPrometheusのテキスト形式のファイル・HTTPエクスポーターに出力します。
 
 実行方法：
 $ docker compose exec data_processor env PYTHONPATH=/app python /scripts/bypass_import_csv.py
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/bypass_import_csv.py --workers 2
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/bypass_import_csv.py --staging-dir download/staging
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/bypass_import_csv.py --metrics-file /tmp/bypass.prom
 """
 
+import argparse
 import os
 import glob
 import logging
-import chardet
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
 
 import pandas as pd
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from utils.db_models import Base
+from utils.decoding import content_hash, read_edinet_csv
+from utils.metrics import (
+    InMemoryMetricsSink,
+    MetricsRecorder,
+    MetricsSink,
+    StageMetric,
+    add_metrics_arguments,
+    create_metrics_sink,
+    format_summary,
+)
+from utils.partitions import ensure_partitions, ensure_report_natural_key
+from utils.repositories.item_id_cache import shared_item_id_cache
 from utils.service.unitofwork import SqlAlchemyUnitOfWork
-from utils.service.financial_service import FinancialService
+from utils.service.financial_service import (
+    FinancialService,
+    IngestionSource,
+    prepare_financial_data,
+)
+from utils.staging import StagingStore
 from utils.config_loader import ConfigLoader
 
 logger = logging.getLogger(__name__)
 
+# 取り込み台帳をまとめて参照するCSVの件数
+LEDGER_BATCH_SIZE = 100
+
+
+@dataclass
+class ImportResult:
+    """CSVファイル1件分の取り込み結果"""
+
+    csv_path: str
+    succeeded: bool
+    fact_count: int = 0
+    error: str | None = None
+    skipped: bool = False
+
 
 def get_download_dir(__file__) -> str:
     # ダウンロードフォルダーのパスを取得
@@ -39,7 +101,330 @@ def get_download_dir(__file__) -> str:
     return download_dir
 
 
+def doc_id_from_path(csv_path: str) -> str:
+    """`download/{docID}/XBRL_TO_CSV/*.csv`の形式のパスからdocIDを取得する。"""
+    parent_dir = os.path.dirname(os.path.abspath(csv_path))
+    if os.path.basename(parent_dir) == "XBRL_TO_CSV":
+        parent_dir = os.path.dirname(parent_dir)
+    return os.path.basename(parent_dir)
+
+
+def build_ingestion_source(csv_path: str, raw_data: bytes) -> IngestionSource:
+    """CSVのdocIDと内容のハッシュから、取り込み台帳のキーを作成する。"""
+    return IngestionSource(
+        doc_id=doc_id_from_path(csv_path),
+        file_hash=content_hash(raw_data),
+        source_path=csv_path,
+    )
+
+
+def filter_ingested(
+    session_factory: sessionmaker, sources: list[IngestionSource]
+) -> tuple[list[IngestionSource], list[ImportResult]]:
+    """取り込み台帳を1回だけ参照し、取り込み済みの入力を除外する。
+
+    Returns:
+        取り込み対象の入力と、スキップした入力の結果の組。
+    """
+    service = FinancialService(SqlAlchemyUnitOfWork(session_factory))
+    ingested = service.find_ingested_sources(sources)
+    pending, skipped = [], []
+    for source in sources:
+        if (source.doc_id, source.file_hash) in ingested:
+            skipped.append(
+                ImportResult(source.source_path, succeeded=True, skipped=True)
+            )
+        else:
+            pending.append(source)
+    return pending, skipped
+
+
+def iter_pending_csvs(
+    session_factory: sessionmaker,
+    csv_paths: list[str],
+    skipped_results: list[ImportResult],
+    batch_size: int = LEDGER_BATCH_SIZE,
+) -> Iterator[tuple[IngestionSource, bytes]]:
+    """CSVを1回だけ読み込み、取り込み台帳にない入力とその内容を順に返す。
+
+    `batch_size`件ごとに内容のハッシュを計算して台帳を1回参照し、取り込み済みの入力は
+    結果を表示して`skipped_results`に追加します。
+
+    Yields:
+        取り込み対象の入力と、CSVファイルの内容の組。
+    """
+    for start in range(0, len(csv_paths), batch_size):
+        raw_data_by_path = {}
+        for csv_path in csv_paths[start : start + batch_size]:
+            with open(csv_path, "rb") as f:
+                raw_data_by_path[csv_path] = f.read()
+        pending, skipped = filter_ingested(
+            session_factory,
+            [
+                build_ingestion_source(csv_path, raw_data)
+                for csv_path, raw_data in raw_data_by_path.items()
+            ],
+        )
+        for skipped_result in skipped:
+            report_result(skipped_result)
+        skipped_results.extend(skipped)
+        for source in pending:
+            yield source, raw_data_by_path.pop(source.source_path)
+
+
+def prepare_financial_csv(
+    csv_path: str,
+    raw_data: bytes,
+    config: dict,
+    staging_dir: str | None = None,
+    file_hash: str | None = None,
+    metrics: MetricsRecorder | None = None,
+) -> tuple[pd.DataFrame, dict] | None:
+    """読み込み済みのCSVの内容を、標準化とDBモデルへのマッピングまで変換する。
+
+    DBに接続しない純粋な変換処理のため、ワーカープロセスで実行できます。
+    `staging_dir`と`file_hash`が指定された場合、標準化済みのParquetがあれば
+    CSVを解析せずに読み込み、なければ標準化後にParquetとして保存します。
+    各ステージ（staging_load, decode, standardize, map_models）の処理時間は`metrics`に送ります。
+
+    Returns:
+        標準化済みDataFrameとマッピング結果の組。CSVが空の場合はNone。
+    """
+    # CSVの解析はParquetがない場合のみ行う
+    return prepare_financial_data(
+        lambda: read_edinet_csv(raw_data),
+        config,
+        metrics,
+        doc_id=doc_id_from_path(csv_path),
+        staging_store=StagingStore(staging_dir) if staging_dir else None,
+        file_hash=file_hash,
+    )
+
+
+def prepare_financial_csv_with_metrics(
+    csv_path: str,
+    raw_data: bytes,
+    staging_dir: str | None = None,
+    file_hash: str | None = None,
+) -> tuple[tuple[pd.DataFrame, dict] | None, list[StageMetric]]:
+    """ワーカープロセス用に、`prepare_financial_csv`の結果と計測結果の組を返す。
+
+    設定はタスクごとに受け渡さず、ワーカープロセス内でキャッシュされた
+    `ConfigLoader`から取得します。ワーカープロセスからは親プロセスのシンクに
+    送れないため、計測結果を戻り値として返し、親プロセスでシンクに送り直します。
+    """
+    sink = InMemoryMetricsSink()
+    prepared = prepare_financial_csv(
+        csv_path,
+        raw_data,
+        ConfigLoader().config,
+        staging_dir,
+        file_hash,
+        MetricsRecorder(sink),
+    )
+    return prepared, sink.records
+
+
+def save_prepared_data(
+    session_factory: sessionmaker,
+    source: IngestionSource,
+    prepared: tuple[pd.DataFrame, dict] | None,
+    metrics_sink: MetricsSink | None = None,
+    prepare_seconds: float | None = None,
+) -> ImportResult:
+    """マッピング済みのデータと取り込み台帳を1トランザクションでDBに書き込む。
+
+    `prepare_seconds`が指定された場合は、書き込みの開始時刻からその秒数を遡った時刻を
+    取り込みの開始時刻とし、台帳の経過時間にプールでの待ち時間を含めません。
+    """
+    if prepare_seconds is not None:
+        source.started_at = time.time() - prepare_seconds
+    if prepared is None:
+        return record_failure(session_factory, source, "empty csv")
+    service = FinancialService(
+        SqlAlchemyUnitOfWork(session_factory), metrics_sink=metrics_sink
+    )
+    fact_count = service.save_mapped_financial_data(*prepared, source=source)
+    return ImportResult(source.source_path, succeeded=True, fact_count=fact_count)
+
+
+def record_failure(
+    session_factory: sessionmaker, source: IngestionSource, error: str
+) -> ImportResult:
+    """取り込みの失敗を台帳に記録する。台帳への記録自体の失敗は取り込みを止めない。"""
+    try:
+        service = FinancialService(SqlAlchemyUnitOfWork(session_factory))
+        service.record_ingestion_failure(source, error)
+    except Exception:
+        logger.exception("取り込み台帳への記録に失敗しました: %s", source.source_path)
+    return ImportResult(source.source_path, succeeded=False, error=error)
+
+
+def import_sequential(
+    sources: Iterable[tuple[IngestionSource, bytes]],
+    config: dict,
+    session_factory: sessionmaker,
+    staging_dir: str | None = None,
+    metrics_sink: MetricsSink | None = None,
+) -> list[ImportResult]:
+    """CSVファイルを1件ずつ、同一プロセス内で取り込む。"""
+    metrics = MetricsRecorder(metrics_sink)
+    results = []
+    for source, raw_data in sources:
+        source.started_at = time.time()
+        try:
+            prepared = prepare_financial_csv(
+                source.source_path,
+                raw_data,
+                config,
+                staging_dir,
+                source.file_hash,
+                metrics,
+            )
+            result = save_prepared_data(session_factory, source, prepared, metrics.sink)
+        except Exception as e:
+            logger.exception("取り込みに失敗しました: %s", source.source_path)
+            result = record_failure(session_factory, source, str(e))
+        report_result(result)
+        results.append(result)
+    return results
+
+
+def import_parallel(
+    sources: Iterable[tuple[IngestionSource, bytes]],
+    session_factory: sessionmaker,
+    workers: int,
+    db_writers: int,
+    staging_dir: str | None = None,
+    metrics_sink: MetricsSink | None = None,
+) -> list[ImportResult]:
+    """変換処理をプロセスプールで、DB書き込みを限られた数のスレッドで並列に実行する。
+
+    変換済みのデータが書き込み待ちで溜まり過ぎないよう、変換中と書き込み待ちの件数の
+    合計を`(workers + db_writers) * 2`件までに抑え、1件完了するごとに次の変換を投入します。
+    """
+    metrics_sink = metrics_sink if metrics_sink is not None else MetricsSink()
+    source_iterator = iter(sources)
+    results = []
+
+    def finish(result: ImportResult) -> None:
+        report_result(result)
+        results.append(result)
+
+    with (
+        ProcessPoolExecutor(max_workers=workers) as prepare_pool,
+        ThreadPoolExecutor(max_workers=db_writers) as writer_pool,
+    ):
+        prepare_futures: dict[Future, IngestionSource] = {}
+        write_futures: dict[Future, IngestionSource] = {}
+
+        def submit_next() -> None:
+            source, raw_data = next(source_iterator, (None, None))
+            if source is not None:
+                prepare_future = prepare_pool.submit(
+                    prepare_financial_csv_with_metrics,
+                    source.source_path,
+                    raw_data,
+                    staging_dir,
+                    source.file_hash,
+                )
+                prepare_futures[prepare_future] = source
+
+        for _ in range((workers + db_writers) * 2):
+            submit_next()
+
+        while prepare_futures or write_futures:
+            done, _ = wait(
+                [*prepare_futures, *write_futures], return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                if future in prepare_futures:
+                    source = prepare_futures.pop(future)
+                    try:
+                        prepared, stage_metrics = future.result()
+                    except Exception as e:
+                        logger.exception(
+                            "CSVの変換に失敗しました: %s", source.source_path
+                        )
+                        finish(record_failure(session_factory, source, str(e)))
+                        submit_next()
+                        continue
+                    for stage_metric in stage_metrics:
+                        metrics_sink.emit(stage_metric)
+                    # 変換済みのデータは書き込みが終わるまで保持するため、次の変換は
+                    # 書き込みの完了時に投入する
+                    write_future = writer_pool.submit(
+                        save_prepared_data,
+                        session_factory,
+                        source,
+                        prepared,
+                        metrics_sink,
+                        sum(stage_metric.seconds for stage_metric in stage_metrics),
+                    )
+                    write_futures[write_future] = source
+                else:
+                    source = write_futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.exception(
+                            "DBへの書き込みに失敗しました: %s", source.source_path
+                        )
+                        result = record_failure(session_factory, source, str(e))
+                    finish(result)
+                    submit_next()
+    return results
+
+
+def report_result(result: ImportResult) -> None:
+    """ファイルごとの取り込み結果を表示する。"""
+    if result.skipped:
+        print(f"{result.csv_path} -> Skipped. (already loaded)")
+    elif result.succeeded:
+        print(f"{result.csv_path} -> Saved. ({result.fact_count} facts)")
+    else:
+        print(f"{result.csv_path} -> Failed to Save data. ({result.error})")
+
+
+def report_summary(results: list[ImportResult], elapsed: float) -> None:
+    """取り込み全体のスループットを表示する。"""
+    succeeded = [result for result in results if result.succeeded]
+    skipped = [result for result in results if result.skipped]
+    fact_count = sum(result.fact_count for result in succeeded)
+    elapsed = max(elapsed, 1e-9)
+    print(
+        f"files: {len(succeeded)}/{len(results)} succeeded "
+        f"({len(skipped)} skipped), "
+        f"facts: {fact_count}, elapsed: {elapsed:.2f}s, "
+        f"{len(results) / elapsed:.2f} files/s, {fact_count / elapsed:.1f} facts/s"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="download配下のCSVをDBに取り込む")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="変換処理を行うプロセス数。1の場合は逐次実行 (default: 1)",
+    )
+    parser.add_argument(
+        "--db-writers",
+        type=int,
+        default=2,
+        help="並列実行時にDBへ書き込む接続数 (default: 2)",
+    )
+    parser.add_argument(
+        "--staging-dir",
+        default=None,
+        help="標準化済みのDataFrameをParquetで保存・再利用するディレクトリ",
+    )
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
     download_dir = get_download_dir(__file__)
 
     # configを読み込み、DB接続情報を取得
@@ -47,32 +432,45 @@ if __name__ == "__main__":
     config_data = config_loader.config
     # db enginとsessionを作成し、uowをインスタンス化
     bs_url = os.environ.get("DATABASE_URL")
-    engine = create_engine(bs_url)
-    # DDLを実行してテーブルを作成
+    engine = create_engine(bs_url, pool_size=max(args.db_writers, 1))
+    # DDLを実行してテーブルを作成し、会計年度のパーティションを用意する
     Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_partitions(connection)
+        ensure_report_natural_key(connection)
     session_factory = sessionmaker(bind=engine, autoflush=False)
 
     # download配下にあるフォルダーを再帰的に確認、csvファイルをpd.DataFrameに変換
     download_list = glob.glob(f"{download_dir}/**/*.csv", recursive=True)
 
-    # ループ処理内で、1件ずつデータ永続化処理を呼び出し
-    for financial_data_csv in download_list:
-        uow = SqlAlchemyUnitOfWork(session_factory)
-        # financialserviceもインスタンス化
-        service = FinancialService(uow)
-
-        with open(financial_data_csv, "rb") as f:
-            raw_data = f.read()
-            result = chardet.detect(raw_data)
-            encoding = result["encoding"]
-            logger.info("Detected encoding: %s", encoding)
-
-            company_df = pd.read_csv(
-                financial_data_csv, encoding=encoding, delimiter="\t"
-            )
-            if not company_df.empty:
-                with uow:
-                    service.save_financial_data_from_dataframe(company_df, config_data)
-                    print(" -> Saved.")
-            else:
-                print(" -> Failed to Save data.")
+    metrics_sink, summary_sink = create_metrics_sink(
+        args.metrics_log, args.metrics_file, args.metrics_port
+    )
+    started_at = time.perf_counter()
+    # 取り込み台帳を参照し、取り込み済みのCSVは解析せずにスキップする
+    skipped_results: list[ImportResult] = []
+    pending_sources = iter_pending_csvs(session_factory, download_list, skipped_results)
+    if args.workers > 1:
+        import_results = import_parallel(
+            pending_sources,
+            session_factory,
+            workers=args.workers,
+            db_writers=max(args.db_writers, 1),
+            staging_dir=args.staging_dir,
+            metrics_sink=metrics_sink,
+        )
+    else:
+        import_results = import_sequential(
+            pending_sources,
+            config_data,
+            session_factory,
+            args.staging_dir,
+            metrics_sink,
+        )
+    import_results = skipped_results + import_results
+    report_summary(import_results, time.perf_counter() - started_at)
+    # ステージごとの処理時間のパーセンタイルを表示し、計測結果を書き出す
+    print(format_summary(summary_sink.summary()))
+    # 財務項目IDキャッシュのヒット率を表示し、キャッシュの効果を確認できるようにする
+    print(shared_item_id_cache.format_stats())
+    metrics_sink.close()
@@ -1,29 +1,210 @@
+import argparse
 import os
-import sys
 import logging
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from utils.api import get_company_list, fetch_single_company_dataframe
+from utils.api import (
+    get_company_lists,
+    fetch_company_dataframes,
+    fetch_single_company_dataframe,
+)
+from utils.document_cache import create_document_cache
+from utils.metrics import add_metrics_arguments, create_metrics_sink, format_summary
+from utils.partitions import ensure_partitions, ensure_report_natural_key
+from utils.repositories.item_id_cache import shared_item_id_cache
 from utils.service.unitofwork import SqlAlchemyUnitOfWork
-from utils.service.financial_service import FinancialService
+from utils.service.financial_service import FinancialService, IngestionSource
+from utils.staging import StagingStore
 from utils.config_loader import ConfigLoader
 
 """
 データインポート用スクリプト
 $ docker compose exec data_processor env PYTHONPATH=/app python /scripts/import_financial_data.py YYYY-MM-DD
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/import_financial_data.py YYYY-MM-DD YYYY-MM-DD
+
+終了日を指定すると、期間内の各提出日の書類一覧を並行して取得し、docIDの重複を除いて
+1つのパイプラインで取り込みます。過去日の書類一覧はキャッシュされるため、
+期間が重なる再実行ではAPIに再接続しません。
+
+ダウンロードした書類は`[edinetapi]`の`CACHE_DIR`にキャッシュされ、2回目以降はHTTP通信なしで
+取り込みます。`--refresh`を指定するとキャッシュを使わずに再ダウンロードします。
+`--from-cache`を指定すると、APIに接続せずキャッシュ済みの全書類からDBを再構築します。
+
+EDINETの書類は提出ごとに新しいdocIDが振られるため、書類一覧の取得後に取り込み台帳を参照し、
+取り込みに成功済みのdocIDはダウンロード・解析の前にスキップします。
+`--from-cache`では、CSVの内容のハッシュが分かった時点で台帳を参照し、同じdocID・同じ内容で
+取り込み済みの書類をスキップします。内容が変わった書類は再取り込みし、同じ報告書の
+財務データを置き換えます。
+`--refresh`を指定した場合はスキップせずに全書類を取り込み直します。
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/import_financial_data.py YYYY-MM-DD --refresh
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/import_financial_data.py --from-cache
+
+`--staging-dir DIR`を指定すると、標準化済みのDataFrameをCSVの内容のハッシュをキーに
+Parquetとして保存し、再取り込みや`--from-cache`での再構築では標準化を行わずに読み込みます。
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/import_financial_data.py --from-cache --refresh --staging-dir download/staging
+
+実行の最後に、ステージ（download, decode, standardize, fact_loadなど）ごとの処理時間の
+パーセンタイル・行数・SQL文の件数と、財務項目IDキャッシュのヒット率を表示します。`--metrics-log`で計測結果を1件ずつログに出力し、
+`--metrics-file`/`--metrics-port`でPrometheusのテキスト形式のファイル・HTTPエクスポーターに出力します。
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/import_financial_data.py YYYY-MM-DD --metrics-file /tmp/import.prom
 """
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
+logger = logging.getLogger(__name__)
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print(
-            "実行時引数にダウンロードするファイルの提出日を入力してください。: python ./import_financial_data.py YYYY-MM-DD"
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="EDINETから財務データを取り込む")
+    parser.add_argument(
+        "start_date",
+        nargs="?",
+        help="ダウンロードするファイルの提出日、または期間の開始日 (YYYY-MM-DD)",
+    )
+    parser.add_argument(
+        "end_date",
+        nargs="?",
+        help="期間の終了日 (YYYY-MM-DD)。省略時は開始日の1日のみ",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="キャッシュを使わずに書類を再ダウンロードする",
+    )
+    parser.add_argument(
+        "--from-cache",
+        action="store_true",
+        help="APIに接続せず、キャッシュ済みの全書類を取り込む",
+    )
+    parser.add_argument(
+        "--staging-dir",
+        default=None,
+        help="標準化済みのDataFrameをParquetで保存・再利用するディレクトリ",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if args.start_date is None and not args.from_cache:
+        parser.error(
+            "実行時引数にダウンロードするファイルの提出日を入力してください。: python ./import_financial_data.py YYYY-MM-DD [YYYY-MM-DD]"
+        )
+    return args
+
+
+def save_with_ledger(
+    service: FinancialService,
+    doc_id: str,
+    company_df,
+    config_data: dict,
+    refresh: bool = False,
+    staging_store: StagingStore | None = None,
+) -> None:
+    """書類を取り込み、結果を取り込み台帳に記録する。
+
+    `refresh`がFalseの場合、同じdocID・同じ内容のハッシュで取り込みに成功済みの
+    書類はスキップします。
+    """
+    source = IngestionSource(
+        doc_id=doc_id,
+        file_hash=company_df.attrs.get("content_hash", ""),
+        source_path=f"edinet:{doc_id}",
+    )
+    if not refresh and service.find_ingested_sources([source]):
+        print(" -> Skipped. (already loaded)")
+        return
+    try:
+        service.save_financial_data_from_dataframe(
+            company_df, config_data, source, staging_store
         )
-        exit(1)
+    except Exception as e:
+        logger.exception("取り込みに失敗しました: %s", doc_id)
+        # 台帳への記録自体の失敗で、後続の書類の取り込みを止めない
+        try:
+            service.record_ingestion_failure(source, str(e))
+        except Exception:
+            logger.exception("取り込み台帳への記録に失敗しました: %s", doc_id)
+        print(" -> Failed to Save data.")
+        return
+    print(" -> Saved.")
+
+
+def import_documents(args, config_data: dict, service: FinancialService) -> None:
+    """キャッシュ、またはEDINET APIから書類を取得して取り込む。"""
+    document_cache = create_document_cache(config_data)
+    staging_store = StagingStore(args.staging_dir) if args.staging_dir else None
+    try:
+        if args.from_cache:
+            if document_cache is None:
+                print("[edinetapi]のCACHE_DIRが設定されていません。")
+                exit(1)
+            # キャッシュ済みの書類のみを対象に、HTTP通信なしで取り込む
+            for doc_id in document_cache.doc_ids():
+                print(f"Processing cached document (docID:{doc_id})")
+                single_company_df = fetch_single_company_dataframe(
+                    doc_id,
+                    config_data,
+                    archive=False,
+                    cache=document_cache,
+                    metrics=service.metrics,
+                )
+                if single_company_df is not None:
+                    save_with_ledger(
+                        service,
+                        doc_id,
+                        single_company_df,
+                        config_data,
+                        args.refresh,
+                        staging_store,
+                    )
+                else:
+                    print(" -> Failed to Read cached data.")
+            return
+
+        # 3. apiにアクセスし、期間内の企業リストを重複なしのDataFrameで取得
+        company_df = get_company_lists(
+            args.start_date, args.end_date, config_data, cache=document_cache
+        )
+        filer_names = dict(zip(company_df["docID"], company_df["filerName"]))
+        print(f"{len(company_df)} documents found.")
+        # 取り込み台帳を参照し、取り込み済みの書類はダウンロード・解析せずにスキップする
+        if not args.refresh:
+            ingested_doc_ids = service.find_ingested_doc_ids(filer_names)
+            for doc_id in ingested_doc_ids:
+                del filer_names[doc_id]
+            if ingested_doc_ids:
+                print(f"{len(ingested_doc_ids)} documents skipped. (already loaded)")
+        # 4. 書類を並行してダウンロードし、取得できたものから順にデータ永続化を実施
+        if filer_names:
+            for doc_id, single_company_df in fetch_company_dataframes(
+                filer_names.keys(),
+                config_data,
+                cache=document_cache,
+                refresh=args.refresh,
+                metrics=service.metrics,
+            ):
+                print(f"Processing {filer_names[doc_id]} (docID:{doc_id})")
+
+                if single_company_df is not None:
+                    save_with_ledger(
+                        service,
+                        doc_id,
+                        single_company_df,
+                        config_data,
+                        args.refresh,
+                        staging_store,
+                    )
+                else:
+                    print(" -> Failed to Fetch data.")
+
+    finally:
+        # 参照日時の更新をキャッシュのマニフェストに書き出す
+        if document_cache is not None:
+            document_cache.close()
+
+
+if __name__ == "__main__":
+    args = parse_args()
     # 1. configを読み込む
     config_loader = ConfigLoader()
     config_data = config_loader.config
@@ -31,24 +212,22 @@ if __name__ == "__main__":
     db_url = os.environ.get("DATABASE_URL")
     engine = create_engine(db_url)
     session_factory = sessionmaker(bind=engine)
+    # 取り込む会計年度のパーティションがなければ作成する
+    with engine.begin() as connection:
+        ensure_partitions(connection)
+        ensure_report_natural_key(connection)
 
+    metrics_sink, summary_sink = create_metrics_sink(
+        args.metrics_log, args.metrics_file, args.metrics_port
+    )
     uow = SqlAlchemyUnitOfWork(session_factory)
-    service = FinancialService(uow)
-
-    # 3. apiにアクセスし企業リストをDataFrameで取得
-    submit_date = sys.argv[1]
-    company_df = get_company_list(submit_date, config_data)
-    # 4. ループ処理でget_doc_id, fetch_single_company_dataframeを利用しつつデータ永続化を1件ずつ実施
-    if company_df is not None:
-        for index, row in company_df.iterrows():
-            doc_id = row["docID"]
-            print(f"Processing {row['filerName']} (docID:{doc_id})")
-
-            single_company_df = fetch_single_company_dataframe(doc_id, config_data)
-            if single_company_df is not None:
-                service.save_financial_data_from_dataframe(
-                    single_company_df, config_data
-                )
-                print(" -> Saved.")
-            else:
-                print(" -> Failed to Fetch data.")
+    service = FinancialService(uow, metrics_sink=metrics_sink)
+
+    try:
+        import_documents(args, config_data, service)
+    finally:
+        # ステージごとの処理時間のパーセンタイルを表示し、計測結果を書き出す
+        print(format_summary(summary_sink.summary()))
+        # 財務項目IDキャッシュのヒット率を表示し、キャッシュの効果を確認できるようにする
+        print(shared_item_id_cache.format_stats())
+        metrics_sink.close()
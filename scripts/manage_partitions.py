@@ -0,0 +1,105 @@
+import argparse
+import logging
+import os
+
+from sqlalchemy import create_engine
+
+from utils.partitions import (
+    create_year_partitions,
+    detach_year_partition,
+    ensure_report_natural_key,
+    list_partitions,
+    migrate_financial_data,
+    partition_year_range,
+)
+
+"""
+financial_dataテーブルの会計年度パーティションの管理用スクリプト
+翌年度分までのパーティションを事前に作成する（年次のジョブとして実行する想定）
+範囲を省略した場合は、create_allやインポートスクリプトと同じ範囲を作成する
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/manage_partitions.py create
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/manage_partitions.py create --from 2018 --to 2027
+
+古い年度のパーティションを切り離す（--dropを指定すると削除する）
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/manage_partitions.py detach 2019
+
+パーティション化前、またはコンテキストを文字列で保持していた頃に作成したDBのfinancial_dataを、
+会計年度パーティションとcontextsテーブルを参照する構造に移行する
+（fiscal_year・context_keyカラムがないテーブルにはCOPYで登録できないため、更新後に1度実行する）
+financial_reportsに企業・会計年度・四半期の一意制約がなければ、あわせて追加する
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/manage_partitions.py migrate
+
+パーティションの一覧を表示する
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/manage_partitions.py list
+"""
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def parse_args() -> argparse.Namespace:
+    start_year, end_year = partition_year_range()
+    parser = argparse.ArgumentParser(
+        description="financial_dataの会計年度パーティションを管理する"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = subparsers.add_parser(
+        "create", help="会計年度のパーティションを事前に作成する"
+    )
+    create_parser.add_argument(
+        "--from",
+        dest="start_year",
+        type=int,
+        default=start_year,
+        help=f"作成する最初の会計年度 (既定値: {start_year})",
+    )
+    create_parser.add_argument(
+        "--to",
+        dest="end_year",
+        type=int,
+        default=end_year,
+        help=f"作成する最後の会計年度 (既定値: {end_year})",
+    )
+
+    detach_parser = subparsers.add_parser(
+        "detach", help="会計年度のパーティションを切り離す"
+    )
+    detach_parser.add_argument("fiscal_year", type=int, help="切り離す会計年度")
+    detach_parser.add_argument(
+        "--drop", action="store_true", help="切り離したパーティションを削除する"
+    )
+
+    subparsers.add_parser(
+        "migrate",
+        help="移行前の構造のfinancial_dataを、パーティションテーブルに移行する",
+    )
+    subparsers.add_parser("list", help="パーティションの一覧を表示する")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    db_url = os.environ.get("DATABASE_URL")
+    engine = create_engine(db_url)
+
+    with engine.begin() as connection:
+        if args.command == "create":
+            created_years = create_year_partitions(
+                connection, args.start_year, args.end_year
+            )
+            print(f"{len(created_years)} partitions created: {created_years}")
+        elif args.command == "detach":
+            detached = detach_year_partition(
+                connection, args.fiscal_year, drop=args.drop
+            )
+            print(f"{detached} detached.")
+        elif args.command == "migrate":
+            migrated = migrate_financial_data(connection)
+            print(f"{migrated} rows migrated.")
+            if ensure_report_natural_key(connection):
+                print("Unique constraint added to financial_reports.")
+        else:
+            for name, bounds in list_partitions(connection):
+                print(f"{name}\t{bounds}")
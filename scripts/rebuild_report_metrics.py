@@ -0,0 +1,50 @@
+import argparse
+import logging
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from utils.service.financial_service import FinancialService
+from utils.service.unitofwork import SqlAlchemyUnitOfWork
+
+"""
+主要指標テーブル(report_metrics)の再構築用スクリプト
+登録済みの財務データから、報告書ごとの売上高・各利益と利益率を計算し直します。
+主要指標テーブルの導入前に取り込んだデータの移行や、サマリーの対象項目を変更した後に実行します。
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/rebuild_report_metrics.py
+$ docker compose exec data_processor env PYTHONPATH=/app python /scripts/rebuild_report_metrics.py --missing-only
+"""
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="報告書ごとの主要指標を再構築する")
+    parser.add_argument(
+        "--missing-only",
+        action="store_true",
+        help="主要指標が未作成の報告書のみを対象にする",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="1トランザクションで処理する報告書の件数 (既定値: 500)",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    db_url = os.environ.get("DATABASE_URL")
+    engine = create_engine(db_url)
+    session_factory = sessionmaker(bind=engine)
+
+    service = FinancialService(SqlAlchemyUnitOfWork(session_factory))
+    rebuilt_count = service.rebuild_report_metrics(
+        missing_only=args.missing_only, batch_size=args.batch_size
+    )
+    print(f"{rebuilt_count} reports rebuilt.")
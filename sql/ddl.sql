@@ -21,7 +21,10 @@ DROP SEQUENCE IF EXISTS public.financial_items_item_id_seq CASCADE;
 DROP SEQUENCE IF EXISTS public.financial_reports_report_id_seq CASCADE;
 
 -- テーブルの削除（外部キー制約を考慮した順序）
+DROP TABLE IF EXISTS public.report_metrics CASCADE;
+DROP TABLE IF EXISTS public.ingestion_ledger CASCADE;
 DROP TABLE IF EXISTS public.financial_data CASCADE;
+DROP TABLE IF EXISTS public.contexts CASCADE;
 DROP TABLE IF EXISTS public.financial_reports CASCADE;
 DROP TABLE IF EXISTS public.financial_items CASCADE;
 DROP TABLE IF EXISTS public.companies CASCADE;
@@ -188,6 +191,7 @@ CREATE TABLE public.financial_reports (
 					created_at timestamptz DEFAULT now() NULL,              -- 作成日時
 					updated_at timestamptz DEFAULT now() NULL,              -- 更新日時
 					CONSTRAINT financial_reports_pkey PRIMARY KEY (report_id),  -- 主キー制約
+					CONSTRAINT uq_financial_reports_natural_key UNIQUE NULLS NOT DISTINCT (company_id, fiscal_year, quarter_type),  -- 企業・会計年度・四半期の一意制約
 					CONSTRAINT financial_reports_company_id_fkey FOREIGN KEY (company_id) REFERENCES public.companies(company_id) ON DELETE CASCADE);  -- 外部キー制約
 
 -- テーブルコメント
@@ -207,9 +211,51 @@ CREATE INDEX idx_reports_company_fiscal ON public.financial_reports USING btree
 ALTER TABLE public.financial_reports OWNER TO "user";
 GRANT ALL ON TABLE public.financial_reports TO "user";
 
+-- コンテキストテーブル
+-- 目的: XBRLコンテキストと期間・連結種別の組み合わせを管理（financial_dataの次元テーブル）
+-- 想定レコード数: 数百〜数千件
+-- financial_dataの各行は、文字列の代わりにcontext_keyのみを保持する
+
+-- public.contexts definition
+
+-- Drop table
+
+-- DROP TABLE public.contexts;
+
+CREATE TABLE public.contexts ( 
+					context_key int4 GENERATED ALWAYS AS IDENTITY NOT NULL, -- 主キー（自動採番）
+					context_id varchar(300) NULL,                           -- XBRLコンテキストID
+					period_type varchar(50) NOT NULL,                       -- 期間・時点
+					consolidated_type varchar(10) NOT NULL,                 -- 連結・個別
+					duration_type varchar(10) NOT NULL,                     -- 期間タイプ（Duration/Instant）
+					relative_period varchar(50) NULL,                       -- 相対期間（CurrentYTD、Prior1Year等）
+					member varchar(250) NULL,                               -- メンバー（NonConsolidatedMember等）
+					created_at timestamptz DEFAULT now() NULL,              -- 作成日時
+					CONSTRAINT contexts_pkey PRIMARY KEY (context_key),     -- 主キー制約
+					CONSTRAINT uq_contexts_natural_key UNIQUE NULLS NOT DISTINCT (context_id, period_type, consolidated_type)  -- 自然キーの一意制約
+					);
+
+-- テーブルコメント
+COMMENT ON TABLE public.contexts IS 'コンテキストテーブル - XBRLコンテキストと期間・連結種別の組み合わせ';
+COMMENT ON COLUMN public.contexts.context_key IS 'コンテキストキー（主キー）';
+COMMENT ON COLUMN public.contexts.context_id IS 'XBRLコンテキストID（期間・連結種別等の情報を含む）';
+COMMENT ON COLUMN public.contexts.period_type IS '期間・時点（期間、時点）';
+COMMENT ON COLUMN public.contexts.consolidated_type IS '連結種別（連結、個別、その他）';
+COMMENT ON COLUMN public.contexts.duration_type IS '期間タイプ（Duration:期間、Instant:時点）';
+COMMENT ON COLUMN public.contexts.relative_period IS 'コンテキストIDの相対期間（CurrentYTD、Prior1Year等）';
+COMMENT ON COLUMN public.contexts.member IS 'コンテキストIDのメンバー（NonConsolidatedMember等）';
+
+-- Permissions
+
+ALTER TABLE public.contexts OWNER TO "user";
+GRANT ALL ON TABLE public.contexts TO "user";
+
 -- 財務データテーブル
 -- 目的: 実際の財務数値を管理（最も大きなテーブル）
 -- 想定レコード数: 約1,600万件/年（16,000報告書 × 1,000項目）
+-- 会計年度(fiscal_year)ごとのレンジパーティションに分割する。
+-- 古い年度はパーティションの切り離しで安価に削除でき、VACUUMの対象も年度単位に収まる。
+-- 年度のパーティションの作成・切り離しは scripts/manage_partitions.py で行う。
 
 -- public.financial_data definition
 
@@ -219,42 +265,122 @@ GRANT ALL ON TABLE public.financial_reports TO "user";
 
 CREATE TABLE public.financial_data ( 
 					data_id int8 GENERATED ALWAYS AS IDENTITY NOT NULL,     -- 主キー（自動採番、int8使用）
+					fiscal_year int2 NOT NULL,                              -- 会計年度（パーティションキー）
 					report_id int4 NOT NULL,                                -- 報告書ID（外部キー）
 					item_id int4 NOT NULL,                                  -- 項目ID（外部キー）
-					context_id varchar(300) NULL,                           -- XBRLコンテキストID
-					period_type varchar(50) NOT NULL,                       -- 期間種別（Duration/Instant）
-					consolidated_type varchar(10) NOT NULL,                 -- 連結種別（Consolidated/NonConsolidated）
-					duration_type varchar(10) NOT NULL,                     -- 期間タイプ（Year/Quarter等）
+					context_key int4 NOT NULL,                              -- コンテキストキー（外部キー）
 					value numeric(20) NULL,                                 -- 数値（最大20桁）
 					value_text text NULL,                                   -- テキスト値（数値以外の場合）
 					is_numeric bool DEFAULT true NULL,                      -- 数値フラグ
 					created_at timestamptz DEFAULT now() NULL,              -- 作成日時
 					updated_at timestamptz DEFAULT now() NULL,              -- 更新日時
-					CONSTRAINT financial_data_pkey PRIMARY KEY (data_id),   -- 主キー制約
+					CONSTRAINT financial_data_pkey PRIMARY KEY (data_id, fiscal_year),  -- 主キー制約（パーティションキーを含む）
 					CONSTRAINT financial_data_item_id_fkey FOREIGN KEY (item_id) REFERENCES public.financial_items(item_id) ON DELETE CASCADE,  -- 外部キー制約
-					CONSTRAINT financial_data_report_id_fkey FOREIGN KEY (report_id) REFERENCES public.financial_reports(report_id) ON DELETE CASCADE);  -- 外部キー制約
+					CONSTRAINT financial_data_context_key_fkey FOREIGN KEY (context_key) REFERENCES public.contexts(context_key),  -- 外部キー制約
+					CONSTRAINT financial_data_report_id_fkey FOREIGN KEY (report_id) REFERENCES public.financial_reports(report_id) ON DELETE CASCADE)  -- 外部キー制約
+					PARTITION BY RANGE (fiscal_year);
 
 -- テーブルコメント
 COMMENT ON TABLE public.financial_data IS '財務データテーブル - 実際の財務数値を管理（最も大きなテーブル）';
 COMMENT ON COLUMN public.financial_data.data_id IS 'データID（主キー）';
+COMMENT ON COLUMN public.financial_data.fiscal_year IS '会計年度（financial_reports.fiscal_yearと同じ値、パーティションキー）';
 COMMENT ON COLUMN public.financial_data.report_id IS '報告書ID（financial_reportsテーブルへの外部キー）';
 COMMENT ON COLUMN public.financial_data.item_id IS '項目ID（financial_itemsテーブルへの外部キー）';
-COMMENT ON COLUMN public.financial_data.context_id IS 'XBRLコンテキストID（期間・連結種別等の情報を含む）';
-COMMENT ON COLUMN public.financial_data.period_type IS '期間種別（Duration:期間、Instant:時点）';
-COMMENT ON COLUMN public.financial_data.consolidated_type IS '連結種別（Consolidated:連結、NonConsolidated:個別）';
-COMMENT ON COLUMN public.financial_data.duration_type IS '期間タイプ（Year:年度、Quarter:四半期等）';
+COMMENT ON COLUMN public.financial_data.context_key IS 'コンテキストキー（contextsテーブルへの外部キー）';
 COMMENT ON COLUMN public.financial_data.value IS '数値（最大20桁、NULLの場合はvalue_textを使用）';
 COMMENT ON COLUMN public.financial_data.value_text IS 'テキスト値（数値以外のデータ）';
 COMMENT ON COLUMN public.financial_data.is_numeric IS '数値フラグ（true:数値、false:テキスト）';
 
-CREATE INDEX idx_data_period_type ON public.financial_data USING btree (period_type, consolidated_type);
-CREATE INDEX idx_data_report_item ON public.financial_data USING btree (report_id, item_id);
+-- パーティションごとに作成されるインデックス
+-- idx_data_report_item: 報告書・項目での検索を、値とコンテキストキーを含めてインデックスのみで完結させる
+CREATE INDEX idx_data_context_key ON public.financial_data USING btree (context_key);
+CREATE INDEX idx_data_report_item ON public.financial_data USING btree (report_id, item_id) INCLUDE (value, context_key);
+
+-- パーティション
+-- 年度のパーティションがない行を受け止めるデフォルトパーティション
+CREATE TABLE public.financial_data_default PARTITION OF public.financial_data DEFAULT;
+
+-- 年度ごとのパーティション（financial_data_yYYYY）は、create_allで作成した場合と同じ範囲を
+-- utils/partitions.py の ensure_partitions で作成する（取り込みスクリプトの開始時にも実行される）
+-- $ docker compose exec data_processor env PYTHONPATH=/app python /scripts/manage_partitions.py create
 
 -- Permissions
 
 ALTER TABLE public.financial_data OWNER TO "user";
 GRANT ALL ON TABLE public.financial_data TO "user";
 
+-- 取り込み台帳テーブル
+-- 目的: docIDと入力ファイルのハッシュごとに取り込み結果を記録し、取り込み済みの入力をスキップする
+
+-- public.ingestion_ledger definition
+
+-- Drop table
+
+-- DROP TABLE public.ingestion_ledger;
+
+CREATE TABLE public.ingestion_ledger ( 
+					ledger_id int4 GENERATED ALWAYS AS IDENTITY NOT NULL,   -- 主キー（自動採番）
+					doc_id varchar(20) NOT NULL,                            -- EDINET書類ID
+					file_hash varchar(64) NOT NULL,                         -- 入力CSVのSHA-256ハッシュ
+					source_path varchar(500) NULL,                          -- 取り込み元（ファイルパス等）
+					status varchar(10) NOT NULL,                            -- 取り込み結果（succeeded/failed）
+					row_count int4 NULL,                                    -- 入力CSVの行数
+					fact_count int4 NULL,                                   -- 登録した財務データの件数
+					elapsed_ms int4 NULL,                                   -- 取り込みの所要時間（ミリ秒）
+					error_message text NULL,                                -- 失敗時のエラーメッセージ
+					created_at timestamptz DEFAULT now() NULL,              -- 作成日時
+					updated_at timestamptz DEFAULT now() NULL,              -- 更新日時
+					CONSTRAINT ingestion_ledger_doc_id_file_hash_key UNIQUE (doc_id, file_hash),  -- docIDとハッシュの一意制約
+					CONSTRAINT ingestion_ledger_pkey PRIMARY KEY (ledger_id)  -- 主キー制約
+					);
+
+-- テーブルコメント
+COMMENT ON TABLE public.ingestion_ledger IS '取り込み台帳テーブル - 入力ごとの取り込み結果';
+COMMENT ON COLUMN public.ingestion_ledger.doc_id IS 'EDINET書類ID';
+COMMENT ON COLUMN public.ingestion_ledger.file_hash IS '入力CSVのSHA-256ハッシュ（16進数）';
+COMMENT ON COLUMN public.ingestion_ledger.status IS '取り込み結果（succeeded:成功、failed:失敗）';
+
+CREATE INDEX ix_ingestion_ledger_doc_id ON public.ingestion_ledger USING btree (doc_id);
+
+-- Permissions
+
+ALTER TABLE public.ingestion_ledger OWNER TO "user";
+GRANT ALL ON TABLE public.ingestion_ledger TO "user";
+
+-- 主要指標テーブル
+-- 目的: 報告書ごとに解決済みの売上高・各利益と利益率を1行で保持し、サマリーを主キーで取得する
+
+-- public.report_metrics definition
+
+-- Drop table
+
+-- DROP TABLE public.report_metrics;
+
+CREATE TABLE public.report_metrics ( 
+					report_id int4 NOT NULL,                                -- 報告書ID（主キー・外部キー）
+					net_sales numeric(20) NULL,                             -- 売上高（円）
+					operating_income numeric(20) NULL,                      -- 営業利益（円）
+					ordinary_income numeric(20) NULL,                       -- 経常利益（円）
+					net_income numeric(20) NULL,                            -- 純利益（円）
+					operation_profit_rate numeric NULL,                     -- 営業利益率（%）
+					ordinary_profit_rate numeric NULL,                      -- 経常利益率（%）
+					net_profit_rate numeric NULL,                           -- 純利益率（%）
+					created_at timestamptz DEFAULT now() NULL,              -- 作成日時
+					updated_at timestamptz DEFAULT now() NULL,              -- 更新日時
+					CONSTRAINT report_metrics_pkey PRIMARY KEY (report_id),  -- 主キー制約
+					CONSTRAINT report_metrics_report_id_fkey FOREIGN KEY (report_id) REFERENCES public.financial_reports(report_id) ON DELETE CASCADE  -- 報告書への外部キー
+					);
+
+-- テーブルコメント
+COMMENT ON TABLE public.report_metrics IS '主要指標テーブル - 報告書ごとの売上高・各利益と利益率';
+COMMENT ON COLUMN public.report_metrics.net_sales IS '売上高（_SUMMARY_ITEMSの候補から解決した当期の値）';
+COMMENT ON COLUMN public.report_metrics.operation_profit_rate IS '営業利益率（%）。売上高がない場合はNULL';
+
+-- Permissions
+
+ALTER TABLE public.report_metrics OWNER TO "user";
+GRANT ALL ON TABLE public.report_metrics TO "user";
+
 -- =====================================================
 -- スキーマ権限設定
 -- =====================================================
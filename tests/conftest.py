@@ -7,10 +7,14 @@ from sqlalchemy.orm import sessionmaker, Session
 from utils.db_models import (
     Base,
     Company,
+    Financial_context,
     Financial_item,
     Financial_report,
     Financial_data,
+    Ingestion_ledger,
+    Report_metrics,
 )
+from utils.repositories.item_id_cache import shared_item_id_cache
 
 
 @pytest.fixture(scope="session")
@@ -69,11 +73,16 @@ def db_session(engine):
 
     # 既存データの全削除（データの独立性を保つため）
     # テーブルの順序は外部キー制約を考慮して削除、または　TRUNCATE CASCADEを検討
+    db.query(Ingestion_ledger).delete()
+    db.query(Report_metrics).delete()
     db.query(Financial_data).delete()
+    db.query(Financial_context).delete()
     db.query(Financial_report).delete()
     db.query(Financial_item).delete()
     db.query(Company).delete()
     db.commit()
+    # 削除したfinancial_itemsのitem_idがプロセス内のキャッシュに残らないようにする
+    shared_item_id_cache.invalidate()
 
     try:
         yield db
@@ -0,0 +1,59 @@
+"""
+ContextRepository固有の機能をテストします。
+
+```Docker内部でのテスト実行コマンド
+$ docker compose exec streamlit_app pytest ./tests/repositories/test_context_repository.py
+```
+"""
+
+from sqlalchemy import func, select
+
+from utils.db_models import Financial_context
+from utils.repositories.context_repository import ContextRepository
+
+
+def _context(context_id, consolidated_type="連結", period_type="期間"):
+    return {
+        "context_id": context_id,
+        "period_type": period_type,
+        "consolidated_type": consolidated_type,
+        "duration_type": "Duration",
+        "relative_period": None,
+        "member": None,
+    }
+
+
+def test_bulk_get_or_create_registers_once_and_returns_keys(db_session):
+    """同じ組み合わせは1行にまとめられ、再実行しても同じcontext_keyが返ること"""
+    # Arrange
+    repo = ContextRepository(db_session)
+    contexts = [
+        _context("CurrentYTDDuration"),
+        _context("CurrentYTDDuration"),
+        _context("CurrentYTDDuration", consolidated_type="個別"),
+        _context(None),
+    ]
+
+    # Act
+    first_keys = repo.bulk_get_or_create(contexts)
+    db_session.commit()
+    second_keys = repo.bulk_get_or_create(
+        [_context(None), _context("Prior1YTDDuration")]
+    )
+    db_session.commit()
+
+    # Assert
+    assert set(first_keys) == {
+        ("CurrentYTDDuration", "期間", "連結"),
+        ("CurrentYTDDuration", "期間", "個別"),
+        (None, "期間", "連結"),
+    }
+    assert len(set(first_keys.values())) == 3
+    # context_idがNULLの組み合わせも、既存の行を再利用すること
+    assert second_keys[(None, "期間", "連結")] == first_keys[(None, "期間", "連結")]
+    assert set(second_keys) == {
+        (None, "期間", "連結"),
+        ("Prior1YTDDuration", "期間", "連結"),
+    }
+    assert db_session.scalar(select(func.count()).select_from(Financial_context)) == 4
+    assert repo.bulk_get_or_create([]) == {}
@@ -0,0 +1,254 @@
+"""
+FinancialDataRepository固有の機能をテストします。
+
+```Docker内部でのテスト実行コマンド
+$ docker compose exec streamlit_app pytest ./tests/repositories/test_financial_data_repository.py
+```
+"""
+
+import pandas as pd
+import pytest
+from sqlalchemy import select
+
+from utils.db_models import (
+    Company,
+    Financial_context,
+    Financial_data,
+    Financial_item,
+    Financial_report,
+)
+from utils.repositories.financial_data_repository import FinancialDataRepository
+
+
+@pytest.fixture(scope="function")
+def report_and_item(db_session):
+    company = Company(edinet_code="E12345", company_name="Test Company")
+    report = Financial_report(
+        company=company,
+        document_type="四半期報告書",
+        fiscal_year="2023",
+        quarter_type="Q3",
+        fiscal_year_end="2023/12/31",
+    )
+    item = Financial_item(element_id="jppfs_cor:NetSales", item_name="売上高")
+    db_session.add_all([company, report, item])
+    db_session.commit()
+    return report, item
+
+
+def _contexts(context_ids_and_types: list[tuple[str, str]]) -> dict:
+    """(context_id, consolidated_type)ごとのFinancial_contextを作成する。"""
+    return {
+        (context_id, consolidated_type): Financial_context(
+            context_id=context_id,
+            period_type="期間",
+            consolidated_type=consolidated_type,
+            duration_type="Duration",
+        )
+        for context_id, consolidated_type in context_ids_and_types
+    }
+
+
+def test_bulk_load_copies_dataframe(db_session, report_and_item):
+    """bulk_loadでDataFrameの全行が登録され、NULLと空文字列が区別されること"""
+    # Arrange
+    report, item = report_and_item
+    context = Financial_context(
+        context_id="CurrentYTDDuration",
+        period_type="期間",
+        consolidated_type="連結",
+        duration_type="Duration",
+    )
+    db_session.add(context)
+    db_session.commit()
+    data_frame = pd.DataFrame(
+        {
+            "report_id": [report.report_id] * 3,
+            "fiscal_year": [2023] * 3,
+            "item_id": [item.item_id] * 3,
+            "context_key": [context.context_key] * 3,
+            "value": [13459343000.0, None, None],
+            "value_text": [None, "", "テキスト\n改行"],
+            "is_numeric": [True, False, False],
+        }
+    )
+    repo = FinancialDataRepository(db_session)
+
+    # Act
+    loaded = repo.bulk_load(data_frame)
+    db_session.commit()
+
+    # Assert
+    assert loaded == 3
+    rows = db_session.scalars(
+        select(Financial_data).order_by(Financial_data.data_id)
+    ).all()
+    assert [row.value for row in rows] == [13459343000, None, None]
+    assert [row.value_text for row in rows] == [None, "", "テキスト\n改行"]
+    assert rows[2].context.context_id == "CurrentYTDDuration"
+    assert [row.is_numeric for row in rows] == [True, False, False]
+
+
+def test_bulk_load_empty_dataframe(db_session):
+    """空のDataFrameでは何も登録されず0が返ること"""
+    repo = FinancialDataRepository(db_session)
+    assert repo.bulk_load(pd.DataFrame()) == 0
+
+
+def test_delete_by_report_id_removes_only_that_report(db_session, report_and_item):
+    """再取り込みで置き換えるため、指定した報告書の財務データのみを削除すること"""
+    # Arrange
+    report, item = report_and_item
+    other_report = Financial_report(
+        company=report.company,
+        document_type="四半期報告書",
+        fiscal_year="2023",
+        quarter_type="Q2",
+        fiscal_year_end="2023/12/31",
+    )
+    context = _contexts([("CurrentYTDDuration", "連結")])[
+        ("CurrentYTDDuration", "連結")
+    ]
+    db_session.add_all(
+        [
+            Financial_data(
+                report=target,
+                fiscal_year=2023,
+                item=item,
+                context=context,
+                value=value,
+                is_numeric=True,
+            )
+            for target, value in [(report, 1), (report, 2), (other_report, 3)]
+        ]
+    )
+    db_session.commit()
+    repo = FinancialDataRepository(db_session)
+
+    # Act
+    deleted = repo.delete_by_report_id(report.report_id, fiscal_year=2023)
+    db_session.commit()
+
+    # Assert
+    assert deleted == 2
+    assert [row.value for row in repo.get_all()] == [3]
+
+
+def test_find_facts_returns_plain_tuples(db_session, report_and_item):
+    """ORMオブジェクトではなく(element_id, value, context_id)のタプルを返すこと"""
+    # Arrange
+    report, item = report_and_item
+    contexts = _contexts(
+        [("Prior1YTDDuration", "連結"), ("CurrentYTDDuration", "連結")]
+    )
+    db_session.add_all(
+        [
+            Financial_data(
+                report_id=report.report_id,
+                fiscal_year=2023,
+                item_id=item.item_id,
+                context=contexts[(context_id, "連結")],
+                value=value,
+                is_numeric=True,
+            )
+            for context_id, value in [
+                ("Prior1YTDDuration", 90),
+                ("CurrentYTDDuration", 100),
+            ]
+        ]
+    )
+    db_session.commit()
+    repo = FinancialDataRepository(db_session)
+
+    # Act
+    facts = repo.find_facts_by_report_id_and_element_ids(
+        report.report_id, ["jppfs_cor:NetSales", "jppfs_cor:Unknown"]
+    )
+    batch_facts = repo.find_facts_by_report_ids_and_element_ids(
+        [report.report_id], ["jppfs_cor:NetSales"]
+    )
+
+    # Assert
+    assert facts == [
+        ("jppfs_cor:NetSales", 90, "Prior1YTDDuration"),
+        ("jppfs_cor:NetSales", 100, "CurrentYTDDuration"),
+    ]
+    assert batch_facts == [(report.report_id, *fact) for fact in facts]
+    # 会計年度を指定した場合は、その年度のパーティションのみを検索すること
+    assert (
+        repo.find_facts_by_report_id_and_element_ids(
+            report.report_id, ["jppfs_cor:NetSales"], fiscal_year=2023
+        )
+        == facts
+    )
+    assert (
+        repo.find_facts_by_report_id_and_element_ids(
+            report.report_id, ["jppfs_cor:NetSales"], fiscal_year=2022
+        )
+        == []
+    )
+    assert repo.find_facts_by_report_ids_and_element_ids([], ["x"]) == []
+
+
+def test_find_series_orders_by_fiscal_year_end_and_filters_consolidated_type(
+    db_session, report_and_item
+):
+    """企業の全報告書の値を期末日順に返し、連結種別で絞り込めること"""
+    # Arrange
+    report, item = report_and_item
+    older_report = Financial_report(
+        company=report.company,
+        document_type="四半期報告書",
+        fiscal_year="2023",
+        quarter_type="Q2",
+        fiscal_year_end="2023/9/30",
+    )
+    db_session.add(older_report)
+    db_session.flush()
+    contexts = _contexts(
+        [
+            ("CurrentYTDDuration", "連結"),
+            ("CurrentYTDDuration_NonConsolidatedMember", "個別"),
+        ]
+    )
+    db_session.add_all(
+        [
+            Financial_data(
+                report_id=report_id,
+                fiscal_year=2023,
+                item_id=item.item_id,
+                context=contexts[(context_id, consolidated_type)],
+                value=value,
+                is_numeric=True,
+            )
+            for report_id, context_id, consolidated_type, value in [
+                (report.report_id, "CurrentYTDDuration", "連結", 100),
+                (older_report.report_id, "CurrentYTDDuration", "連結", 50),
+                (
+                    report.report_id,
+                    "CurrentYTDDuration_NonConsolidatedMember",
+                    "個別",
+                    80,
+                ),
+            ]
+        ]
+    )
+    db_session.commit()
+    repo = FinancialDataRepository(db_session)
+
+    # Act
+    series = repo.find_series_by_edinet_code_and_element_ids(
+        "E12345", ["jppfs_cor:NetSales"], ["連結"]
+    )
+
+    # Assert
+    assert [(row[0], row[2], row[5]) for row in series] == [
+        (older_report.report_id, "Q2", 50),
+        (report.report_id, "Q3", 100),
+    ]
+    assert (
+        repo.find_series_by_edinet_code_and_element_ids(
+            "E99999", ["jppfs_cor:NetSales"]
+        )
+        == []
+    )
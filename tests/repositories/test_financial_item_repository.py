@@ -0,0 +1,81 @@
+"""
+FinancialItemRepository固有の機能をテストします。
+
+```Docker内部でのテスト実行コマンド
+$ docker compose exec streamlit_app pytest ./tests/repositories/test_financial_item_repository.py
+```
+"""
+
+import threading
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from utils.db_models import Financial_item
+from utils.repositories.financial_item_repository import FinancialItemRepository
+
+
+@pytest.fixture(scope="function")
+def item_rows():
+    return [
+        {
+            "element_id": "jppfs_cor:NetSales",
+            "item_name": "売上高",
+            "unit_type": "JPY",
+            "category": "Consolidated",
+        },
+        {
+            "element_id": "jppfs_cor:OperatingIncome",
+            "item_name": "営業利益",
+            "unit_type": "JPY",
+            "category": "Consolidated",
+        },
+    ]
+
+
+def test_bulk_get_or_create_inserts_and_returns_ids(db_session, item_rows):
+    """既存項目はそのまま、新規項目は登録され、全てのitem_idが返ること"""
+    # Arrange
+    existing = Financial_item(element_id="jppfs_cor:NetSales", item_name="売上高")
+    db_session.add(existing)
+    db_session.commit()
+    repo = FinancialItemRepository(db_session)
+
+    # Act: 重複した入力も許容されること
+    item_id_map = repo.bulk_get_or_create(item_rows + item_rows[:1])
+    db_session.commit()
+
+    # Assert
+    assert set(item_id_map) == {"jppfs_cor:NetSales", "jppfs_cor:OperatingIncome"}
+    assert item_id_map["jppfs_cor:NetSales"] == existing.item_id
+    assert len(repo.get_all()) == 2
+
+
+def test_bulk_get_or_create_empty(db_session):
+    repo = FinancialItemRepository(db_session)
+    assert repo.bulk_get_or_create([]) == {}
+
+
+def test_bulk_get_or_create_concurrent_workers(db_session, engine, item_rows):
+    """2つのトランザクションが同じ新規項目を同時に登録しても同じitem_idになること"""
+    other_session = sessionmaker(bind=engine)()
+    try:
+        first_map = FinancialItemRepository(db_session).bulk_get_or_create(item_rows)
+        results = {}
+
+        def run_second_worker():
+            # 1つ目のトランザクションのコミットを待ってからDO NOTHINGとなる
+            results["map"] = FinancialItemRepository(other_session).bulk_get_or_create(
+                item_rows
+            )
+            other_session.commit()
+
+        worker = threading.Thread(target=run_second_worker)
+        worker.start()
+        db_session.commit()
+        worker.join(timeout=10)
+
+        assert not worker.is_alive()
+        assert results["map"] == first_map
+    finally:
+        other_session.close()
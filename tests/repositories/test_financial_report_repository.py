@@ -6,7 +6,10 @@ $ docker compose exec streamlit_app pytest ./tests/repositories/test_financial_r
 ```
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+from sqlalchemy.orm import sessionmaker
 
 from utils.db_models import Financial_report, Company
 from utils.repositories.financial_report_repository import FinancialReportRepository
@@ -69,4 +72,131 @@ def test_find_latest_by_company_id(
     assert expected_result.report_id == result.report_id
 
 
+def test_find_latest_with_company_returns_latest_report_per_company(
+    db_session, company_data, latest_report_data, old_report_data
+):
+    """企業ごとに最新の報告書のみを、企業と組にして返すこと"""
+    # Arrange
+    other_company = Company(edinet_code="E67890", company_name="Other Company")
+    other_report = Financial_report(
+        company=other_company,
+        document_type="四半期報告書",
+        fiscal_year=2024,
+        quarter_type="Q2",
+        fiscal_year_end="2024/3/30",
+    )
+    repo = FinancialReportRepository(db_session)
+    db_session.add_all(
+        [company_data, latest_report_data, old_report_data, other_report]
+    )
+    db_session.commit()
+
+    # Act
+    all_latest = repo.find_latest_with_company()
+    filtered = repo.find_latest_with_company(["E67890"])
+
+    # Assert
+    assert [(c.edinet_code, r.report_id) for c, r in all_latest] == [
+        ("E12345", latest_report_data.report_id),
+        ("E67890", other_report.report_id),
+    ]
+    assert [r.report_id for _, r in filtered] == [other_report.report_id]
+    assert repo.find_latest_with_company([]) == []
+
+
+def test_upsert_by_natural_key_updates_report_with_same_natural_key(
+    db_session, company_data, latest_report_data
+):
+    """企業・会計年度・四半期が一致する報告書は、追加せずに既存の報告書を更新すること"""
+    # Arrange
+    repo = FinancialReportRepository(db_session)
+    db_session.add_all([company_data, latest_report_data])
+    db_session.commit()
+    amended = Financial_report(
+        company_id=company_data.company_id,
+        document_type="訂正四半期報告書",
+        fiscal_year="2024",
+        quarter_type="Q1",
+        fiscal_year_end="2024/3/30",
+        filing_date="2024/2/1",
+    )
+
+    # Act
+    result, created = repo.upsert_by_natural_key(amended)
+    db_session.commit()
+
+    # Assert
+    assert not created
+    assert result.report_id == latest_report_data.report_id
+    assert result.document_type == "訂正四半期報告書"
+    assert len(repo.get_all()) == 1
+
+
+def test_upsert_by_natural_key_adds_report_with_new_natural_key(
+    db_session, company_data, latest_report_data
+):
+    """四半期が異なる報告書（NULLを含む）は新規に追加すること"""
+    # Arrange
+    repo = FinancialReportRepository(db_session)
+    db_session.add_all([company_data, latest_report_data])
+    db_session.commit()
+    annual = Financial_report(
+        company_id=company_data.company_id,
+        document_type="有価証券報告書",
+        fiscal_year="2024",
+        quarter_type=None,
+        fiscal_year_end="2024/3/30",
+    )
+
+    # Act
+    result, created = repo.upsert_by_natural_key(annual)
+    db_session.commit()
+
+    # Assert
+    assert created
+    assert result.report_id is not None
+    assert result.report_id != latest_report_data.report_id
+    assert repo.find_by_natural_key(company_data.company_id, "2024", None) is result
+    assert len(repo.get_all()) == 2
+
+
+def test_upsert_by_natural_key_does_not_duplicate_concurrent_writers(
+    engine, db_session, company_data
+):
+    """2つの接続が同じ報告書を同時に登録しても、報告書は1件のみであること"""
+    # Arrange
+    db_session.add(company_data)
+    db_session.commit()
+    session_factory = sessionmaker(bind=engine)
+
+    def new_report() -> Financial_report:
+        return Financial_report(
+            company_id=company_data.company_id,
+            document_type="四半期報告書",
+            fiscal_year="2024",
+            quarter_type=None,
+            fiscal_year_end="2024/3/30",
+        )
+
+    # Act: 1つ目の接続のコミット前に、2つ目の接続から同じ報告書を登録する
+    with session_factory() as first, session_factory() as second:
+        first_report, first_created = FinancialReportRepository(
+            first
+        ).upsert_by_natural_key(new_report())
+        first_report_id = first_report.report_id
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(
+                FinancialReportRepository(second).upsert_by_natural_key, new_report()
+            )
+            first.commit()
+            second_report, second_created = future.result(timeout=10)
+            second_report_id = second_report.report_id
+        second.commit()
+
+    # Assert
+    assert first_created and not second_created
+    assert second_report_id == first_report_id
+    assert len(FinancialReportRepository(db_session).get_all()) == 1
+
+
 # TODO 異常系のテストを数種類
@@ -0,0 +1,70 @@
+"""
+IngestionLedgerRepositoryの取り込み済み判定と記録をテストします。
+
+```Docker内部でのテスト実行コマンド
+$ docker compose exec streamlit_app pytest ./tests/repositories/test_ingestion_ledger_repository.py
+```
+"""
+
+from utils.repositories.ingestion_ledger_repository import (
+    INGESTION_FAILED,
+    INGESTION_SUCCEEDED,
+    IngestionLedgerRepository,
+)
+
+
+def test_find_succeeded_ignores_failed_entries(db_session):
+    """失敗した入力は取り込み済みとみなさず、再取り込みの対象にすること"""
+    # Arrange
+    repo = IngestionLedgerRepository(db_session)
+    repo.record("S100AAA1", "hash-1", status=INGESTION_SUCCEEDED, fact_count=10)
+    repo.record("S100AAA2", "hash-2", status=INGESTION_FAILED, error_message="boom")
+    db_session.commit()
+
+    # Act / Assert
+    assert repo.find_succeeded_doc_ids(["S100AAA1", "S100AAA2", "S100AAA3"]) == {
+        "S100AAA1"
+    }
+    assert repo.find_succeeded_keys(
+        [("S100AAA1", "hash-1"), ("S100AAA1", "hash-changed"), ("S100AAA2", "hash-2")]
+    ) == {("S100AAA1", "hash-1")}
+    assert repo.find_succeeded_doc_ids([]) == set()
+
+
+def test_record_overwrites_previous_attempt(db_session):
+    """同じ入力の再取り込み時は、既存の記録を上書きすること"""
+    # Arrange
+    repo = IngestionLedgerRepository(db_session)
+    repo.record("S100AAA1", "hash-1", status=INGESTION_FAILED, error_message="boom")
+    db_session.commit()
+
+    # Act
+    repo.record(
+        "S100AAA1",
+        "hash-1",
+        status=INGESTION_SUCCEEDED,
+        fact_count=5,
+        error_message=None,
+    )
+    db_session.commit()
+
+    # Assert
+    entries = repo.get_all()
+    assert len(entries) == 1
+    assert entries[0].status == INGESTION_SUCCEEDED
+    assert entries[0].fact_count == 5
+    assert entries[0].error_message is None
+
+
+def test_version_token_changes_after_successful_ingestion(db_session):
+    """取り込みに成功した場合のみ、データの版を表すトークンが変わること"""
+    repo = IngestionLedgerRepository(db_session)
+    initial_token = repo.get_version_token()
+
+    repo.record("S100AAA1", "hash-1", status=INGESTION_FAILED, error_message="boom")
+    db_session.commit()
+    assert repo.get_version_token() == initial_token
+
+    repo.record("S100AAA2", "hash-2", status=INGESTION_SUCCEEDED, fact_count=1)
+    db_session.commit()
+    assert repo.get_version_token() != initial_token
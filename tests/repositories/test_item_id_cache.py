@@ -0,0 +1,114 @@
+"""
+ItemIdCacheと、キャッシュを利用したFinancialItemRepository/UnitOfWorkの連携をテストします。
+
+```Docker内部でのテスト実行コマンド
+$ docker compose exec streamlit_app pytest ./tests/repositories/test_item_id_cache.py
+```
+"""
+
+import threading
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from utils.db_models import Financial_item
+from utils.repositories.financial_item_repository import FinancialItemRepository
+from utils.repositories.item_id_cache import ItemIdCache
+from utils.service.unitofwork import SqlAlchemyUnitOfWork
+
+
+@pytest.fixture(scope="function")
+def new_item_row():
+    return {
+        "element_id": "jppfs_cor:OperatingIncome",
+        "item_name": "営業利益",
+        "unit_type": "JPY",
+        "category": "Consolidated",
+    }
+
+
+def test_warm_up_serves_lookups_without_db(db_session):
+    """初回利用時にテーブル全体を読み込み、以降はキャッシュから応答すること"""
+    # Arrange
+    item = Financial_item(element_id="jppfs_cor:NetSales", item_name="売上高")
+    db_session.add(item)
+    db_session.commit()
+    cache = ItemIdCache()
+    repo = FinancialItemRepository(db_session, cache)
+
+    # Act
+    item_id_map = repo.bulk_get_or_create(
+        [{"element_id": "jppfs_cor:NetSales", "item_name": "売上高"}]
+    )
+
+    # Assert
+    assert cache.is_loaded
+    assert item_id_map == {"jppfs_cor:NetSales": item.item_id}
+    assert cache.stats()["misses"] == 0
+    assert cache.format_stats() == (
+        "item_id cache: 1 items, 1 hits, 0 misses, hit rate: 100.0%"
+    )
+    assert repo.pending_item_ids == {}
+
+
+def test_uow_publishes_new_items_on_commit(engine, db_session, new_item_row):
+    """コミット成功時のみ、新規登録した項目がキャッシュに追加されること"""
+    cache = ItemIdCache()
+    uow = SqlAlchemyUnitOfWork(sessionmaker(bind=engine), item_id_cache=cache)
+
+    with uow:
+        item_id_map = uow.financial_items.bulk_get_or_create([new_item_row])
+
+    found, missing = cache.lookup([new_item_row["element_id"]])
+    assert missing == []
+    assert found == item_id_map
+    assert cache.stats()["misses"] == 1
+
+
+def test_uow_invalidates_cache_on_rollback(engine, db_session, new_item_row):
+    """ロールバック時は新規項目を反映せず、キャッシュを破棄すること"""
+    cache = ItemIdCache()
+    uow = SqlAlchemyUnitOfWork(sessionmaker(bind=engine), item_id_cache=cache)
+
+    with pytest.raises(RuntimeError), uow:
+        uow.financial_items.bulk_get_or_create([new_item_row])
+        raise RuntimeError("取り込み失敗")
+
+    assert not cache.is_loaded
+    assert cache.lookup([new_item_row["element_id"]])[1] == [new_item_row["element_id"]]
+
+
+def test_warm_up_loads_table_once_across_threads(engine, db_session):
+    """複数のスレッドから同時に呼び出しても、テーブルの読み込みは1回のみであること"""
+    # Arrange
+    db_session.add(Financial_item(element_id="jppfs_cor:NetSales", item_name="売上高"))
+    db_session.commit()
+    cache = ItemIdCache()
+    sessions = [sessionmaker(bind=engine)() for _ in range(4)]
+    executed = []
+    for session in sessions:
+        original_execute = session.execute
+
+        def counting_execute(*args, _execute=original_execute, **kwargs):
+            executed.append(args)
+            return _execute(*args, **kwargs)
+
+        session.execute = counting_execute
+    barrier = threading.Barrier(len(sessions))
+
+    def warm_up(session):
+        barrier.wait()
+        cache.warm_up(session)
+
+    # Act
+    threads = [threading.Thread(target=warm_up, args=(s,)) for s in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for session in sessions:
+        session.close()
+
+    # Assert
+    assert len(executed) == 1
+    assert cache.stats()["size"] == 1
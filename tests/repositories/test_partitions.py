@@ -0,0 +1,275 @@
+"""
+financial_dataの会計年度パーティションの作成・切り離し・移行をテストします。
+
+```Docker内部でのテスト実行コマンド
+$ docker compose exec streamlit_app pytest ./tests/repositories/test_partitions.py
+```
+"""
+
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+from utils.db_models import (
+    Company,
+    Financial_context,
+    Financial_data,
+    Financial_item,
+    Financial_report,
+)
+from utils.partitions import (
+    DEFAULT_PARTITION,
+    REPORT_NATURAL_KEY,
+    create_year_partition,
+    create_year_partitions,
+    detach_year_partition,
+    ensure_report_natural_key,
+    is_partitioned,
+    list_partitions,
+    migrate_financial_data,
+    needs_migration,
+    partition_name,
+    partition_year_range,
+)
+
+# create_allで作成されるパーティションの範囲外の年度
+OUT_OF_RANGE_YEAR = 2001
+
+
+@pytest.fixture(scope="function")
+def report_and_item(db_session):
+    company = Company(edinet_code="E12345", company_name="Test Company")
+    report = Financial_report(
+        company=company,
+        document_type="四半期報告書",
+        fiscal_year=str(OUT_OF_RANGE_YEAR),
+        quarter_type="Q3",
+        fiscal_year_end=f"{OUT_OF_RANGE_YEAR}/12/31",
+    )
+    item = Financial_item(element_id="jppfs_cor:NetSales", item_name="売上高")
+    context = Financial_context(
+        context_id="CurrentYTDDuration",
+        period_type="期間",
+        consolidated_type="連結",
+        duration_type="Duration",
+        relative_period="CurrentYTD",
+    )
+    db_session.add_all([company, report, item, context])
+    db_session.commit()
+    ids = report.report_id, item.item_id, context.context_key
+    # パーティションの操作はテーブルをロックするため、セッションのトランザクションを終えておく
+    db_session.close()
+    return ids
+
+
+def test_create_all_creates_partitions_for_default_range(engine):
+    """create_allで、デフォルトと当年度前後の年度のパーティションが作成されること"""
+    start_year, end_year = partition_year_range()
+    with engine.connect() as connection:
+        partitions = dict(list_partitions(connection))
+    assert partitions[DEFAULT_PARTITION] == "DEFAULT"
+    for fiscal_year in range(start_year, end_year + 1):
+        assert partition_name(fiscal_year) in partitions
+    assert partition_year_range(datetime.date(2026, 4, 1)) == (2020, 2027)
+
+
+def test_create_year_partition_moves_rows_from_default(
+    engine, db_session, report_and_item
+):
+    """デフォルトパーティションにある該当年度の行が、新しいパーティションへ移動すること"""
+    # Arrange
+    report_id, item_id, context_key = report_and_item
+    db_session.add_all(
+        Financial_data(
+            report_id=report_id,
+            fiscal_year=OUT_OF_RANGE_YEAR,
+            item_id=item_id,
+            context_key=context_key,
+            value=value,
+        )
+        for value in [100, 200]
+    )
+    db_session.commit()
+    db_session.close()
+    name = partition_name(OUT_OF_RANGE_YEAR)
+
+    try:
+        # Act
+        with engine.begin() as connection:
+            created = create_year_partition(connection, OUT_OF_RANGE_YEAR)
+            created_again = create_year_partition(connection, OUT_OF_RANGE_YEAR)
+            partitions = dict(list_partitions(connection))
+            default_count = connection.scalar(
+                text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+            )
+            partition_values = connection.scalars(
+                text(f"SELECT value FROM {name} ORDER BY value")
+            ).all()
+
+        # Assert
+        assert created is True
+        assert created_again is False
+        assert partitions[name] == (
+            f"FOR VALUES FROM ('{OUT_OF_RANGE_YEAR}') TO ('{OUT_OF_RANGE_YEAR + 1}')"
+        )
+        assert default_count == 0
+        assert partition_values == [100, 200]
+    finally:
+        with engine.begin() as connection:
+            detach_year_partition(connection, OUT_OF_RANGE_YEAR, drop=True)
+
+    # 切り離した年度の行は、financial_dataから参照できなくなること
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT count(*) FROM financial_data")) == 0
+
+
+def test_migrate_financial_data_keeps_rows_and_ids(engine, report_and_item):
+    """パーティション化前のテーブルの行が、data_idを維持したまま移行され、
+    コンテキストの文字列がcontextsテーブルのcontext_keyに置き換わること"""
+    # Arrange: パーティション化前と同じ構造のテーブルに置き換える
+    report_id, item_id, context_key = report_and_item
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE financial_data"))
+        connection.execute(
+            text(
+                "CREATE TABLE financial_data ("
+                "data_id bigserial PRIMARY KEY, "
+                "report_id int4 NOT NULL REFERENCES financial_reports(report_id), "
+                "item_id int4 NOT NULL REFERENCES financial_items(item_id), "
+                "context_id varchar(300), period_type varchar(50) NOT NULL, "
+                "consolidated_type varchar(10) NOT NULL, "
+                "duration_type varchar(10) NOT NULL, value numeric(20), "
+                "value_text text, is_numeric bool DEFAULT true, "
+                "created_at timestamptz DEFAULT now(), "
+                "updated_at timestamptz DEFAULT now())"
+            )
+        )
+        connection.execute(
+            text(
+                "CREATE INDEX idx_data_report_item "
+                "ON financial_data (report_id, item_id)"
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO financial_data (data_id, report_id, item_id, context_id, "
+                "period_type, consolidated_type, duration_type, value) VALUES "
+                f"(10, {report_id}, {item_id}, 'CurrentYTDDuration', "
+                "'期間', '連結', 'Duration', 100), "
+                f"(11, {report_id}, {item_id}, "
+                "'Prior1YearInstant_NonConsolidatedMember', "
+                "'時点', '個別', 'Instant', 200), "
+                f"(12, {report_id}, {item_id}, NULL, '期間', '連結', 'Duration', 300)"
+            )
+        )
+
+    try:
+        # Act
+        with engine.begin() as connection:
+            migration_needed = needs_migration(connection)
+            migrated = migrate_financial_data(connection)
+            migrated_again = migrate_financial_data(connection)
+            connection.execute(
+                text(
+                    "INSERT INTO financial_data (report_id, fiscal_year, item_id, "
+                    "context_key, value) VALUES "
+                    f"({report_id}, {OUT_OF_RANGE_YEAR}, {item_id}, {context_key}, 400)"
+                )
+            )
+            rows = connection.execute(
+                text(
+                    "SELECT d.data_id, d.fiscal_year, d.value, c.context_id, "
+                    "c.consolidated_type, c.relative_period, c.member "
+                    f"FROM {partition_name(OUT_OF_RANGE_YEAR)} d "
+                    "JOIN contexts c ON c.context_key = d.context_key "
+                    "ORDER BY d.data_id"
+                )
+            ).all()
+            partitioned = is_partitioned(connection)
+
+        # Assert
+        assert migration_needed is True
+        assert migrated == 3
+        assert migrated_again == 0
+        assert partitioned is True
+        # 登録済みのコンテキストは再利用され、移行後に登録した行は
+        # 移行した最大のdata_idの後から採番されること
+        assert [tuple(row) for row in rows] == [
+            (
+                10,
+                OUT_OF_RANGE_YEAR,
+                100,
+                "CurrentYTDDuration",
+                "連結",
+                "CurrentYTD",
+                None,
+            ),
+            (
+                11,
+                OUT_OF_RANGE_YEAR,
+                200,
+                "Prior1YearInstant_NonConsolidatedMember",
+                "個別",
+                "Prior1Year",
+                "NonConsolidatedMember",
+            ),
+            (12, OUT_OF_RANGE_YEAR, 300, None, "連結", None, None),
+            (
+                13,
+                OUT_OF_RANGE_YEAR,
+                400,
+                "CurrentYTDDuration",
+                "連結",
+                "CurrentYTD",
+                None,
+            ),
+        ]
+    finally:
+        with engine.begin() as connection:
+            if not needs_migration(connection):
+                connection.execute(text("DELETE FROM financial_data"))
+                detach_year_partition(connection, OUT_OF_RANGE_YEAR, drop=True)
+
+
+def test_create_year_partitions_validates_range(engine):
+    with engine.begin() as connection:
+        with pytest.raises(ValueError):
+            create_year_partitions(connection, 2025, 2024)
+        with pytest.raises(ValueError):
+            detach_year_partition(connection, 1999)
+
+
+def test_ensure_report_natural_key_adds_missing_constraint(engine, report_and_item):
+    """一意制約の導入前のfinancial_reportsに一意制約を追加し、重複があれば追加しないこと"""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            # Arrange: 一意制約の導入前の構造に戻し、重複する報告書を登録する
+            connection.execute(
+                text(
+                    f"ALTER TABLE financial_reports DROP CONSTRAINT {REPORT_NATURAL_KEY}"
+                )
+            )
+            assert ensure_report_natural_key(connection)
+            assert not ensure_report_natural_key(connection)
+
+            connection.execute(
+                text(
+                    f"ALTER TABLE financial_reports DROP CONSTRAINT {REPORT_NATURAL_KEY}"
+                )
+            )
+            connection.execute(
+                text(
+                    "INSERT INTO financial_reports (company_id, document_type, "
+                    "fiscal_year, quarter_type, fiscal_year_end) "
+                    "SELECT company_id, document_type, fiscal_year, quarter_type, "
+                    "fiscal_year_end FROM financial_reports"
+                )
+            )
+
+            # Act / Assert
+            with pytest.raises(RuntimeError):
+                ensure_report_natural_key(connection)
+        finally:
+            transaction.rollback()
@@ -0,0 +1,88 @@
+"""
+ReportMetricsRepositoryの主要指標の登録と取得をテストします。
+
+```Docker内部でのテスト実行コマンド
+$ docker compose exec streamlit_app pytest ./tests/repositories/test_report_metrics_repository.py
+```
+"""
+
+import pytest
+
+from utils.db_models import Company, Financial_report
+from utils.repositories.report_metrics_repository import ReportMetricsRepository
+
+
+@pytest.fixture(scope="function")
+def reports(db_session):
+    company = Company(edinet_code="E12345", company_name="Test Company")
+    reports = [
+        Financial_report(
+            company=company,
+            document_type="四半期報告書",
+            fiscal_year="2023",
+            quarter_type=quarter_type,
+            fiscal_year_end="2023/12/31",
+        )
+        for quarter_type in ["Q2", "Q3"]
+    ]
+    db_session.add_all([company, *reports])
+    db_session.commit()
+    return reports
+
+
+def test_save_overwrites_existing_metrics(db_session, reports):
+    """同じ報告書の主要指標は、再計算時に上書きされること"""
+    # Arrange
+    repo = ReportMetricsRepository(db_session)
+    report_id = reports[0].report_id
+    repo.save(report_id, net_sales=1000, operating_income=100)
+    db_session.commit()
+
+    # Act
+    repo.save(report_id, net_sales=2000, operating_income=None)
+    db_session.commit()
+
+    # Assert
+    metrics = repo.find_by_report_ids([report_id, reports[1].report_id])
+    assert list(metrics) == [report_id]
+    assert metrics[report_id].net_sales == 2000
+    assert metrics[report_id].operating_income is None
+    assert repo.find_by_report_ids([]) == {}
+
+
+def test_save_many_inserts_and_overwrites_metrics(db_session, reports):
+    """複数の報告書の主要指標を一括で登録し、既存の主要指標は上書きすること"""
+    # Arrange
+    repo = ReportMetricsRepository(db_session)
+    first_id, second_id = (report.report_id for report in reports)
+    repo.save(first_id, net_sales=1000, operating_income=100)
+    db_session.commit()
+
+    # Act
+    saved = repo.save_many(
+        {
+            first_id: {"net_sales": 2000, "operating_income": None},
+            second_id: {"net_sales": 3000, "operating_income": 300},
+        }
+    )
+    db_session.commit()
+
+    # Assert
+    assert saved == 2
+    metrics = repo.find_by_report_ids([first_id, second_id])
+    assert metrics[first_id].net_sales == 2000
+    assert metrics[first_id].operating_income is None
+    assert metrics[second_id].operating_income == 300
+    assert repo.save_many({}) == 0
+
+
+def test_find_report_ids_missing_only(db_session, reports):
+    """missing_onlyの場合は、主要指標が未作成の報告書のみを返すこと"""
+    # Arrange
+    repo = ReportMetricsRepository(db_session)
+    repo.save(reports[0].report_id, net_sales=1000)
+    db_session.commit()
+
+    # Act / Assert
+    assert repo.find_report_ids() == [report.report_id for report in reports]
+    assert repo.find_report_ids(missing_only=True) == [reports[1].report_id]
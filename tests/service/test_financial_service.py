@@ -6,7 +6,13 @@ $docker compose exec streamlit_app pytest ./tests/service/test_financial_service
 import pytest
 import pandas as pd
 
-from utils.service.financial_service import FinancialService
+from utils.metrics import InMemoryMetricsSink, MetricsRecorder
+from utils.service.financial_service import (
+    FinancialService,
+    IngestionSource,
+    prepare_financial_data,
+)
+from utils.staging import StagingStore
 
 
 @pytest.fixture(scope="function")
@@ -47,33 +53,45 @@ def test_save_financial_data_from_dataframe(mocker):
     # Given
     # テスト用ダミーのDataFrame, configを作成
     dummy_input_df = pd.DataFrame({"col1": [1, 2]})
-    dummy_standarized_df = pd.DataFrame({"col2": [3, 2]})
+    dummy_standarized_df = pd.DataFrame(
+        {
+            "element_id": ["jppfs_cor:NetSales", "jppfs_cor:OperatingIncome"],
+            "context_id": ["CurrentYTDDuration", "CurrentYTDDuration"],
+            "value": [3000000.0, 300000.0],
+        }
+    )
     dummy_model_data_bundle = {
         "company": {"edinet_code": "E12345", "company_name": "テスト株式会社"},
         "report": {"fiscal_year": 2023, "quarter_type": "Q4"},
         "items": [{"element_id": "NetSales", "item_name": "売上高"}],
+        "contexts": [
+            {
+                "context_id": "CurrentYTDDuration",
+                "period_type": "期間",
+                "consolidated_type": "連結",
+            }
+        ],
     }
-    dummy_financial_data = [{"item_id": 1, "value": 100}]
+    dummy_financial_data = pd.DataFrame([{"item_id": 1, "value": 100}])
     dummy_config = {}
 
     # data_mapperをモック化し、ダミーデータを返却するように設定
     mock_data_mapper = mocker.patch("utils.service.financial_service.data_mapper")
     mock_data_mapper.standardize_raw_data.return_value = dummy_standarized_df
     mock_data_mapper.map_data_to_models.return_value = dummy_model_data_bundle
-    mock_data_mapper.financial_data_mapping.return_value = dummy_financial_data
+    mock_data_mapper.financial_data_columnar_mapping.return_value = dummy_financial_data
     # UnitOfWorkをモック化
     mock_uow = mocker.MagicMock()
     mock_uow.financial_report.report_id = 1
-    mock_item1 = mocker.MagicMock()
-    mock_item1.item_id = 1
-    mock_item1.element_id = "NetSales"
-    list_of_items = [mock_item1]
-
-    mock_uow.financial_items.find_by_element_ids.return_value = list_of_items
-    mock_uow.financial_reports.upsert.return_value = mock_uow.financial_report
+    mock_uow.financial_items.bulk_get_or_create.return_value = {"NetSales": 1}
+    context_key_map = {("CurrentYTDDuration", "期間", "連結"): 1}
+    mock_uow.contexts.bulk_get_or_create.return_value = context_key_map
+    mock_uow.financial_reports.upsert_by_natural_key.return_value = (
+        mock_uow.financial_report,
+        True,
+    )
     # 新規登録シナリオのため、find系メソッドの結果に「見つからない（None）」を設定
     mock_uow.companies.find_by_edinet_code.return_value = None
-    mock_uow.financial_items.find_by_element_id.return_value = None
     # serviceの初期化
     financial_service = FinancialService(mock_uow)
 
@@ -85,10 +103,455 @@ def test_save_financial_data_from_dataframe(mocker):
     mock_data_mapper.standardize_raw_data.assert_called_once()
     mock_data_mapper.map_data_to_models.assert_called_once()
     mock_uow.companies.add.assert_called_once()
-    mock_uow.financial_items.find_by_element_id.assert_called_once()
-    mock_uow.financial_items.add.assert_called_once()
-    mock_uow.financial_reports.upsert.assert_called_once()
-    mock_uow.financial_data.add.assert_called_once()
-    assert mock_uow.session.flush.call_count == 3
+    mock_uow.financial_items.bulk_get_or_create.assert_called_once_with(
+        dummy_model_data_bundle["items"]
+    )
+    mock_uow.financial_items.find_by_element_id.assert_not_called()
+    mock_uow.contexts.bulk_get_or_create.assert_called_once_with(
+        dummy_model_data_bundle["contexts"]
+    )
+    # 財務データのコンテキストは、登録したcontext_keyに置き換えられること
+    _, mapping_kwargs = mock_data_mapper.financial_data_columnar_mapping.call_args
+    assert mapping_kwargs["context_key_map"] == context_key_map
+    mock_uow.financial_reports.upsert_by_natural_key.assert_called_once()
+    mock_uow.financial_data.bulk_load.assert_called_once_with(dummy_financial_data)
+    assert mock_uow.session.flush.call_count == 2
+    # 主要指標が財務データと同じトランザクションで登録されること
+    args, kwargs = mock_uow.report_metrics.save.call_args
+    assert args == (1,)
+    assert kwargs["net_sales"] == 3000000
+    assert kwargs["operation_profit_rate"] == 10
+    assert kwargs["ordinary_income"] is None
 
     # どのようなデータでメソッドが呼ばれているのかを確認
+
+
+def test_save_mapped_financial_data_records_ledger_in_same_transaction(mocker):
+    # Given
+    standarized_df = pd.DataFrame(
+        {
+            "element_id": ["jppfs_cor:NetSales"] * 3,
+            "context_id": ["CurrentYTDDuration", "Prior1YTDDuration", None],
+            "value": [100.0, 90.0, None],
+        }
+    )
+    model_data_bundle = {
+        "company": {"edinet_code": "E12345", "company_name": "テスト株式会社"},
+        "report": {"fiscal_year": 2023, "quarter_type": "Q4"},
+        "items": [],
+        "contexts": [],
+    }
+    mocker.patch("utils.service.financial_service.data_mapper")
+    mock_uow = mocker.MagicMock()
+    mock_uow.financial_reports.upsert_by_natural_key.return_value = (
+        mocker.MagicMock(report_id=1, fiscal_year="2023"),
+        True,
+    )
+    mock_uow.financial_data.bulk_load.return_value = 42
+    source = IngestionSource(doc_id="S100AAA1", file_hash="abc", source_path="a.csv")
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    fact_count = financial_service.save_mapped_financial_data(
+        standarized_df, model_data_bundle, source
+    )
+
+    # Then
+    assert fact_count == 42
+    mock_uow.ingestion_ledger.record.assert_called_once()
+    args, kwargs = mock_uow.ingestion_ledger.record.call_args
+    assert args == ("S100AAA1", "abc")
+    assert kwargs["status"] == "succeeded"
+    assert kwargs["row_count"] == 3
+    assert kwargs["fact_count"] == 42
+
+
+def test_get_financial_summaries_builds_dtos_from_batched_queries(mocker):
+    # Given
+    company_a = mocker.MagicMock(company_name="A社")
+    company_b = mocker.MagicMock(company_name="B社")
+    report_a = mocker.MagicMock(report_id=1, fiscal_year="2024", quarter_type="Q1")
+    report_b = mocker.MagicMock(report_id=2, fiscal_year="2023", quarter_type="Q3")
+    mock_uow = mocker.MagicMock()
+    mock_uow.financial_reports.find_latest_with_company.return_value = [
+        (company_a, report_a),
+        (company_b, report_b),
+    ]
+    mock_uow.report_metrics.find_by_report_ids.return_value = {}
+    mock_uow.financial_data.find_facts_by_report_ids_and_element_ids.return_value = [
+        (1, "jppfs_cor:NetSales", 2000000, "CurrentYTDDuration"),
+        (1, "jppfs_cor:OperatingIncome", 200000, "CurrentYTDDuration"),
+        # B社は売上高のみ（利益がない場合もNoneとして扱えること）
+        (2, "jpigp_cor:RevenueIFRS", 1000000, "CurrentYTDDuration"),
+    ]
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    summaries = financial_service.get_financial_summaries(["E1", "E2"])
+
+    # Then
+    mock_uow.financial_reports.find_latest_with_company.assert_called_once_with(
+        ["E1", "E2"]
+    )
+    report_ids, _ = (
+        mock_uow.financial_data.find_facts_by_report_ids_and_element_ids.call_args.args
+    )
+    assert report_ids == [1, 2]
+    assert [summary.company_name for summary in summaries] == ["A社", "B社"]
+    assert summaries[0].net_sales == 2
+    assert summaries[0].operation_profit_rate == 10
+    assert summaries[1].net_sales == 1
+    assert summaries[1].operating_income is None
+    assert summaries[1].operation_profit_rate is None
+
+
+def test_get_financial_summary_prefers_current_consolidated_context(mocker):
+    # Given
+    mock_uow = mocker.MagicMock()
+    mock_uow.companies.find_by_edinet_code.return_value = mocker.MagicMock(
+        company_name="A社"
+    )
+    mock_uow.financial_reports.find_latest_by_company_id.return_value = (
+        mocker.MagicMock(report_id=1, fiscal_year="2024", quarter_type="Q3")
+    )
+    # 主要指標が未作成の報告書は、財務データから計算すること
+    mock_uow.report_metrics.get.return_value = None
+    mock_uow.financial_data.find_facts_by_report_id_and_element_ids.return_value = [
+        ("jppfs_cor:NetSales", 1000000, "Prior1YTDDuration"),
+        ("jppfs_cor:NetSales", 3000000, "CurrentYTDDuration"),
+        ("jppfs_cor:NetSales", 9000000, "CurrentYTDDuration_ReportableSegmentsMember"),
+        ("jppfs_cor:NetSales", 2000000, "Prior1YTDDuration"),
+    ]
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    summary = financial_service.get_financial_summary("E1")
+
+    # Then
+    assert summary.net_sales == 3
+
+
+def test_get_financial_summary_reads_report_metrics(mocker):
+    # Given
+    mock_uow = mocker.MagicMock()
+    mock_uow.companies.find_by_edinet_code.return_value = mocker.MagicMock(
+        company_name="A社"
+    )
+    mock_uow.financial_reports.find_latest_by_company_id.return_value = (
+        mocker.MagicMock(report_id=1, fiscal_year="2024", quarter_type="Q3")
+    )
+    mock_uow.report_metrics.get.return_value = mocker.MagicMock(
+        net_sales=3000000,
+        operating_income=300000,
+        ordinary_income=None,
+        net_income=None,
+        operation_profit_rate=10,
+        ordinary_profit_rate=None,
+        net_profit_rate=None,
+    )
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    summary = financial_service.get_financial_summary("E1")
+
+    # Then
+    mock_uow.report_metrics.get.assert_called_once_with(1)
+    mock_uow.financial_data.find_facts_by_report_id_and_element_ids.assert_not_called()
+    assert summary.net_sales == 3
+    assert summary.operating_income == 0.3
+    assert summary.operation_profit_rate == 10
+    assert summary.ordinary_income is None
+
+
+def test_get_financial_summaries_reads_facts_only_for_missing_metrics(mocker):
+    # Given
+    report_a = mocker.MagicMock(report_id=1, fiscal_year="2024", quarter_type="Q1")
+    report_b = mocker.MagicMock(report_id=2, fiscal_year="2023", quarter_type="Q3")
+    mock_uow = mocker.MagicMock()
+    mock_uow.financial_reports.find_latest_with_company.return_value = [
+        (mocker.MagicMock(company_name="A社"), report_a),
+        (mocker.MagicMock(company_name="B社"), report_b),
+    ]
+    mock_uow.report_metrics.find_by_report_ids.return_value = {
+        1: mocker.MagicMock(
+            net_sales=2000000,
+            operating_income=None,
+            ordinary_income=None,
+            net_income=None,
+            operation_profit_rate=None,
+            ordinary_profit_rate=None,
+            net_profit_rate=None,
+        )
+    }
+    mock_uow.financial_data.find_facts_by_report_ids_and_element_ids.return_value = [
+        (2, "jppfs_cor:NetSales", 1000000, "CurrentYTDDuration"),
+    ]
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    summaries = financial_service.get_financial_summaries()
+
+    # Then
+    report_ids, _ = (
+        mock_uow.financial_data.find_facts_by_report_ids_and_element_ids.call_args.args
+    )
+    assert report_ids == [2]
+    assert [summary.net_sales for summary in summaries] == [2, 1]
+
+
+def test_rebuild_report_metrics_saves_metrics_per_report(mocker):
+    # Given
+    mock_uow = mocker.MagicMock()
+    mock_uow.report_metrics.find_report_ids.return_value = [1, 2, 3]
+    mock_uow.financial_data.find_facts_by_report_ids_and_element_ids.return_value = [
+        (1, "jppfs_cor:NetSales", 1000000, "CurrentYTDDuration"),
+        (1, "jppfs_cor:OrdinaryIncome", 100000, "CurrentYTDDuration"),
+    ]
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    rebuilt_count = financial_service.rebuild_report_metrics(
+        missing_only=True, batch_size=2
+    )
+
+    # Then
+    assert rebuilt_count == 3
+    mock_uow.report_metrics.find_report_ids.assert_called_once_with(True)
+    # 2件ずつのバッチで財務データを取得すること
+    batches = [
+        call.args[0]
+        for call in mock_uow.financial_data.find_facts_by_report_ids_and_element_ids.call_args_list
+    ]
+    assert batches == [[1, 2], [3]]
+    # 報告書ごとではなく、バッチごとに1回だけ登録すること
+    assert mock_uow.report_metrics.save_many.call_count == 2
+    mock_uow.report_metrics.save.assert_not_called()
+    saved = {
+        report_id: values
+        for call in mock_uow.report_metrics.save_many.call_args_list
+        for report_id, values in call.args[0].items()
+    }
+    assert saved[1]["ordinary_profit_rate"] == 10
+    assert saved[2]["net_sales"] is None
+
+
+def test_get_financial_timeseries_pivots_periods_and_metrics(mocker):
+    # Given
+    mock_uow = mocker.MagicMock()
+    mock_uow.financial_data.find_series_by_edinet_code_and_element_ids.return_value = [
+        (
+            1,
+            2023,
+            "Q2",
+            "2023-09-30",
+            "jppfs_cor:NetSales",
+            1000000,
+            "CurrentYTDDuration",
+        ),
+        # 同じ期間の古い報告書は、後から登録された報告書で置き換えられること
+        (2, 2023, "Q3", "2023-12-31", "jppfs_cor:NetSales", 1, "CurrentYTDDuration"),
+        (
+            3,
+            2023,
+            "Q3",
+            "2023-12-31",
+            "jppfs_cor:NetSales",
+            3000000,
+            "CurrentYTDDuration",
+        ),
+        (
+            3,
+            2023,
+            "Q3",
+            "2023-12-31",
+            "jppfs_cor:NetSales",
+            1000000,
+            "CurrentQuarterDuration",
+        ),
+        (
+            3,
+            2023,
+            "Q3",
+            "2023-12-31",
+            "jppfs_cor:OperatingIncome",
+            300000,
+            "CurrentYTDDuration",
+        ),
+    ]
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    timeseries_df = financial_service.get_financial_timeseries(
+        "E1", ["NetSales", "OperationIncome"]
+    )
+
+    # Then
+    _, element_ids, consolidated_types = (
+        mock_uow.financial_data.find_series_by_edinet_code_and_element_ids.call_args.args
+    )
+    assert "jppfs_cor:NetSales" in element_ids
+    assert "連結" in consolidated_types
+    assert list(timeseries_df.columns) == [
+        "period_name",
+        "fiscal_year_end",
+        "NetSales",
+        "OperationIncome",
+    ]
+    assert timeseries_df["period_name"].tolist() == ["2023 Q2", "2023 Q3"]
+    assert timeseries_df["NetSales"].tolist() == [1.0, 3.0]
+    assert pd.isna(timeseries_df["OperationIncome"].iloc[0])
+    assert timeseries_df["OperationIncome"].iloc[1] == 0.3
+
+
+def test_get_financial_timeseries_rejects_unknown_metric(mocker):
+    financial_service = FinancialService(mocker.MagicMock())
+    with pytest.raises(ValueError):
+        financial_service.get_financial_timeseries("E1", ["Unknown"])
+
+
+def test_save_financial_data_from_dataframe_emits_stage_metrics(mocker):
+    # Given
+    standarized_df = pd.DataFrame(
+        {
+            "element_id": ["jppfs_cor:NetSales"],
+            "context_id": ["CurrentYTDDuration"],
+            "value": [100.0],
+        }
+    )
+    mock_data_mapper = mocker.patch("utils.service.financial_service.data_mapper")
+    mock_data_mapper.standardize_raw_data.return_value = standarized_df
+    mock_data_mapper.map_data_to_models.return_value = {
+        "company": {"edinet_code": "E12345", "company_name": "テスト株式会社"},
+        "report": {"fiscal_year": 2023, "quarter_type": "Q4"},
+        "items": [{"element_id": "jppfs_cor:NetSales", "item_name": "売上高"}],
+        "contexts": [],
+    }
+    mock_data_mapper.financial_data_columnar_mapping.return_value = pd.DataFrame(
+        [{"item_id": 1, "value": 100}]
+    )
+    mock_uow = mocker.MagicMock()
+    mock_uow.financial_data.bulk_load.return_value = 1
+    mock_uow.financial_reports.upsert_by_natural_key.return_value = (
+        mocker.MagicMock(fiscal_year="2023"),
+        True,
+    )
+    sink = InMemoryMetricsSink()
+    financial_service = FinancialService(mock_uow, metrics_sink=sink)
+    source = IngestionSource(doc_id="S100AAA1", file_hash="abc")
+
+    # When
+    financial_service.save_financial_data_from_dataframe(
+        pd.DataFrame({"col1": [1, 2]}), {}, source
+    )
+
+    # Then
+    assert [record.stage for record in sink.records] == [
+        "standardize",
+        "map_models",
+        "company_upsert",
+        "item_resolution",
+        "context_resolution",
+        "report_upsert",
+        "fact_mapping",
+        "fact_load",
+        "report_metrics",
+        "ledger",
+        "commit",
+    ]
+    rows = {record.stage: record.rows for record in sink.records}
+    assert rows["standardize"] == 2
+    assert rows["item_resolution"] == 1
+    assert rows["fact_load"] == 1
+    assert {record.doc_id for record in sink.records} == {"S100AAA1"}
+
+
+def test_prepare_financial_data_reuses_staged_dataframe(mocker, tmp_path):
+    """標準化済みのParquetがあれば、CSVの読み込みと標準化を行わないこと"""
+    # Given
+    standarized_df = pd.DataFrame(
+        {"element_id": ["jppfs_cor:NetSales"], "value": [100.0]}
+    )
+    mock_data_mapper = mocker.patch("utils.service.financial_service.data_mapper")
+    mock_data_mapper.standardize_raw_data.return_value = standarized_df
+    mock_data_mapper.map_data_to_models.return_value = {"items": [{}]}
+    read_raw = mocker.Mock(return_value=pd.DataFrame({"col1": [1, 2]}))
+    sink = InMemoryMetricsSink()
+    staging_store = StagingStore(str(tmp_path))
+    file_hash = "ab" * 32
+
+    # When
+    for _ in range(2):
+        prepared = prepare_financial_data(
+            read_raw, {}, MetricsRecorder(sink), "S100AAA1", staging_store, file_hash
+        )
+
+    # Then
+    read_raw.assert_called_once()
+    mock_data_mapper.standardize_raw_data.assert_called_once()
+    assert prepared[0].equals(standarized_df)
+    assert [record.stage for record in sink.records] == [
+        "staging_load",
+        "decode",
+        "standardize",
+        "staging_save",
+        "map_models",
+        "staging_load",
+        "map_models",
+    ]
+    # 空のCSVは変換しない
+    assert prepare_financial_data(pd.DataFrame(), {}) is None
+
+
+def test_save_mapped_financial_data_replaces_facts_of_existing_report(mocker):
+    # Given
+    model_data_bundle = {
+        "company": {"edinet_code": "E12345", "company_name": "テスト株式会社"},
+        "report": {"fiscal_year": "2023", "quarter_type": "Q4"},
+        "items": [],
+        "contexts": [],
+    }
+    mocker.patch("utils.service.financial_service.data_mapper")
+    mock_uow = mocker.MagicMock()
+    # 自然キーが一致する登録済みの報告書が更新される
+    mock_uow.financial_reports.upsert_by_natural_key.return_value = (
+        mocker.MagicMock(report_id=7, fiscal_year="2023"),
+        False,
+    )
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    financial_service.save_mapped_financial_data(
+        pd.DataFrame(columns=["element_id", "value", "context_id"]), model_data_bundle
+    )
+
+    # Then
+    mock_uow.financial_data.delete_by_report_id.assert_called_once_with(
+        7, fiscal_year=2023
+    )
+    mock_uow.financial_data.bulk_load.assert_called_once()
+
+
+def test_save_mapped_financial_data_keeps_facts_of_new_report(mocker):
+    # Given
+    model_data_bundle = {
+        "company": {"edinet_code": "E12345", "company_name": "テスト株式会社"},
+        "report": {"fiscal_year": "2023", "quarter_type": "Q4"},
+        "items": [],
+        "contexts": [],
+    }
+    mocker.patch("utils.service.financial_service.data_mapper")
+    mock_uow = mocker.MagicMock()
+    # 新規の報告書が追加される
+    mock_uow.financial_reports.upsert_by_natural_key.return_value = (
+        mocker.MagicMock(report_id=8, fiscal_year="2023"),
+        True,
+    )
+    financial_service = FinancialService(mock_uow)
+
+    # When
+    financial_service.save_mapped_financial_data(
+        pd.DataFrame(columns=["element_id", "value", "context_id"]), model_data_bundle
+    )
+
+    # Then
+    mock_uow.financial_data.delete_by_report_id.assert_not_called()
@@ -0,0 +1,217 @@
+"""
+utils.apiの書類ダウンロード機能をテストします。
+
+EDINET APIの代わりに、ローカルのHTTPサーバーで用意したZIPを返却します。
+"""
+
+import io
+import json
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from utils import api
+from utils.document_cache import DocumentCache
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_CSV = next((PROJECT_ROOT / "download").glob("S100SSHR/XBRL_TO_CSV/*.csv"))
+
+
+def _build_document_zip() -> bytes:
+    """EDINETの書類取得APIと同じ構成のZIPを作成する。"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr(f"XBRL_TO_CSV/{SAMPLE_CSV.name}", SAMPLE_CSV.read_bytes())
+        z.writestr("XBRL_TO_CSV/jpaud-qrr-cc-001.csv", b"")
+    return buffer.getvalue()
+
+
+def _document(doc_id: str, filer_name: str) -> dict:
+    return {
+        "docID": doc_id,
+        "filerName": filer_name,
+        "docDescription": "四半期報告書－第1期第1四半期",
+    }
+
+
+# 書類一覧APIが日付ごとに返す書類。同じ書類が複数日に含まれる場合がある
+DOCUMENT_LISTS = {
+    "2024-01-05": [_document("S100AAA1", "A社"), _document("S100AAA2", "B社")],
+    "2024-01-06": [],
+    "2024-01-07": [_document("S100AAA2", "B社"), _document("S100AAA3", "C社")],
+}
+
+
+@pytest.fixture(scope="module")
+def edinet_stub():
+    """`/documents/{docID}`にZIPを返すローカルHTTPサーバー。未知のdocIDは404。"""
+    document_zip = _build_document_zip()
+    requested_paths = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requested_paths.append(self.path)
+            if self.path.startswith("/documents.json"):
+                submit_date = parse_qs(urlparse(self.path).query)["date"][0]
+                body = json.dumps(
+                    {"results": DOCUMENT_LISTS.get(submit_date, [])}
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif self.path.startswith("/documents/S100"):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(document_zip)))
+                self.end_headers()
+                self.wfile.write(document_zip)
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", requested_paths
+    server.shutdown()
+
+
+@pytest.fixture
+def stub_config(edinet_stub, tmp_path, monkeypatch):
+    # ダウンロード先がカレントディレクトリ基準のため、一時ディレクトリに移動する
+    monkeypatch.chdir(tmp_path)
+    base_url, _ = edinet_stub
+    return {
+        "edinetapi": {
+            "API_ENDPOINT": base_url,
+            "API_DOWNLOAD": base_url,
+            "MAX_CONCURRENCY": 3,
+            "RATE_LIMIT_PER_SECOND": 0,
+        }
+    }
+
+
+def test_fetch_company_dataframes_downloads_all_documents(stub_config):
+    doc_ids = ["S100AAA1", "S100AAA2", "S100AAA3", "S100AAA4", "S100AAA5"]
+
+    results = dict(api.fetch_company_dataframes(doc_ids, stub_config))
+
+    assert set(results) == set(doc_ids)
+    for company_df in results.values():
+        assert company_df is not None
+        assert "要素ID" in company_df.columns
+        assert len(company_df) == 378
+
+
+def test_fetch_company_dataframes_reports_missing_document(stub_config):
+    results = dict(api.fetch_company_dataframes(["S100AAA1", "X404"], stub_config))
+
+    assert results["S100AAA1"] is not None
+    assert results["X404"] is None
+
+
+def test_fetch_single_company_dataframe_archives_only_when_enabled(
+    stub_config, tmp_path
+):
+    # アーカイブ無効時はディスクに何も書き出さないこと
+    company_df = api.fetch_single_company_dataframe(
+        "S100AAA1", stub_config, archive=False
+    )
+    assert company_df is not None
+    assert not (tmp_path / "download").exists()
+
+    # アーカイブ有効時はCSVを1ファイルだけ書き出すこと
+    api.fetch_single_company_dataframe("S100AAA1", stub_config, archive=True)
+    archived = list((tmp_path / "download" / "S100AAA1").rglob("*.csv"))
+    assert [path.name for path in archived] == [SAMPLE_CSV.name]
+    assert archived[0].read_bytes() == SAMPLE_CSV.read_bytes()
+
+
+def test_read_document_zip_without_csv_member():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr("PublicDoc/readme.txt", b"")
+    assert api.read_document_zip(buffer.getvalue()) is None
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    rate_limiter = api.RateLimiter(requests_per_second=20)
+
+    started_at = time.monotonic()
+    for _ in range(5):
+        rate_limiter.wait("http://example.com/documents/1")
+    # 他ホストへのリクエストは待機の対象外
+    rate_limiter.wait("http://other.example.com/")
+    elapsed = time.monotonic() - started_at
+
+    assert 0.19 <= elapsed < 1.0
+
+
+def test_fetch_single_company_dataframe_serves_repeat_requests_from_cache(
+    stub_config, edinet_stub, tmp_path
+):
+    _, requested_paths = edinet_stub
+    cache = DocumentCache(str(tmp_path / "cache"))
+    requested_paths.clear()
+
+    first = api.fetch_single_company_dataframe(
+        "S100AAA1", stub_config, archive=False, cache=cache
+    )
+    second = api.fetch_single_company_dataframe(
+        "S100AAA1", stub_config, archive=False, cache=cache
+    )
+    # 2回目はHTTP通信なしでキャッシュから読み込むこと
+    assert len(requested_paths) == 1
+    assert second.equals(first)
+
+    # refresh指定時はキャッシュを読まずに再ダウンロードすること
+    api.fetch_single_company_dataframe(
+        "S100AAA1", stub_config, archive=False, cache=cache, refresh=True
+    )
+    assert len(requested_paths) == 2
+
+
+def test_get_company_lists_merges_date_range_without_duplicates(stub_config):
+    company_df = api.get_company_lists("2024-01-05", "2024-01-07", stub_config)
+
+    assert sorted(company_df["docID"]) == ["S100AAA1", "S100AAA2", "S100AAA3"]
+
+
+def test_get_company_lists_reuses_cached_document_lists(
+    stub_config, edinet_stub, tmp_path
+):
+    _, requested_paths = edinet_stub
+    cache = DocumentCache(str(tmp_path / "cache"))
+    requested_paths.clear()
+
+    api.get_company_lists("2024-01-05", "2024-01-06", stub_config, cache=cache)
+    assert len(requested_paths) == 2
+
+    # 期間が重なる再実行では、新しい日付の書類一覧のみ取得すること
+    company_df = api.get_company_lists(
+        "2024-01-05", "2024-01-07", stub_config, cache=cache
+    )
+    assert len(requested_paths) == 3
+    assert len(company_df) == 3
+
+
+def test_iter_submit_dates():
+    assert api.iter_submit_dates("2024-02-28", "2024-03-01") == [
+        "2024-02-28",
+        "2024-02-29",
+        "2024-03-01",
+    ]
+    assert api.iter_submit_dates("2024-01-05") == ["2024-01-05"]
+    with pytest.raises(ValueError):
+        api.iter_submit_dates("2024-01-05", "2024-01-04")
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.run_benchmarks import compare_with_baseline
+from benchmarks.synthetic_csv import generate_edinet_csv, load_templates
+from utils import ConfigLoader, data_mapper
+from utils.decoding import read_edinet_csv
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="module")
+def templates():
+    return load_templates(str(PROJECT_ROOT / "download" / "**" / "*.csv"))
+
+
+def test_generate_edinet_csv_scales_facts_and_items(templates):
+    """
+    正常系: 指定した件数の財務データを持つUTF-16のCSVが生成され、マッピングできる。
+    """
+    # When
+    csv_bytes = generate_edinet_csv(5000, templates, edinet_code="E99998")
+    standardized_df = data_mapper.standardize_raw_data(read_edinet_csv(csv_bytes))
+    bundle = data_mapper.map_data_to_models(
+        standardized_df,
+        ConfigLoader(str(PROJECT_ROOT / "config" / "config.toml")).config,
+    )
+
+    # Then
+    assert csv_bytes.startswith(b"\xff\xfe")
+    is_financial = standardized_df["element_id"].str.contains(
+        "jppfs_cor:|jpigp_cor:", na=False
+    )
+    assert is_financial.sum() == 5000
+    assert bundle["company"]["edinet_code"] == "E99998"
+    # テンプレートを一巡するごとに新しい財務項目が増えること
+    assert (
+        len(bundle["items"])
+        > standardized_df.loc[is_financial, "element_id"]
+        .str.replace(r"Synthetic\d+$", "", regex=True)
+        .nunique()
+    )
+    # 同じシードでは同じ内容になること
+    assert csv_bytes == generate_edinet_csv(5000, templates, edinet_code="E99998")
+
+
+def test_compare_with_baseline_reports_slower_stages():
+    """
+    正常系: 許容範囲を超えて遅くなったステージのみを回帰として返す。
+    """
+    baseline = {"1000": {"decode": {"seconds": 1.0}, "save": {"seconds": 1.0}}}
+    results = {
+        "1000": {
+            "decode": {"seconds": 1.1},
+            "save": {"seconds": 1.5},
+            "standardize": {"seconds": 9.0},
+        }
+    }
+
+    regressions = compare_with_baseline(results, baseline, tolerance=0.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("1000 facts / save")
+    assert results["1000"]["decode"]["baseline_ratio"] == 1.1
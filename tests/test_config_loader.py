@@ -0,0 +1,81 @@
+"""
+utils.config_loaderの設定のキャッシュと、[xbrl_mapping]の変換をテストします。
+"""
+
+import os
+
+import pytest
+
+from utils import config_loader
+from utils.config_loader import ConfigLoader, compile_xbrl_mapping
+
+CONFIG_TEXT = """
+[xbrl_mapping.company]
+edinet_code = "jpdei_cor:EDINETCodeDEI"
+company_name = "jpcrp_cor:CompanyNameCoverPage"
+
+[xbrl_mapping.financial_report]
+filing_date = "jpcrp_cor:FilingDateCoverPage"
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text(CONFIG_TEXT, encoding="utf-8")
+    config_loader.clear_config_cache()
+    yield path
+    config_loader.clear_config_cache()
+
+
+def test_config_is_parsed_once_while_mtime_is_unchanged(config_path, mocker):
+    spy = mocker.spy(config_loader.toml, "load")
+
+    first = ConfigLoader(str(config_path))
+    second = ConfigLoader(str(config_path))
+
+    assert spy.call_count == 1
+    assert first.config == second.config
+    # インスタンスごとの複製のため、書き換えても他のインスタンスに影響しない
+    del first.config["xbrl_mapping"]["company"]
+    assert "company" in ConfigLoader(str(config_path)).config["xbrl_mapping"]
+
+
+def test_config_is_reloaded_when_mtime_changes(config_path):
+    assert ConfigLoader(str(config_path)).config["xbrl_mapping"]["company"]
+
+    config_path.write_text(
+        '[xbrl_mapping.company]\nedinet_code = "jpdei_cor:Other"\n', encoding="utf-8"
+    )
+    stat = config_path.stat()
+    os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    reloaded = ConfigLoader(str(config_path))
+    assert reloaded.config["xbrl_mapping"] == {
+        "company": {"edinet_code": "jpdei_cor:Other"}
+    }
+    assert reloaded.xbrl_mapping.element_ids == {"jpdei_cor:Other"}
+
+
+def test_missing_config_returns_empty_dict(tmp_path):
+    loader = ConfigLoader(str(tmp_path / "missing.toml"))
+
+    assert loader.config == {}
+    assert loader.xbrl_mapping.element_ids == frozenset()
+
+
+def test_xbrl_mapping_is_precompiled(config_path):
+    loader = ConfigLoader(str(config_path))
+
+    assert loader.xbrl_mapping.section("company") == {
+        "edinet_code": "jpdei_cor:EDINETCodeDEI",
+        "company_name": "jpcrp_cor:CompanyNameCoverPage",
+    }
+    assert loader.xbrl_mapping.section("unknown") is None
+    assert loader.xbrl_mapping.element_ids == {
+        "jpdei_cor:EDINETCodeDEI",
+        "jpcrp_cor:CompanyNameCoverPage",
+        "jpcrp_cor:FilingDateCoverPage",
+    }
+    # 同じ内容の設定からは、変換済みのマッピングを再利用する
+    assert compile_xbrl_mapping(loader.config) is loader.xbrl_mapping
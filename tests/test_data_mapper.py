@@ -2,7 +2,12 @@ import pytest
 import pandas as pd
 import numpy as np
 
-from utils.data_mapper import standardize_raw_data, financial_data_mapping
+from utils.data_mapper import (
+    _context_mapping,
+    standardize_raw_data,
+    financial_data_mapping,
+    financial_data_columnar_mapping,
+)
 
 
 @pytest.fixture(scope="function")
@@ -58,3 +63,144 @@ def test_financial_data_mapping_converts_nan_to_non():
     # Then
     assert result_list[0]["value_text"] is None
     assert result_list[1]["value"] is None
+
+
+def test_financial_data_columnar_mapping_matches_dict_mapping():
+    # Given
+    test_df = pd.DataFrame(
+        {
+            "element_id": ["jppfs_cor:ID_A", "jpcrp_cor:ID_X", "jpigp_cor:ID_B"],
+            "value": [100, 1, np.nan],
+            "value_text": [np.nan, np.nan, "text"],
+            "context_id": ["CurrentYTDDuration", "c_x", "CurrentQuarterInstant"],
+            "period_type": ["期間", "期間", "時点"],
+            "consolidated_type": ["連結", "その他", "連結"],
+            "is_numeric": [True, True, False],
+        }
+    )
+    test_item_id_map = {"jppfs_cor:ID_A": 1, "jpigp_cor:ID_B": 2}
+
+    # When
+    result_df = financial_data_columnar_mapping(
+        test_df, 1, test_item_id_map, fiscal_year=2023
+    )
+
+    # Then
+    # 財務項目以外(jpcrp_cor)の行は除外されること
+    assert result_df["item_id"].tolist() == [1, 2]
+    assert result_df["duration_type"].tolist() == ["Duration", "Instant"]
+    assert result_df["value"].tolist() == [100, None]
+    # パーティションキーの会計年度が全行に設定されること
+    assert result_df["fiscal_year"].tolist() == [2023, 2023]
+    # 辞書リスト形式と同じ内容になること
+    assert result_df.to_dict("records") == financial_data_mapping(
+        test_df, 1, test_item_id_map, fiscal_year=2023
+    )
+
+
+def test_financial_data_columnar_mapping_raises_on_unknown_element():
+    test_df = pd.DataFrame(
+        {
+            "element_id": ["jppfs_cor:ID_A"],
+            "value": [100],
+            "value_text": [np.nan],
+            "context_id": ["c1"],
+            "period_type": ["期間"],
+            "consolidated_type": ["連結"],
+            "is_numeric": [True],
+        }
+    )
+    with pytest.raises(KeyError, match="jppfs_cor:ID_A"):
+        financial_data_columnar_mapping(test_df, 1, {})
+
+
+def test_financial_data_columnar_mapping_replaces_context_with_key():
+    # Given
+    test_df = pd.DataFrame(
+        {
+            "element_id": ["jppfs_cor:ID_A", "jppfs_cor:ID_A", "jpigp_cor:ID_B"],
+            "value": [100, 90, np.nan],
+            "value_text": [np.nan, np.nan, "text"],
+            "context_id": ["CurrentYTDDuration", "Prior1YTDDuration", np.nan],
+            "period_type": ["期間", "期間", "時点"],
+            "consolidated_type": ["連結", "連結", "連結"],
+            "is_numeric": [True, True, False],
+        }
+    )
+    test_item_id_map = {"jppfs_cor:ID_A": 1, "jpigp_cor:ID_B": 2}
+    context_key_map = {
+        ("CurrentYTDDuration", "期間", "連結"): 10,
+        ("Prior1YTDDuration", "期間", "連結"): 11,
+        (None, "時点", "連結"): 12,
+    }
+
+    # When
+    result_df = financial_data_columnar_mapping(
+        test_df, 1, test_item_id_map, fiscal_year=2023, context_key_map=context_key_map
+    )
+
+    # Then
+    # コンテキストの文字列の代わりにcontext_keyのみを持つこと
+    assert result_df.columns.tolist() == [
+        "report_id",
+        "fiscal_year",
+        "item_id",
+        "context_key",
+        "value",
+        "value_text",
+        "is_numeric",
+    ]
+    assert result_df["context_key"].tolist() == [10, 11, 12]
+    with pytest.raises(KeyError, match="Prior1YTDDuration"):
+        financial_data_columnar_mapping(
+            test_df,
+            1,
+            test_item_id_map,
+            context_key_map={("CurrentYTDDuration", "期間", "連結"): 10},
+        )
+
+
+def test_context_mapping_extracts_unique_parsed_contexts():
+    # Given
+    test_df = pd.DataFrame(
+        {
+            "element_id": [
+                "jppfs_cor:ID_A",
+                "jppfs_cor:ID_B",
+                "jppfs_cor:ID_A",
+                "jpcrp_cor:ID_X",
+            ],
+            "context_id": [
+                "CurrentYTDDuration",
+                "CurrentYTDDuration",
+                "Prior1YearInstant_NonConsolidatedMember",
+                "FilingDateInstant",
+            ],
+            "period_type": ["期間", "期間", "時点", "時点"],
+            "consolidated_type": ["連結", "連結", "個別", "その他"],
+        }
+    )
+
+    # When
+    contexts = _context_mapping(test_df)
+
+    # Then
+    # 財務項目以外(jpcrp_cor)の行のコンテキストは含まれず、重複が除外されること
+    assert contexts == [
+        {
+            "context_id": "CurrentYTDDuration",
+            "period_type": "期間",
+            "consolidated_type": "連結",
+            "relative_period": "CurrentYTD",
+            "duration_type": "Duration",
+            "member": None,
+        },
+        {
+            "context_id": "Prior1YearInstant_NonConsolidatedMember",
+            "period_type": "時点",
+            "consolidated_type": "個別",
+            "relative_period": "Prior1Year",
+            "duration_type": "Instant",
+            "member": "NonConsolidatedMember",
+        },
+    ]
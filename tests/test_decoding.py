@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+
+from utils import decoding
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize(
+    "encoding, expected",
+    [
+        ("utf-16", "utf-16"),  # PythonのUTF-16はBOM付きで出力される
+        ("utf-8-sig", "utf-8-sig"),
+        ("utf-32", "utf-32"),
+    ],
+)
+def test_detect_encoding_uses_bom(encoding, expected, mocker):
+    """BOMがある場合はchardetを呼ばずにBOMから判定すること"""
+    mock_detect = mocker.patch("utils.decoding.chardet.detect")
+    raw_data = "要素ID\t値\n".encode(encoding)
+
+    assert decoding.detect_encoding(raw_data) == expected
+    mock_detect.assert_not_called()
+
+
+def test_detect_encoding_samples_without_bom(mocker):
+    """BOMがない場合は先頭のサンプルのみをchardetに渡すこと"""
+    mock_detect = mocker.patch(
+        "utils.decoding.chardet.detect", return_value={"encoding": "utf-8"}
+    )
+    raw_data = ("要素ID,値\n" * 10000).encode("utf-8")
+
+    assert decoding.detect_encoding(raw_data, sample_size=1024) == "utf-8"
+    assert len(mock_detect.call_args.args[0]) == 1024
+
+
+def test_read_edinet_csv_reads_sample_file():
+    """ダウンロード済みのEDINETのCSV(UTF-16LE, BOM付き)を読み込めること"""
+    csv_path = next((PROJECT_ROOT / "download").glob("S100SSHR/XBRL_TO_CSV/*.csv"))
+
+    company_df = decoding.read_edinet_csv(csv_path.read_bytes())
+
+    assert company_df.columns[0] == "要素ID"
+    assert len(company_df) == 378
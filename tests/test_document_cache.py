@@ -0,0 +1,126 @@
+"""
+utils.document_cacheの書類キャッシュをテストします。
+"""
+
+import itertools
+import os
+
+from utils import document_cache
+from utils.document_cache import DocumentCache, create_document_cache
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    cache = DocumentCache(str(tmp_path))
+    content_hash = cache.put("S100AAA1", b"zip-content")
+
+    assert cache.get("S100AAA1") == b"zip-content"
+    assert cache.get("S100MISS") is None
+    # 内容のハッシュをファイル名として保存すること
+    assert (tmp_path / "objects" / content_hash[:2] / f"{content_hash}.zip").exists()
+
+
+def test_manifest_persists_across_instances(tmp_path):
+    DocumentCache(str(tmp_path)).put("S100AAA1", b"zip-content")
+
+    reopened = DocumentCache(str(tmp_path))
+    assert reopened.doc_ids() == ["S100AAA1"]
+    assert reopened.get("S100AAA1") == b"zip-content"
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    cache = DocumentCache(str(tmp_path))
+    cache.put("S100AAA1", b"same")
+    cache.put("S100AAA2", b"same")
+
+    objects = [f for _, _, files in os.walk(tmp_path / "objects") for f in files]
+    assert len(objects) == 1
+    assert cache.total_bytes() == len(b"same")
+
+
+def test_evicts_least_recently_used_documents(tmp_path, monkeypatch):
+    # 参照日時が同一にならないよう、呼び出しごとに1秒進む時計に差し替える
+    clock = itertools.count(1)
+    monkeypatch.setattr(document_cache.time, "time", lambda: float(next(clock)))
+    cache = DocumentCache(str(tmp_path), max_bytes=20)
+    cache.put("S100AAA1", b"a" * 8)
+    cache.put("S100AAA2", b"b" * 8)
+    # AAA1を参照し、AAA2を最も古い書類にする
+    cache.get("S100AAA1")
+    cache.put("S100AAA3", b"c" * 8)
+
+    assert set(cache.doc_ids()) == {"S100AAA1", "S100AAA3"}
+    assert cache.total_bytes() <= 20
+
+
+def test_corrupted_object_is_discarded(tmp_path):
+    cache = DocumentCache(str(tmp_path))
+    content_hash = cache.put("S100AAA1", b"zip-content")
+    (tmp_path / "objects" / content_hash[:2] / f"{content_hash}.zip").write_bytes(
+        b"broken"
+    )
+
+    assert cache.get("S100AAA1") is None
+    assert cache.doc_ids() == []
+    # 破損した実体は削除され、再保存で書き直されること
+    cache.put("S100AAA1", b"zip-content")
+    assert cache.get("S100AAA1") == b"zip-content"
+
+
+def test_get_verifies_content_without_holding_lock(tmp_path, monkeypatch):
+    cache = DocumentCache(str(tmp_path))
+    cache.put("S100AAA1", b"zip-content")
+    lock_states = []
+    sha256 = document_cache.hashlib.sha256
+
+    def recording_sha256(content):
+        lock_states.append(cache._lock.locked())
+        return sha256(content)
+
+    monkeypatch.setattr(document_cache.hashlib, "sha256", recording_sha256)
+
+    assert cache.get("S100AAA1") == b"zip-content"
+    assert lock_states == [False]
+
+
+def test_create_document_cache_from_config(tmp_path):
+    assert create_document_cache({"edinetapi": {"CACHE_DIR": ""}}) is None
+
+    cache = create_document_cache(
+        {"edinetapi": {"CACHE_DIR": str(tmp_path), "CACHE_MAX_MB": 1}}
+    )
+    assert cache.max_bytes == 1024 * 1024
+
+
+def test_get_defers_manifest_write_until_close(tmp_path, monkeypatch):
+    clock = itertools.count(1)
+    monkeypatch.setattr(document_cache.time, "time", lambda: float(next(clock)))
+    cache = DocumentCache(str(tmp_path))
+    cache.put("S100AAA1", b"zip-content")
+    manifest_before = (tmp_path / "manifest.json").read_bytes()
+
+    cache.get("S100AAA1")
+    # 参照のたびにマニフェストを書き出さないこと
+    assert (tmp_path / "manifest.json").read_bytes() == manifest_before
+
+    cache.close()
+    reopened = DocumentCache(str(tmp_path))
+    assert reopened._manifest["documents"]["S100AAA1"]["last_accessed"] == 2.0
+
+
+def test_total_bytes_tracks_replacement_and_eviction(tmp_path, monkeypatch):
+    clock = itertools.count(1)
+    monkeypatch.setattr(document_cache.time, "time", lambda: float(next(clock)))
+    cache = DocumentCache(str(tmp_path), max_bytes=20)
+    cache.put("S100AAA1", b"a" * 8)
+    cache.put("S100AAA2", b"a" * 8)
+    cache.put("S100AAA3", b"b" * 8)
+    assert cache.total_bytes() == 16
+
+    # 同じdocIDの内容を差し替えると、参照されなくなった内容は計上しない
+    cache.put("S100AAA3", b"c" * 4)
+    assert cache.total_bytes() == 12
+    cache.put("S100AAA4", b"d" * 12)
+
+    assert cache.total_bytes() == 16
+    assert set(cache.doc_ids()) == {"S100AAA3", "S100AAA4"}
+    assert DocumentCache(str(tmp_path)).total_bytes() == 16
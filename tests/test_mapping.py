@@ -96,6 +96,60 @@ def test_company_mapping_success(sample_source_df, test_config):
     assert result_dict == expected_dict
 
 
+def test_element_index_resolves_with_context_id():
+    """
+    正常系: ElementIndex - element_idが重複する場合にcontext_idで絞り込める。
+    """
+    df = pd.DataFrame(
+        {
+            "element_id": ["jppfs_cor:NetSales", "jppfs_cor:NetSales", "X:Name"],
+            "context_id": ["Prior1YTDDuration", "CurrentYTDDuration", "FilingDate"],
+            "value": [100.0, 200.0, np.nan],
+            "is_numeric": [True, True, False],
+            "value_text": [np.nan, np.nan, "テスト株式会社"],
+        }
+    )
+    element_index = data_mapper.ElementIndex(df)
+
+    assert element_index.get("jppfs_cor:NetSales") == "100"
+    assert element_index.get("jppfs_cor:NetSales", "CurrentYTDDuration") == "200"
+    assert element_index.get("jppfs_cor:NetSales", "UnknownContext") is None
+    assert element_index.get("not_exists") is None
+    assert element_index.resolve({"name": "X:Name", "missing": "Y:None"}) == {
+        "name": "テスト株式会社",
+        "missing": None,
+    }
+
+
+def test_get_value_with_and_without_prebuilt_index():
+    """
+    正常系: _get_value - 構築済みのElementIndexの有無にかかわらず同じ値を返す。
+    """
+    df = pd.DataFrame(
+        {
+            "element_id": ["jppfs_cor:NetSales", "jppfs_cor:NetSales", "X:Name"],
+            "context_id": ["Prior1YTDDuration", "CurrentYTDDuration", "FilingDate"],
+            "value": [100.0, 200.0, np.nan],
+            "is_numeric": [True, True, False],
+            "value_text": [np.nan, np.nan, "テスト株式会社"],
+        }
+    )
+    element_index = data_mapper.ElementIndex(df)
+
+    for index in (None, element_index):
+        assert (
+            data_mapper._get_value(
+                df, "jppfs_cor:NetSales", "CurrentYTDDuration", element_index=index
+            )
+            == "200"
+        )
+        assert (
+            data_mapper._get_value(df, "X:Name", element_index=index)
+            == "テスト株式会社"
+        )
+        assert data_mapper._get_value(df, "not_exists", element_index=index) is None
+
+
 # --- financial_report_mappingのテスト ---
 
 
@@ -0,0 +1,128 @@
+"""
+utils.metricsのステージ計測とシンクをテストします。
+"""
+
+import json
+import logging
+import urllib.request
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils import metrics
+from utils.metrics import (
+    InMemoryMetricsSink,
+    LogMetricsSink,
+    MetricsRecorder,
+    PrometheusMetricsSink,
+    StageMetric,
+    format_summary,
+)
+
+
+def test_stage_records_seconds_rows_and_doc_id():
+    sink = InMemoryMetricsSink()
+    recorder = MetricsRecorder(sink)
+
+    with recorder.stage("decode", doc_id="S100AAA1") as stage:
+        stage.rows = 10
+    timer = recorder.begin("commit", rows=3)
+    timer.end()
+
+    decode, commit = sink.records
+    assert (decode.stage, decode.rows, decode.doc_id) == ("decode", 10, "S100AAA1")
+    assert decode.seconds >= 0
+    assert (commit.stage, commit.rows) == ("commit", 3)
+
+
+def test_stage_is_not_recorded_when_it_raises():
+    sink = InMemoryMetricsSink()
+    recorder = MetricsRecorder(sink)
+
+    with pytest.raises(ValueError), recorder.stage("standardize"):
+        raise ValueError("broken csv")
+
+    assert sink.records == []
+
+
+def test_stage_counts_sql_statements():
+    """SQLAlchemy経由の文と、手動で加算した文（COPYなど）の両方を数えること"""
+    sink = InMemoryMetricsSink()
+    recorder = MetricsRecorder(sink)
+    engine = create_engine("sqlite://")
+
+    with engine.connect() as connection, recorder.stage("fact_load"):
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+        metrics.count_statement()
+
+    assert sink.records[0].statements == 3
+
+
+def test_summary_aggregates_percentiles_per_stage():
+    sink = InMemoryMetricsSink()
+    for seconds in [0.1, 0.2, 0.3, 0.4, 1.0]:
+        sink.emit(StageMetric("fact_load", seconds, rows=100, statements=1))
+    sink.emit(StageMetric("commit", 0.5))
+
+    summary = sink.summary()
+
+    assert list(summary) == ["fact_load", "commit"]
+    fact_load = summary["fact_load"]
+    assert fact_load["count"] == 5
+    assert fact_load["p50"] == pytest.approx(0.3)
+    assert fact_load["p90"] == pytest.approx(0.76)
+    assert fact_load["max_seconds"] == 1.0
+    assert fact_load["rows"] == 500
+    assert fact_load["rows_per_sec"] == pytest.approx(250)
+    assert fact_load["statements"] == 5
+    assert summary["commit"]["p99"] == 0.5
+    assert "fact_load" in format_summary(summary)
+
+
+def test_log_sink_emits_json(caplog):
+    sink = LogMetricsSink()
+
+    with caplog.at_level(logging.INFO, logger="utils.metrics"):
+        sink.emit(StageMetric("decode", 0.25, rows=3, doc_id="S100AAA1"))
+
+    payload = json.loads(caplog.records[0].getMessage().removeprefix("metrics "))
+    assert payload == {
+        "stage": "decode",
+        "seconds": 0.25,
+        "rows": 3,
+        "statements": 0,
+        "doc_id": "S100AAA1",
+    }
+
+
+def test_prometheus_sink_writes_text_format(tmp_path):
+    path = tmp_path / "metrics" / "import.prom"
+    sink = PrometheusMetricsSink(str(path))
+    sink.emit(StageMetric("fact_load", 0.5, rows=100, statements=1))
+    sink.emit(StageMetric("fact_load", 1.5, rows=300, statements=1))
+
+    sink.close()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert "# TYPE ir_ingestion_stage_seconds summary" in lines
+    assert (
+        'ir_ingestion_stage_seconds{stage="fact_load",quantile="0.5"} 1.000000' in lines
+    )
+    assert 'ir_ingestion_stage_seconds_sum{stage="fact_load"} 2.000000' in lines
+    assert 'ir_ingestion_stage_seconds_count{stage="fact_load"} 2' in lines
+    assert 'ir_ingestion_stage_rows_total{stage="fact_load"} 400' in lines
+    assert 'ir_ingestion_stage_sql_statements_total{stage="fact_load"} 2' in lines
+
+
+def test_prometheus_sink_serves_metrics_over_http():
+    sink = PrometheusMetricsSink(port=0)
+    try:
+        sink.emit(StageMetric("decode", 0.1, rows=5))
+        host, port = sink.server_address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            body = response.read().decode("utf-8")
+    finally:
+        sink.close()
+
+    assert 'ir_ingestion_stage_rows_total{stage="decode"} 5' in body
@@ -0,0 +1,61 @@
+"""
+utilsパッケージの遅延インポートをテストします。
+
+インポート時間の退行を防ぐため、別プロセスで`import utils`を実行し、
+重い依存ライブラリが読み込まれていないことを確認します。
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import utils
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["pandas", "numpy", "sqlalchemy", "requests", "chardet"]
+
+
+def _loaded_modules(statement: str) -> set[str]:
+    """新しいインタプリタで`statement`を実行し、読み込まれたモジュール名を返す。"""
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys; {statement}; print('\\n'.join(sys.modules))",
+        ],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(completed.stdout.split())
+
+
+@pytest.mark.parametrize("statement", ["import utils", "import utils.parser"])
+def test_import_does_not_load_heavy_dependencies(statement):
+    loaded = _loaded_modules(statement)
+
+    assert [module for module in HEAVY_MODULES if module in loaded] == []
+    assert "utils.service.financial_service" not in loaded
+    assert "utils.api" not in loaded
+
+
+def test_public_names_are_loaded_on_first_access():
+    loaded = _loaded_modules("import utils; utils.ConfigLoader")
+
+    assert "utils.config_loader" in loaded
+    assert "sqlalchemy" not in loaded
+
+
+def test_all_public_names_resolve():
+    for name in utils.__all__:
+        assert getattr(utils, name) is not None
+    assert utils.data_mapper.__name__ == "utils.data_mapper"
+    assert set(utils.__all__) <= set(dir(utils))
+
+
+def test_unknown_attribute_raises_attribute_error():
+    with pytest.raises(AttributeError):
+        utils.NotExported  # noqa: B018
@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+from utils import parser
+
+PERIOD_CONTENTS = [
+    "第121期 第３四半期(自  2023年10月１日  至  2023年12月31日)",
+    "第52期第１四半期(自  令和５年10月21日  至  令和６年１月20日)",
+    "第10期第二四半期(自  令和元年５月１日  至  令和元年７月31日)",
+    "2025年3月期第3四半期",
+    "第5四半期 1800年",
+    "期間情報なし",
+]
+
+
+@pytest.mark.parametrize(
+    "content, expected_fiscal_year, expected_quarter_type",
+    [
+        (PERIOD_CONTENTS[0], "2023", "Q3"),
+        (PERIOD_CONTENTS[1], "2024", "Q1"),
+        (PERIOD_CONTENTS[2], "2019", "Q2"),
+        (PERIOD_CONTENTS[3], "2025", "Q3"),
+        (PERIOD_CONTENTS[4], None, None),
+        (PERIOD_CONTENTS[5], None, None),
+    ],
+)
+def test_extract_fiscal_year_and_quarter_type(
+    content, expected_fiscal_year, expected_quarter_type
+):
+    """
+    正常系: 西暦・和暦の日付範囲と4桁の年から会計年度を、四半期の表記から四半期を抽出する。
+    """
+    assert parser.extract_fiscal_year(content) == expected_fiscal_year
+    assert parser.extract_quarter_type(content) == expected_quarter_type
+
+
+def test_extract_memoizes_and_still_logs_failures(caplog):
+    """
+    正常系: 同じ文字列の解析結果はメモ化され、失敗のログは呼び出しごとに出力される。
+    """
+    parser._parse_fiscal_year.cache_clear()
+    for _ in range(3):
+        parser.extract_fiscal_year(PERIOD_CONTENTS[0])
+        parser.extract_fiscal_year(PERIOD_CONTENTS[5])
+
+    cache_info = parser._parse_fiscal_year.cache_info()
+    assert (cache_info.hits, cache_info.misses) == (4, 2)
+    assert caplog.text.count("会計年度の抽出に失敗しました") == 3
+
+
+def test_batch_extraction_matches_scalar_functions():
+    """
+    正常系: Seriesのバッチ版が、要素ごとに単体の関数を呼び出した結果と一致する。
+    """
+    contents = pd.Series(PERIOD_CONTENTS * 2 + [None], index=range(100, 113))
+
+    fiscal_years = parser.extract_fiscal_years(contents)
+    quarter_types = parser.extract_quarter_types(contents)
+
+    expected_contents = contents.iloc[:-1]
+    assert fiscal_years.index.equals(contents.index)
+    assert fiscal_years.iloc[:-1].tolist() == [
+        parser.extract_fiscal_year(content) for content in expected_contents
+    ]
+    assert quarter_types.iloc[:-1].tolist() == [
+        parser.extract_quarter_type(content) for content in expected_contents
+    ]
+    # 欠損値は抽出失敗としてNoneになる
+    assert fiscal_years.iloc[-1] is None
+    assert quarter_types.iloc[-1] is None
+
+
+def test_parse_context_id():
+    """
+    正常系: コンテキストIDを相対期間・期間/時点・メンバーに分解する。
+    """
+    assert parser.parse_context_id("CurrentYTDDuration_NonConsolidatedMember") == {
+        "relative_period": "CurrentYTD",
+        "duration_type": "Duration",
+        "member": "NonConsolidatedMember",
+    }
+    assert parser.parse_context_id("FilingDateInstant") == {
+        "relative_period": "FilingDate",
+        "duration_type": "Instant",
+        "member": None,
+    }
+    assert parser.parse_context_id(None) == {
+        "relative_period": None,
+        "duration_type": "Instant",
+        "member": None,
+    }
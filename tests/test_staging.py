@@ -0,0 +1,64 @@
+"""
+utils.stagingのParquetステージングをテストします。
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils import data_mapper
+from utils.decoding import content_hash, read_edinet_csv
+from utils.staging import StagingStore
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_CSV = next((PROJECT_ROOT / "download").glob("S100SSHR/XBRL_TO_CSV/*.csv"))
+
+
+def _standardized_sample() -> tuple[str, pd.DataFrame]:
+    raw_data = SAMPLE_CSV.read_bytes()
+    return content_hash(raw_data), data_mapper.standardize_raw_data(
+        read_edinet_csv(raw_data)
+    )
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    file_hash, standardized_df = _standardized_sample()
+    store = StagingStore(str(tmp_path))
+
+    assert store.load(file_hash) is None
+    path = store.save(file_hash, standardized_df)
+    loaded_df = store.load(file_hash)
+
+    assert store.exists(file_hash)
+    assert list(loaded_df.columns) == list(standardized_df.columns)
+    assert list(loaded_df.dtypes) == list(standardized_df.dtypes)
+    assert loaded_df["element_id"].tolist() == standardized_df["element_id"].tolist()
+    assert loaded_df["value"].equals(standardized_df["value"])
+    assert loaded_df["value_text"].isna().tolist() == (
+        standardized_df["value_text"].isna().tolist()
+    )
+    # 元のUTF-16のCSVより小さく保存されること
+    assert Path(path).stat().st_size < SAMPLE_CSV.stat().st_size
+
+
+def test_string_columns_are_dictionary_encoded(tmp_path):
+    file_hash, standardized_df = _standardized_sample()
+    path = StagingStore(str(tmp_path)).save(file_hash, standardized_df)
+
+    metadata = pq.ParquetFile(path).metadata.row_group(0)
+    columns = {
+        metadata.column(i).path_in_schema: metadata.column(i)
+        for i in range(metadata.num_columns)
+    }
+    assert "RLE_DICTIONARY" in columns["element_id"].encodings
+    assert columns["element_id"].compression == "ZSTD"
+
+
+def test_unreadable_file_is_treated_as_missing(tmp_path):
+    store = StagingStore(str(tmp_path))
+    path = Path(store.path_for("ab" * 32))
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"not a parquet file")
+
+    assert store.load("ab" * 32) is None
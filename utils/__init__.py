@@ -10,26 +10,88 @@ IRAnalysesプロジェクト
 - parser: テキスト解析のヘルパーモジュール
 - api: EDINET APIを利用した財務データ取得・処理
 - config_loader: 設定ファイルを読み込むローダー
+
+`__all__`の名前は初めてアクセスした時点で読み込みます（遅延インポート）。
+`import utils.parser`などサブモジュールのみを使う場合は、pandasやSQLAlchemyを読み込みません。
 """
 
 __version__ = "1.0.0"
 __author__ = "IR Analyses Project"
 
-# --- Service Layer ---
-from .service.financial_service import FinancialService, FinancialSummaryDTO
-from .service.unitofwork import UnitOfWork, SqlAlchemyUnitOfWork
+import importlib
+from typing import TYPE_CHECKING
+
+# 公開する名前と、定義しているモジュール（パッケージからの相対名）の対応。
+# pandasやSQLAlchemyなど重い依存を持つモジュールは、名前に初めてアクセスした時点で
+# 読み込む。`import utils.parser`のようにサブモジュールだけを使う場合や、
+# プロセスプールのワーカーの起動時に、サービス層やAPIクライアントを読み込まない。
+_LAZY_ATTRIBUTES = {
+    # --- Service Layer ---
+    "FinancialService": ".service.financial_service",
+    "FinancialSummaryDTO": ".service.financial_service",
+    "UnitOfWork": ".service.unitofwork",
+    "SqlAlchemyUnitOfWork": ".service.unitofwork",
+    # --- Configuration ---
+    "ConfigLoader": ".config_loader",
+    # --- Database Models ---
+    "Base": ".db_models",
+    "Company": ".db_models",
+    "Financial_report": ".db_models",
+    "Financial_item": ".db_models",
+    "Financial_context": ".db_models",
+    "Financial_data": ".db_models",
+    "Ingestion_ledger": ".db_models",
+    "Report_metrics": ".db_models",
+    # --- EDINET API ---
+    "get_company_list": ".api",
+    "get_company_lists": ".api",
+    "fetch_single_company_dataframe": ".api",
+    "get_doc_id": ".api",
+}
+
+# 属性として公開するサブモジュール
+_LAZY_SUBMODULES = {"data_mapper"}
+
+if TYPE_CHECKING:
+    from . import data_mapper
+    from .api import (
+        fetch_single_company_dataframe,
+        get_company_list,
+        get_company_lists,
+        get_doc_id,
+    )
+    from .config_loader import ConfigLoader
+    from .db_models import (
+        Base,
+        Company,
+        Financial_context,
+        Financial_data,
+        Financial_item,
+        Financial_report,
+        Ingestion_ledger,
+        Report_metrics,
+    )
+    from .service.financial_service import FinancialService, FinancialSummaryDTO
+    from .service.unitofwork import SqlAlchemyUnitOfWork, UnitOfWork
+
 
-# --- Configuration ---
-from .config_loader import ConfigLoader
+def __getattr__(name: str):
+    """`__all__`の名前に初めてアクセスした時点で、定義元のモジュールを読み込む。"""
+    if name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    elif name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # 2回目以降は__getattr__を経由しないよう、パッケージの属性としてキャッシュする
+    globals()[name] = value
+    return value
 
-# --- Data Mapper ---
-from . import data_mapper 
 
-# --- Database Models ---
-from .db_models import Base, Company, Financial_report, Financial_item, Financial_data
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
 
-# --- EDINET API ---
-from .api import get_company_list, fetch_single_company_dataframe, get_doc_id
 
 # パッケージから公開するオブジェクトを__all__で定義
 __all__ = [
@@ -47,9 +109,13 @@ __all__ = [
     "Company",
     "Financial_report",
     "Financial_item",
+    "Financial_context",
     "Financial_data",
+    "Ingestion_ledger",
+    "Report_metrics",
     # api
     "get_company_list",
+    "get_company_lists",
     "fetch_single_company_dataframe",
     "get_doc_id",
 ]
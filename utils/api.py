@@ -3,15 +3,85 @@
 import io
 import logging
 import os
+import threading
+import time
 import zipfile
-import glob
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+from urllib.parse import urlparse
 
-import chardet
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+
+from utils.decoding import read_edinet_csv
+from utils.document_cache import DocumentCache
+from utils.metrics import MetricsRecorder
 
 logger = logging.getLogger(__name__)
 
+# `[edinetapi]`に設定がない場合の同時ダウンロード数と、ホストごとの秒間リクエスト数
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_RATE_LIMIT_PER_SECOND = 2.0
+
+
+class RateLimiter:
+    """ホストごとにリクエストの最小間隔を保証する、スレッドセーフなレートリミッター。
+
+    Args:
+        requests_per_second (float): ホストごとの秒間最大リクエスト数。
+            0以下の場合は制限しない。
+    """
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_allowed: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        """URLのホストに対して、次のリクエストが許可される時刻まで待機する。"""
+        if self.interval <= 0:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+def create_http_session(config: dict) -> requests.Session:
+    """EDINET API用に、接続を再利用するプール付きのHTTPセッションを作成する。
+
+    プールサイズは`[edinetapi]`の`MAX_CONCURRENCY`に合わせます。
+
+    Args:
+        config (dict): `config.toml`の内容。
+
+    Returns:
+        requests.Session: スレッド間で共有可能なHTTPセッション。
+    """
+    max_concurrency = int(
+        config.get("edinetapi", {}).get("MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_concurrency)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def create_rate_limiter(config: dict) -> RateLimiter:
+    """`[edinetapi]`の`RATE_LIMIT_PER_SECOND`からレートリミッターを作成する。"""
+    requests_per_second = float(
+        config.get("edinetapi", {}).get(
+            "RATE_LIMIT_PER_SECOND", DEFAULT_RATE_LIMIT_PER_SECOND
+        )
+    )
+    return RateLimiter(requests_per_second)
+
 
 def get_api_key():
     """
@@ -42,18 +112,45 @@ def get_doc_id(sd_df: pd.DataFrame, company_name: str) -> str:
     return doc_id
 
 
-def get_company_list(submiting_date: str, config: dict) -> pd.DataFrame | None:
+def iter_submit_dates(start_date: str, end_date: str | None = None) -> list[str]:
     """
-    財務データの取得したい日付を受取り、その日付に提出された会社名を含むデータフレームを返却する
+    開始日から終了日まで（両端を含む）の提出日を`YYYY-MM-DD`形式で返却する。
 
-    submiting_date: str fmt:yyyy-mm-dd
+    Args:
+        start_date (str): 開始日（YYYY-MM-DD）。
+        end_date (str, optional): 終了日（YYYY-MM-DD）。省略時は開始日の1日のみ。
 
-    return: pd.DataFrame or none
+    Returns:
+        list[str]: 提出日の一覧。
+
+    Raises:
+        ValueError: 日付の形式が不正な場合、または終了日が開始日より前の場合。
     """
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date) if end_date is not None else start
+    if end < start:
+        raise ValueError(f"終了日({end_date})が開始日({start_date})より前です")
+    return [
+        (start + timedelta(days=offset)).isoformat()
+        for offset in range((end - start).days + 1)
+    ]
+
+
+def _request_document_list(
+    submiting_date: str,
+    config: dict,
+    session: requests.Session | None = None,
+    rate_limiter: RateLimiter | None = None,
+) -> dict | None:
+    """EDINETの「書類一覧API」から指定日の書類一覧（JSON）を取得する。"""
+    http = session if session is not None else requests
     try:
         API_ENDPOINT = config.get("edinetapi", {}).get("API_ENDPOINT")
-        response = requests.get(
-            f"{API_ENDPOINT}/documents.json",
+        url = f"{API_ENDPOINT}/documents.json"
+        if rate_limiter is not None:
+            rate_limiter.wait(url)
+        response = http.get(
+            url,
             params={
                 "date": submiting_date,
                 "type": 2,
@@ -62,7 +159,7 @@ def get_company_list(submiting_date: str, config: dict) -> pd.DataFrame | None:
             timeout=30,
         )
         response.raise_for_status()
-        docs_submitted_json = response.json()
+        return response.json()
     except requests.exceptions.RequestException as e:
         if e.response is not None:
             logger.error(
@@ -75,9 +172,46 @@ def get_company_list(submiting_date: str, config: dict) -> pd.DataFrame | None:
             logger.error("APIリクエストでエラー: %s", e)
         return None
 
+
+def get_company_list(
+    submiting_date: str,
+    config: dict,
+    session: requests.Session | None = None,
+    rate_limiter: RateLimiter | None = None,
+    cache: DocumentCache | None = None,
+) -> pd.DataFrame | None:
+    """
+    財務データの取得したい日付を受取り、その日付に提出された会社名を含むデータフレームを返却する
+
+    `cache`が指定された場合、書類一覧は提出日ごとにキャッシュされ、2回目以降はHTTP通信を
+    行いません。当日以降の書類一覧は今後も追加されるため、キャッシュしません。
+
+    submiting_date: str fmt:yyyy-mm-dd
+
+    return: pd.DataFrame or none
+    """
+    docs_submitted_json = None
+    if cache is not None:
+        docs_submitted_json = cache.get_document_list(submiting_date)
+    if docs_submitted_json is None:
+        docs_submitted_json = _request_document_list(
+            submiting_date, config, session, rate_limiter
+        )
+        if docs_submitted_json is None:
+            return None
+        if (
+            cache is not None
+            and "results" in docs_submitted_json
+            and date.fromisoformat(submiting_date) < date.today()
+        ):
+            cache.put_document_list(submiting_date, docs_submitted_json)
+
     try:
         if "results" in docs_submitted_json:
             sd_df = pd.DataFrame(docs_submitted_json["results"])
+            if sd_df.empty:
+                # 土日祝日など、提出書類がない日
+                return sd_df
             sd_df = sd_df[
                 sd_df["docDescription"].str.contains("四半期報告書", na=False)
             ]
@@ -93,47 +227,288 @@ def get_company_list(submiting_date: str, config: dict) -> pd.DataFrame | None:
         return None
 
 
-def fetch_single_company_dataframe(doc_id: str, config: dict) -> pd.DataFrame:
+def get_company_lists(
+    start_date: str,
+    end_date: str | None,
+    config: dict,
+    cache: DocumentCache | None = None,
+    max_concurrency: int | None = None,
+) -> pd.DataFrame:
+    """
+    期間内の各提出日の書類一覧を並行して取得し、docIDで重複を除いて1つにまとめる。
+
+    共有のプール付きHTTPセッションを使い、`[edinetapi]`の`MAX_CONCURRENCY`件まで
+    同時に取得します。リクエストは`RATE_LIMIT_PER_SECOND`に従い間隔を空けて送信されます。
+
+    Args:
+        start_date (str): 開始日（YYYY-MM-DD）。
+        end_date (str, optional): 終了日（YYYY-MM-DD）。省略時は開始日の1日のみ。
+        config (dict): `config.toml`の内容。
+        cache (DocumentCache, optional): 書類一覧を提出日ごとに保存するキャッシュ。
+        max_concurrency (int, optional): 同時リクエスト数。省略時は設定値を使用する。
+
+    Returns:
+        pd.DataFrame: 期間内に提出された四半期報告書の一覧。取得できなかった日は含まない。
+    """
+    submit_dates = iter_submit_dates(start_date, end_date)
+    if max_concurrency is None:
+        max_concurrency = int(
+            config.get("edinetapi", {}).get("MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+        )
+    rate_limiter = create_rate_limiter(config)
+
+    with (
+        create_http_session(config) as session,
+        ThreadPoolExecutor(max_workers=max(max_concurrency, 1)) as executor,
+    ):
+        company_lists = list(
+            executor.map(
+                lambda submit_date: get_company_list(
+                    submit_date, config, session, rate_limiter, cache
+                ),
+                submit_dates,
+            )
+        )
+
+    failed_dates = [
+        submit_date
+        for submit_date, company_df in zip(submit_dates, company_lists)
+        if company_df is None
+    ]
+    if failed_dates:
+        logger.error("書類一覧を取得できなかった日付があります: %s", failed_dates)
+
+    frames = [
+        company_df
+        for company_df in company_lists
+        if company_df is not None and not company_df.empty
+    ]
+    if not frames:
+        return pd.DataFrame(columns=["docID", "filerName"])
+    return pd.concat(frames, ignore_index=True).drop_duplicates(
+        subset="docID", keep="first", ignore_index=True
+    )
+
+
+def read_document_zip(
+    zip_content: bytes, archive_dir: str | None = None
+) -> pd.DataFrame | None:
+    """
+    書類取得APIのZIPから`XBRL_TO_CSV/jpcrp*.csv`をメモリ上で直接DataFrameに変換する。
+
+    ZIPの展開やファイルの再検索は行わず、メモリ上のZIPメンバーのバイト列を
+    `read_edinet_csv`で文字コード判定とCSV読み込みの両方に使い回します。`archive_dir`が指定された
+    場合のみ、CSVを`{archive_dir}/XBRL_TO_CSV/`に1回だけ書き出します。
+
+    Args:
+        zip_content (bytes): 書類取得APIのレスポンスボディ（ZIP）。
+        archive_dir (str, optional): CSVを保存するディレクトリ。Noneの場合は保存しない。
+
+    Returns:
+        pd.DataFrame | None: CSVのDataFrame。対象のCSVがZIPに含まれない場合はNone。
+
+    Raises:
+        zipfile.BadZipFile: `zip_content`がZIPとして不正な場合。
+    """
+    with zipfile.ZipFile(io.BytesIO(zip_content)) as z:
+        # TODO 現在は四半期報告書のみに対応、将来的に有価証券報告書にも対応させたい
+        member = next(
+            (
+                name
+                for name in z.namelist()
+                if name.startswith("XBRL_TO_CSV/jpcrp") and name.endswith(".csv")
+            ),
+            None,
+        )
+        if member is None:
+            return None
+        raw_data = z.read(member)
+
+    if archive_dir is not None:
+        archive_path = os.path.join(archive_dir, member)
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+        with open(archive_path, "wb") as f:
+            f.write(raw_data)
+        logger.info("ファイルを保存しました。:%s", archive_path)
+
+    return read_edinet_csv(raw_data)
+
+
+def _read_document_zip_with_metrics(
+    metrics: MetricsRecorder,
+    doc_id: str,
+    zip_content: bytes,
+    archive_dir: str | None,
+) -> pd.DataFrame | None:
+    """`read_document_zip`の処理時間と読み込んだ行数を、decodeステージとして計測する。"""
+    with metrics.stage("decode", doc_id=doc_id) as stage:
+        company_df = read_document_zip(zip_content, archive_dir)
+        stage.rows = len(company_df) if company_df is not None else 0
+    return company_df
+
+
+def fetch_single_company_dataframe(
+    doc_id: str,
+    config: dict,
+    session: requests.Session | None = None,
+    rate_limiter: RateLimiter | None = None,
+    archive: bool | None = None,
+    cache: DocumentCache | None = None,
+    refresh: bool = False,
+    metrics: MetricsRecorder | None = None,
+) -> pd.DataFrame | None:
+    """
+    docIDに対応する書類をEDINETの「書類取得API」からダウンロードし、DataFrameで返却する。
+
+    ZIPはメモリ上で直接DataFrameに変換します（`read_document_zip`）。
+    `cache`が指定された場合、キャッシュ済みの書類はHTTP通信なしでディスクから読み込み、
+    新たにダウンロードした書類はキャッシュに保存します。
+
+    Args:
+        doc_id (str): EDINETの書類ID。
+        config (dict): `config.toml`の内容。
+        session (requests.Session, optional): 共有するHTTPセッション。
+            省略時はリクエストごとに新規接続する。
+        rate_limiter (RateLimiter, optional): リクエスト前に待機するレートリミッター。
+        archive (bool, optional): CSVを`download/{doc_id}`に保存するかどうか。
+            省略時は`[edinetapi]`の`ARCHIVE_DOWNLOADS`（既定値True）に従う。
+        cache (DocumentCache, optional): 書類ZIPのローカルキャッシュ。
+        refresh (bool): Trueの場合はキャッシュを読まずに再ダウンロードし、キャッシュを更新する。
+        metrics (MetricsRecorder, optional): ダウンロード（download）と
+            CSVの読み込み（decode）の処理時間の計測先。
+
+    Returns:
+        pd.DataFrame | None: 書類に含まれるCSVのDataFrame。取得できなかった場合はNone。
+    """
+    if metrics is None:
+        metrics = MetricsRecorder()
+    edinet_config = config.get("edinetapi", {})
+    if archive is None:
+        archive = bool(edinet_config.get("ARCHIVE_DOWNLOADS", True))
+    archive_dir = f"download/{doc_id}" if archive else None
+    http = session if session is not None else requests
+
+    cached_content = None
+    if cache is not None and not refresh:
+        cached_content = cache.get(doc_id)
+    if cached_content is not None:
+        try:
+            company_financial_dataframe = _read_document_zip_with_metrics(
+                metrics, doc_id, cached_content, archive_dir
+            )
+        except zipfile.BadZipFile as e:
+            logger.error("キャッシュのZIPファイルの処理中にエラーが発生しました: %s", e)
+            return None
+        if company_financial_dataframe is None:
+            logger.error("CSVファイルが見つかりません: %s", doc_id)
+        return company_financial_dataframe
+
     try:
-        API_DOWNLOAD = config.get("edinetapi", {}).get("API_DOWNLOAD")
+        API_DOWNLOAD = edinet_config.get("API_DOWNLOAD")
         url = f"{API_DOWNLOAD}/documents/{doc_id}"
         logger.info(url)
+        if rate_limiter is not None:
+            rate_limiter.wait(url)
         # EDINETの「書類取得API」に接続
-        respose = requests.get(
-            url,
-            {
-                "type": 5,  # 5:csv 2:pdfファイル
-                "Subscription-Key": get_api_key(),
-            },
-            timeout=30,
-        )
-
-        # csvファイルをzipで送られてくるので、会社毎にファイルを作成して配置
+        with metrics.stage("download", doc_id=doc_id):
+            respose = http.get(
+                url,
+                params={
+                    "type": 5,  # 5:csv 2:pdfファイル
+                    "Subscription-Key": get_api_key(),
+                },
+                timeout=30,
+            )
+            respose.raise_for_status()
         logger.info(respose)
-        with zipfile.ZipFile(io.BytesIO(respose.content)) as z:
-            for file in z.namelist():
-                # TODO 現在は四半期報告書のみに対応、将来的に有価証券報告書にも対応させたい
-                if file.startswith("XBRL_TO_CSV/jpcrp") and file.endswith(".csv"):
-                    z.extract(file, path=f"download/{doc_id}")
-                    logger.info("ファイルをダウンロードしました。:%s", doc_id)
+
+        # csvファイルをzipで送られてくるので、メモリ上で直接DataFrameに変換
+        company_financial_dataframe = _read_document_zip_with_metrics(
+            metrics, doc_id, respose.content, archive_dir
+        )
+        if cache is not None:
+            cache.put(doc_id, respose.content)
     except requests.exceptions.RequestException as e:
         logger.error("リクエスト中にエラーが発生しました: %s", e)
+        return None
     except zipfile.BadZipFile as e:
         logger.error("ZIPファイルの処理中にエラーが発生しました: %s", e)
+        return None
 
-    csvfile = glob.glob(f"download/{doc_id}/XBRL_TO_CSV/*.csv")
-    if not csvfile:
+    if company_financial_dataframe is None:
         logger.error("CSVファイルが見つかりません: %s", doc_id)
-    csv_file_path = csvfile[0]
-    logger.info(csv_file_path)
-    with open(csv_file_path, "rb") as f:
-        raw_data = f.read()
-        result = chardet.detect(raw_data)
-        encoding = result["encoding"]
-        logger.info("Detected encoding: %s", encoding)
-
-        company_financial_dataframe = pd.read_csv(
-            csv_file_path, encoding=encoding, delimiter="\t"
+    return company_financial_dataframe
+
+
+def fetch_company_dataframes(
+    doc_ids: Iterable[str],
+    config: dict,
+    max_concurrency: int | None = None,
+    cache: DocumentCache | None = None,
+    refresh: bool = False,
+    metrics: MetricsRecorder | None = None,
+) -> Iterator[tuple[str, pd.DataFrame | None]]:
+    """
+    複数のdocIDの書類を並行してダウンロードし、完了した順にDataFrameを返すジェネレーター。
+
+    共有のプール付きHTTPセッションを使い、`[edinetapi]`の`MAX_CONCURRENCY`件まで
+    同時にダウンロードします。リクエストは`RATE_LIMIT_PER_SECOND`に従いホストごとに
+    間隔を空けて送信されます。呼び出し側が1件を処理している間も後続のダウンロードは
+    継続するため、ダウンロードとDB登録などの後続処理を重ねて実行できます。
+    未処理の結果が溜まり過ぎないよう、同時に保持する件数は並行数の2倍までです。
+
+    Args:
+        doc_ids (Iterable[str]): ダウンロードするdocIDの一覧。
+        config (dict): `config.toml`の内容。
+        max_concurrency (int, optional): 同時ダウンロード数。省略時は設定値を使用する。
+        cache (DocumentCache, optional): 書類ZIPのローカルキャッシュ。
+        refresh (bool): Trueの場合はキャッシュを読まずに再ダウンロードする。
+        metrics (MetricsRecorder, optional): ダウンロードとCSVの読み込みの処理時間の計測先。
+
+    Yields:
+        tuple[str, pd.DataFrame | None]: docIDと、取得したDataFrame（失敗時はNone）。
+    """
+    if max_concurrency is None:
+        max_concurrency = int(
+            config.get("edinetapi", {}).get("MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
         )
+    max_concurrency = max(max_concurrency, 1)
+    rate_limiter = create_rate_limiter(config)
+    doc_id_iterator = iter(doc_ids)
 
-    return company_financial_dataframe
+    with (
+        create_http_session(config) as session,
+        ThreadPoolExecutor(max_workers=max_concurrency) as executor,
+    ):
+        pending: dict[Future, str] = {}
+
+        def submit_next() -> None:
+            doc_id = next(doc_id_iterator, None)
+            if doc_id is not None:
+                future = executor.submit(
+                    fetch_single_company_dataframe,
+                    doc_id,
+                    config,
+                    session,
+                    rate_limiter,
+                    cache=cache,
+                    refresh=refresh,
+                    metrics=metrics,
+                )
+                pending[future] = doc_id
+
+        for _ in range(max_concurrency * 2):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                doc_id = pending.pop(future)
+                try:
+                    company_df = future.result()
+                except Exception:
+                    # 1件の失敗で後続の書類の取得を止めず、スタックトレースを残す
+                    logger.exception("書類の取得中にエラーが発生しました(%s)", doc_id)
+                    company_df = None
+                submit_next()
+                yield doc_id, company_df
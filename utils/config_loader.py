@@ -1,60 +1,166 @@
+"""
+設定ファイル（config.toml）を読み込むローダー。
+
+読み込んだ設定はプロセス内でキャッシュし、ファイルの更新時刻（mtime）が
+変わった場合のみ再読み込みします。Streamlitの再実行や、書類ごとに設定を参照する
+取り込み処理でも、TOMLの解析は設定ファイルが更新されたときの1回で済みます。
+
+`[xbrl_mapping]`の各セクションは、読み込み時に`XbrlMapping`（キーと要素IDの
+組の一覧と、参照する全要素IDの集合）に変換して保持します。
+
+Example:
+    config_loader = ConfigLoader()
+    config = config_loader.config
+    mapping = config_loader.xbrl_mapping
+"""
+
+import copy
+import logging
 import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+
 import toml
-import logging
 
 logger = logging.getLogger(__name__)
 
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 既定の設定ファイルの候補。Dockerのアプリイメージでは/config/に配置される
+DEFAULT_CONFIG_PATHS = (
+    os.path.join(_PROJECT_ROOT, "config", "config.toml"),
+    "/config/config.toml",
+)
+
+
+@dataclass(frozen=True)
+class XbrlMapping:
+    """`[xbrl_mapping]`を参照しやすい形に変換した、読み取り専用のマッピング定義
+
+    Attributes:
+        sections: セクション名をキー、`(キー, 要素ID)`の組のタプルを値とする辞書。
+        element_ids: 全セクションで参照する要素IDの集合。
+    """
+
+    sections: dict[str, tuple[tuple[str, str], ...]]
+    element_ids: frozenset[str]
+
+    def section(self, name: str) -> dict[str, str] | None:
+        """セクションを`{キー: 要素ID}`の辞書で返す。セクションがない場合はNone。"""
+        items = self.sections.get(name)
+        return dict(items) if items is not None else None
+
+
+@lru_cache(maxsize=32)
+def _compile_xbrl_mapping(
+    sections: tuple[tuple[str, tuple[tuple[str, str], ...]], ...],
+) -> XbrlMapping:
+    return XbrlMapping(
+        sections=dict(sections),
+        element_ids=frozenset(
+            element_id for _, items in sections for _, element_id in items
+        ),
+    )
+
+
+def compile_xbrl_mapping(config: dict) -> XbrlMapping:
+    """設定の`[xbrl_mapping]`を`XbrlMapping`に変換する。
+
+    同じ内容のマッピング定義に対しては、変換済みの`XbrlMapping`を返します。
+    テストなどで設定の辞書を書き換えた場合も、書き換え後の内容で変換します。
+    """
+    xbrl_mapping = config.get("xbrl_mapping", {})
+    return _compile_xbrl_mapping(
+        tuple(
+            (name, tuple(section.items()))
+            for name, section in xbrl_mapping.items()
+            if isinstance(section, dict)
+        )
+    )
+
+
+@dataclass(frozen=True)
+class _CachedConfig:
+    mtime_ns: int
+    config: dict
+    xbrl_mapping: XbrlMapping
+
+
+_cache: dict[str, _CachedConfig] = {}
+_cache_lock = threading.Lock()
+
+
+def _load_cached(config_path: str) -> _CachedConfig | None:
+    """設定ファイルをmtimeが変わった場合のみ読み込み、キャッシュを返す。
+
+    Returns:
+        _CachedConfig | None: 読み込んだ設定。ファイルがない、または読み込みに失敗した場合はNone。
+    """
+    try:
+        mtime_ns = os.stat(config_path).st_mtime_ns
+    except OSError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(config_path)
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            return cached
+        try:
+            config_data = toml.load(config_path)
+        except (OSError, toml.TomlDecodeError) as e:
+            logger.error(
+                "設定ファイルの読み込みに失敗しました: %s, エラー: %s",
+                config_path,
+                e,
+            )
+            return None
+        cached = _CachedConfig(mtime_ns, config_data, compile_xbrl_mapping(config_data))
+        _cache[config_path] = cached
+        logger.info("設定ファイルを読み込みました: %s", config_path)
+        return cached
+
+
+def clear_config_cache() -> None:
+    """プロセス内の設定のキャッシュを破棄する。"""
+    with _cache_lock:
+        _cache.clear()
+
 
 class ConfigLoader:
-    def __init__(self, path: str = None):
-        self.config = self._load_config(path)
+    """設定ファイル（config.toml）を、プロセス内のキャッシュを通じて読み込む。
+
+    `config`はインスタンスごとの複製のため、呼び出し側で書き換えても
+    キャッシュや他のインスタンスには影響しません。
 
-    def _load_config(self, path: str = None):
+    Args:
+        path (str, optional): 読み込む設定ファイルのパス。省略時は`DEFAULT_CONFIG_PATHS`。
+    """
+
+    def __init__(self, path: str | None = None):
+        cached = self._load_cached(path)
+        self.config = copy.deepcopy(cached.config) if cached is not None else {}
+        self.xbrl_mapping = (
+            cached.xbrl_mapping if cached is not None else compile_xbrl_mapping({})
+        )
+
+    def _load_cached(self, path: str | None = None) -> _CachedConfig | None:
         """
-        設定ファイル（config.toml）を読み込む。
+        設定ファイル（config.toml）をキャッシュから取得する。
 
         テスト時など、特定のパスから読み込みたい場合はpath引数を指定する。
         指定しない場合は、このファイルの位置を基準にプロジェクトルートを特定し、
         `config/config.toml` を読み込む。
 
         Args:
-            path (str, optional): 読み込む設定ファイルの絶対パス. Defaults to None.
+            path (str, optional): 読み込む設定ファイルのパス. Defaults to None.
 
         Returns:
-            dict: 設定ファイルの内容。読み込みに失敗した場合は空の辞書。
+            _CachedConfig | None: 設定ファイルの内容。読み込みに失敗した場合はNone。
         """
-
-        paths_to_check = []
-        if path:
-            # テスト時など、特定のパスが指定された場合
-            paths_to_check.append(path)
-        else:
-            # 通常実行時：このファイルの場所を基準にパスを解決
-            try:
-                current_file_path = os.path.abspath(__file__)
-                utils_dir = os.path.dirname(current_file_path)
-                project_root = os.path.dirname(utils_dir)
-                default_config_path = os.path.join(
-                    project_root, "config", "config.toml"
-                )
-                paths_to_check.append(default_config_path)
-            except NameError:
-                # 対話モードなどで __file__ が未定義の場合のフォールバック
-                paths_to_check.append("./config/config.toml")
-
+        paths_to_check = [path] if path else DEFAULT_CONFIG_PATHS
         for config_path in paths_to_check:
-            if os.path.exists(config_path):
-                try:
-                    config_data = toml.load(config_path)
-                    logger.info("設定ファイルを読み込みました: %s", config_path)
-                    return config_data  # ★成功したら即座に返す
-                except Exception as e:
-                    logger.error(
-                        "設定ファイルの読み込みに失敗しました: %s, エラー: %s",
-                        config_path,
-                        e,
-                    )
-                    continue  # 次の候補パスへ
+            cached = _load_cached(os.path.abspath(config_path))
+            if cached is not None:
+                return cached
 
         logger.warning("有効な設定ファイルが見つかりませんでした。")
-        return {}  # すべての候補で見つからなかった場合
+        return None
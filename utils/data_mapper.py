@@ -4,6 +4,7 @@ import pandas as pd
 import numpy as np
 
 import utils.parser as parser
+from utils.config_loader import compile_xbrl_mapping
 
 logger = logging.getLogger(__name__)
 
@@ -52,8 +53,100 @@ def standardize_raw_data(df: pd.DataFrame) -> pd.DataFrame:
     return df_processed
 
 
+class ElementIndex:
+    """
+    標準化済みDataFrameの要素IDから対象行を引くためのインデックス。
+
+    `standardize_raw_data`で標準化したDataFrameごとに一度だけ構築し、
+    `element_id`（および`context_id`）から行位置をO(1)で特定します。
+    `[xbrl_mapping]`の各セクションは`resolve`で全キーを一括で解決できるため、
+    キーごとにDataFrame全体を走査する必要がなくなります。
+
+    Args:
+        source_df (pd.DataFrame): `standardize_raw_data`で標準化済みのDataFrame。
+            `element_id`, `value`, `value_text`, `is_numeric`カラムが必須。
+            `context_id`カラムは存在する場合のみ絞り込みに使用します。
+
+    Raises:
+        KeyError: `source_df`に必須カラムが欠損している場合。
+
+    Example:
+        element_index = ElementIndex(standardized_df)
+        company_data = element_index.resolve(config["xbrl_mapping"]["company"])
+    """
+
+    def __init__(self, source_df: pd.DataFrame):
+        # element_id(, context_id) -> 行位置の配列 を一度のgroupbyで作成
+        self._positions = source_df.groupby("element_id", sort=False).indices
+        if "context_id" in source_df.columns:
+            self._context_positions = source_df.groupby(
+                ["element_id", "context_id"], sort=False
+            ).indices
+        else:
+            self._context_positions = {}
+
+        # 値の取り出しはnumpy配列に対して行い、行オブジェクトの生成を避ける
+        self._values = source_df["value"].to_numpy()
+        self._value_texts = source_df["value_text"].to_numpy()
+        self._is_numeric = source_df["is_numeric"].to_numpy()
+
+    def get(self, element_id: str, context_id: str | None = None) -> str | None:
+        """
+        `element_id`に一致する単一の値を取得する。
+
+        `context_id`が指定され、かつ`element_id`に一致する行が複数ある場合は、
+        `context_id`でさらに絞り込みます。一致する行が複数残る場合は先頭の行を採用します。
+
+        Args:
+            element_id (str): 抽出したいデータのXBRL要素ID。
+            context_id (Optional[str], optional):
+                `element_id`だけでは一意に定まらない場合に使用するコンテキストID。
+                Defaults to None.
+
+        Returns:
+            Union[str, None]:
+                抽出された値。数値の場合は整数の文字列、テキストの場合はその文字列。
+                対応するデータが見つからない場合は `None`。
+        """
+        positions = self._positions.get(element_id)
+        if positions is not None and len(positions) > 1 and context_id:
+            positions = self._context_positions.get((element_id, context_id))
+
+        if positions is None or len(positions) == 0:
+            logger.warning(
+                "element_idと一致する行が見つかりません (ID: %s, context: %s)",
+                element_id,
+                context_id,
+            )
+            return None
+
+        position = positions[0]
+        if self._is_numeric[position]:
+            logger.debug("element_idと一致する行から数値データを取得しました")
+            return str(int(self._values[position]))
+
+        value_text = self._value_texts[position]
+        logger.debug("element_idと一致する行から文字データを取得しました")
+        return None if pd.isna(value_text) else value_text
+
+    def resolve(self, mapping_dict: dict[str, str]) -> dict:
+        """
+        `{キー: element_id}`形式のマッピング定義の全キーを一括で解決する。
+
+        Args:
+            mapping_dict (dict[str, str]): `config.toml`の`[xbrl_mapping.*]`セクション。
+
+        Returns:
+            dict: キーごとに`get`で取得した値を格納した辞書。
+        """
+        return {key: self.get(element_id) for key, element_id in mapping_dict.items()}
+
+
 def _get_value(
-    source_df: pd.DataFrame, element_id: str, context_id: Optional[str] = None
+    source_df: pd.DataFrame,
+    element_id: str,
+    context_id: Optional[str] = None,
+    element_index: ElementIndex | None = None,
 ) -> Union[float, str, None]:
     """
     標準化されたDataFrameから、特定の要素IDに一致する単一の値を安全に抽出する。
@@ -64,12 +157,18 @@ def _get_value(
     検索の結果、行が見つからない場合や、行から値の抽出に失敗した場合は、
     エラーをログに記録し、例外を送出せずに`None`を返す。
 
+    Note:
+        `element_index`を省略した場合は、`element_id`に一致する行のみを抽出して
+        検索します。複数の値を取得する場合は`ElementIndex`を一度だけ構築して渡してください。
+
     Args:
         source_df (pd.DataFrame): `standardize_raw_data`で標準化済みのDataFrame。
         element_id (str): 抽出したいデータのXBRL要素ID。
         context_id (Optional[str], optional):
             `element_id`だけでは一意に定まらない場合に使用するコンテキストID。
             Defaults to None.
+        element_index (Optional[ElementIndex], optional):
+            構築済みの`ElementIndex`。Defaults to None.
 
     Returns:
         Union[float, str, None]:
@@ -78,28 +177,24 @@ def _get_value(
     """
 
     try:
-        extract_df = source_df[source_df["element_id"] == element_id]
-        logger.info("element_idと一致する行を取得しました")
-
-        if len(extract_df) > 1 and context_id:
-            extract_df = extract_df[extract_df["context_id"] == context_id]
-
-        target_row = extract_df.iloc[0]
-        if target_row["is_numeric"]:
-            extract_value = str(int(target_row["value"]))
-            logger.info("element_idと一致する行から数値データを取得しました")
-        else:
-            extract_value = target_row["value_text"]
-            logger.info("element_idと一致する行から文字データを取得しました")
-        return extract_value
-    except (KeyError, IndexError) as e:
+        if element_index is None:
+            # DataFrame全体ではなく、一致する行だけでインデックスを構築する
+            element_index = ElementIndex(
+                source_df[source_df["element_id"] == element_id]
+            )
+        return element_index.get(element_id, context_id)
+    except KeyError as e:
         logger.error(
             "値の取得処理中に予期せぬエラーが発生しました (ID: %s): %s", element_id, e
         )
         return None
 
 
-def _company_mapping(source_df: pd.DataFrame, config: dict) -> dict:
+def _company_mapping(
+    source_df: pd.DataFrame,
+    config: dict,
+    element_index: ElementIndex | None = None,
+) -> dict:
     """
     source_dfから会社情報を抽出し、Companyモデルに対応するdictを作成する。
 
@@ -113,6 +208,9 @@ def _company_mapping(source_df: pd.DataFrame, config: dict) -> dict:
 
     Args:
         source_df (pd.DataFrame): `standardize_raw_data`で標準化済みのDataFrame
+        config (dict): `config.toml`の内容
+        element_index (Optional[ElementIndex], optional):
+            構築済みの`ElementIndex`。省略時は`source_df`から構築する。
 
     Raises:
         KeyError: `config.toml`に`["xbrl_mapping"]["company"]`セクションが存在しない場合
@@ -134,11 +232,10 @@ def _company_mapping(source_df: pd.DataFrame, config: dict) -> dict:
         )
         raise
 
-    # すべてのデータを取得する
-    company_data = {
-        key: _get_value(source_df, element_id)
-        for key, element_id in mapping_dict.items()
-    }
+    # すべてのデータをインデックスから一括で取得する
+    if element_index is None:
+        element_index = ElementIndex(source_df)
+    company_data = element_index.resolve(mapping_dict)
     # 必須項目のチェック
     required_keys = ["edinet_code", "company_name"]
     missing_keys = [key for key in required_keys if company_data.get(key) is None]
@@ -210,7 +307,59 @@ def _financial_item_mapping(source_df: pd.DataFrame) -> list[dict]:
     return return_df.to_dict("records")
 
 
-def _financial_report_mapping(source_df: pd.DataFrame, config: dict) -> dict:
+# コンテキストの次元テーブル(contexts)の自然キーとなるカラム
+CONTEXT_KEY_COLUMNS = ["context_id", "period_type", "consolidated_type"]
+
+
+def _financial_data_rows(source_df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrameから、財務データとして登録する行(jppfs_cor/jpigp_cor)を抽出する。"""
+    return source_df[
+        source_df["element_id"].str.contains("jppfs_cor:|jpigp_cor:", na=False)
+    ]
+
+
+def _context_mapping(source_df: pd.DataFrame) -> list[dict]:
+    """
+    DataFrameの財務データ行からユニークなコンテキストを抽出し、
+    `Financial_context`モデル用の辞書リストを作成する。
+
+    `context_id`, `period_type`, `consolidated_type`の組み合わせで重複を除外し、
+    コンテキストIDを`parser.parse_context_id`で相対期間・期間/時点・メンバーに
+    分解します。DBへの問い合わせは行いません。
+
+    Args:
+        source_df (pd.DataFrame): `standardize_raw_data`で処理済みのDataFrame。
+            `element_id`, `context_id`, `period_type`, `consolidated_type`カラムが必須。
+
+    Returns:
+        list[dict]: `Financial_context`モデルに対応するコンテキスト辞書のリスト。
+
+    Raises:
+        KeyError: `source_df`に必須カラムが欠損している場合に送出されます。
+    """
+    context_df = _financial_data_rows(source_df)[CONTEXT_KEY_COLUMNS]
+    context_df = context_df.drop_duplicates()
+    contexts = []
+    for context_id, period_type, consolidated_type in context_df.itertuples(
+        index=False, name=None
+    ):
+        context_id = None if pd.isna(context_id) else context_id
+        contexts.append(
+            {
+                "context_id": context_id,
+                "period_type": period_type,
+                "consolidated_type": consolidated_type,
+                **parser.parse_context_id(context_id),
+            }
+        )
+    return contexts
+
+
+def _financial_report_mapping(
+    source_df: pd.DataFrame,
+    config: dict,
+    element_index: ElementIndex | None = None,
+) -> dict:
     """
     DataFrameから報告書情報を抽出し、Financial_reportモデル用の辞書を作成する。
 
@@ -223,6 +372,9 @@ def _financial_report_mapping(source_df: pd.DataFrame, config: dict) -> dict:
 
     Args:
         source_df (pd.DataFrame): `standardize_raw_data`で標準化済みのDataFrame。
+        config (dict): `config.toml`の内容。
+        element_index (Optional[ElementIndex], optional):
+            構築済みの`ElementIndex`。省略時は`source_df`から構築する。
 
     Returns:
         dict: `Financial_report`モデルに対応する報告書情報の辞書。
@@ -244,10 +396,9 @@ def _financial_report_mapping(source_df: pd.DataFrame, config: dict) -> dict:
         )
         raise
 
-    financial_report_data = {
-        key: _get_value(source_df, element_id)
-        for key, element_id in mapping_dict.items()
-    }
+    if element_index is None:
+        element_index = ElementIndex(source_df)
+    financial_report_data = element_index.resolve(mapping_dict)
 
     # 会計年度と四半期情報を取得
     fiscal_year_and_quarter = financial_report_data.get("fiscal_year_and_quarter")
@@ -283,8 +434,118 @@ def _financial_report_mapping(source_df: pd.DataFrame, config: dict) -> dict:
     return financial_report_data
 
 
+def financial_data_columnar_mapping(
+    source_df: pd.DataFrame,
+    report_id: int,
+    item_id_map: dict[str, int],
+    *,
+    fiscal_year: int | None = None,
+    context_key_map: dict[tuple, int] | None = None,
+) -> pd.DataFrame:
+    """
+    DataFrameの財務データ行を列単位で一括変換し、Financial_dataモデル用の
+    カラムを持つDataFrame（カラムナーバッチ）を作成する。
+
+    `financial_data_mapping`と同じ変換を、行ループではなくカラム全体への
+    ベクトル演算で行います。戻り値はそのまま永続化層に渡すことを想定しています。
+
+    Args:
+        source_df (pd.DataFrame): `standardize_raw_data`で標準化済みのDataFrame。
+        report_id (int): この財務データが紐づく報告書のID (financial_reports.report_id)。
+        item_id_map (dict[str, int]): XBRLの要素IDをキー、DBのitem_idを値とする辞書。
+            このマップは、source_df内の全ての財務項目を網羅している必要があります。
+        fiscal_year (int | None): 報告書の会計年度。financial_dataのパーティションキーで、
+            DBに登録する場合は指定が必要です。Noneの場合は`fiscal_year`カラムを含めません。
+        context_key_map (dict[tuple, int] | None):
+            `(context_id, period_type, consolidated_type)`をキー、DBのcontext_keyを
+            値とする辞書。DBに登録する場合は指定が必要です。Noneの場合は
+            `context_key`の代わりにコンテキストの属性
+            (`context_id`, `period_type`, `consolidated_type`, `duration_type`)を含めます。
+
+    Returns:
+        pd.DataFrame: `Financial_data`モデルのカラム名を持つDataFrame。
+            `value`および`value_text`の欠損値はNoneに正規化されます。
+
+    Raises:
+        KeyError: `item_id_map`または`context_key_map`に存在しない値が含まれている場合。
+    """
+
+    standardize_df = _financial_data_rows(source_df)
+
+    # element_id -> item_id の変換 (未登録の要素IDがあればKeyErrorとする)
+    item_ids = standardize_df["element_id"].map(item_id_map)
+    if item_ids.isna().any():
+        missing_ids = standardize_df.loc[item_ids.isna(), "element_id"].unique()
+        raise KeyError(f"item_idが見つかりません: {', '.join(missing_ids)}")
+
+    if context_key_map is None:
+        context_ids = standardize_df["context_id"]
+        context_columns = {
+            "duration_type": np.where(
+                context_ids.str.contains("Duration", regex=False, na=False),
+                "Duration",
+                "Instant",
+            ),
+            "context_id": context_ids,
+            "period_type": standardize_df["period_type"],
+            "consolidated_type": standardize_df["consolidated_type"],
+        }
+    else:
+        context_columns = {
+            "context_key": _map_context_keys(standardize_df, context_key_map)
+        }
+
+    financial_data_df = pd.DataFrame(
+        {
+            "report_id": report_id,
+            "item_id": item_ids.astype("int64"),
+            **context_columns,
+            # NaNをNoneに正規化するため、object型に変換してから置換する
+            "value": _nan_to_none(standardize_df["value"]),
+            "value_text": _nan_to_none(standardize_df["value_text"]),
+            "is_numeric": standardize_df["is_numeric"].astype(bool),
+        },
+        index=standardize_df.index,
+    )
+    if fiscal_year is not None:
+        financial_data_df.insert(1, "fiscal_year", int(fiscal_year))
+    return financial_data_df.reset_index(drop=True)
+
+
+def _map_context_keys(
+    standardize_df: pd.DataFrame, context_key_map: dict[tuple, int]
+) -> np.ndarray:
+    """財務データ行の(context_id, period_type, consolidated_type)をcontext_keyに変換する。"""
+    # NaNとNoneを同じキーとして結合するため、欠損したcontext_idは空文字列に揃える
+    key_df = pd.DataFrame(
+        [(*key, context_key) for key, context_key in context_key_map.items()],
+        columns=[*CONTEXT_KEY_COLUMNS, "context_key"],
+    )
+    key_df["context_id"] = key_df["context_id"].fillna("")
+    fact_keys = standardize_df[CONTEXT_KEY_COLUMNS].reset_index(drop=True)
+    fact_keys["context_id"] = fact_keys["context_id"].fillna("")
+    context_keys = fact_keys.merge(key_df, on=CONTEXT_KEY_COLUMNS, how="left")[
+        "context_key"
+    ]
+    if context_keys.isna().any():
+        missing_ids = fact_keys.loc[context_keys.isna(), "context_id"].unique()
+        raise KeyError(f"context_keyが見つかりません: {', '.join(missing_ids)}")
+    return context_keys.astype("int64").to_numpy()
+
+
+def _nan_to_none(series: pd.Series) -> pd.Series:
+    """SeriesをObject型に変換し、欠損値をNoneに置き換える。"""
+    object_series = series.astype(object)
+    return object_series.where(series.notna(), None)
+
+
 def financial_data_mapping(
-    source_df: pd.DataFrame, report_id: int, item_id_map: dict[str, int]
+    source_df: pd.DataFrame,
+    report_id: int,
+    item_id_map: dict[str, int],
+    *,
+    fiscal_year: int | None = None,
+    context_key_map: dict[tuple, int] | None = None,
 ) -> list[dict]:
     """
     DataFrameの財務データ行を走査し、Financial_dataモデル用の辞書リストに変換する。
@@ -299,50 +560,47 @@ def financial_data_mapping(
         report_id (int): この財務データが紐づく報告書のID (financial_reports.report_id)。
         item_id_map (dict[str, int]): XBRLの要素IDをキー、DBのitem_idを値とする辞書。
             このマップは、source_df内の全ての財務項目を網羅している必要があります。
+        fiscal_year (int | None): 報告書の会計年度。financial_dataのパーティションキーで、
+            DBに登録する場合は指定が必要です。Noneの場合は`fiscal_year`カラムを含めません。
+        context_key_map (dict[tuple, int] | None): コンテキストとcontext_keyの対応。
+            詳細は`financial_data_columnar_mapping`を参照してください。
 
     Returns:
         list[dict]: `Financial_data`モデルのスキーマに準拠した財務データ辞書のリスト。
 
     Note:
-        パフォーマンスより可読性を優先し、行のループ処理を採用しています。
-        データ量が極端に多い場合は、将来的にベクトル化などの最適化を検討する可能性があります。
+        互換性のために残している辞書リスト形式のインターフェースです。
+        内部では`financial_data_columnar_mapping`のベクトル化処理を利用しています。
+        大量データを扱う場合は、DataFrameを直接返す同関数の利用を推奨します。
     """
-
-    standardize_df = source_df[
-        source_df["element_id"].str.contains("jppfs_cor:|jpigp_cor:", na=False)
-    ]
-    financial_data_list = []
-
-    for index, row in standardize_df.iterrows():
-        data_dict = {
-            "report_id": report_id,
-            "item_id": item_id_map[row["element_id"]],
-            "duration_type": "Duration"
-            if "Duration" in row["context_id"]
-            else "Instant",
-            "context_id": row["context_id"],
-            "period_type": row["period_type"],
-            "consolidated_type": row["consolidated_type"],
-            "value": None if pd.isna(row["value"]) else row["value"],
-            "value_text": None if pd.isna(row["value_text"]) else row["value_text"],
-            "is_numeric": row["is_numeric"],
-        }
-        financial_data_list.append(data_dict)
-
-    return financial_data_list
+    financial_data_df = financial_data_columnar_mapping(
+        source_df,
+        report_id,
+        item_id_map,
+        fiscal_year=fiscal_year,
+        context_key_map=context_key_map,
+    )
+    return financial_data_df.to_dict("records")
 
 
 def map_data_to_models(df: pd.DataFrame, config: dict) -> dict:
     """
     DBのモデルに対応する値をデータフレームから取得しマッピングする関数
+
+    `ElementIndex`を一度だけ構築し、各マッピングセクションで共有する。
+    インデックスは`[xbrl_mapping]`が参照する要素IDの行のみから構築する。
     """
 
-    company_dict = _company_mapping(df, config)
-    financial_report_dict = _financial_report_mapping(df, config)
+    xbrl_mapping = compile_xbrl_mapping(config)
+    element_index = ElementIndex(df[df["element_id"].isin(xbrl_mapping.element_ids)])
+    company_dict = _company_mapping(df, config, element_index)
+    financial_report_dict = _financial_report_mapping(df, config, element_index)
     financial_item_mapping_list = _financial_item_mapping(df)
+    context_mapping_list = _context_mapping(df)
     mapping_data_bundle = {
         "company": company_dict,
         "report": financial_report_dict,
         "items": financial_item_mapping_list,
+        "contexts": context_mapping_list,
     }
     return mapping_data_bundle
@@ -8,9 +8,10 @@ from sqlalchemy.types import (
     Boolean,
     BigInteger,
     Date,
+    SmallInteger,
 )
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, UniqueConstraint, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -69,6 +70,16 @@ class Financial_report(Base):
     """財務報告書のマスターテーブル"""
 
     __tablename__ = "financial_reports"
+    __table_args__ = (
+        # 同じ報告書の重複登録を防ぐ自然キー。四半期がNULLの報告書も1行にまとめる
+        UniqueConstraint(
+            "company_id",
+            "fiscal_year",
+            "quarter_type",
+            name="uq_financial_reports_natural_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
     report_id = Column(Integer, primary_key=True, autoincrement=True)
     company_id = Column(
         Integer, ForeignKey("companies.company_id"), nullable=False, index=True
@@ -89,23 +100,77 @@ class Financial_report(Base):
     company = relationship("Company", back_populates="reports")
     # Financial_dataテーブルへのリレーション
     data = relationship("Financial_data", back_populates="report")
+    # Report_metricsテーブルへのリレーション（報告書ごとに1行）
+    metrics = relationship("Report_metrics", back_populates="report", uselist=False)
+
+
+class Financial_context(Base):
+    """コンテキストの次元テーブル
+
+    XBRLのコンテキストIDと、CSVの期間・時点、連結・個別の組み合わせごとに1行を持ち、
+    コンテキストIDを分解した相対期間・メンバーを保持します。財務データの各行は
+    文字列の代わりに`context_key`のみを持ちます。
+    """
+
+    __tablename__ = "contexts"
+    __table_args__ = (
+        # context_idがNULLの組み合わせも1行にまとめる（PostgreSQL 15以降）
+        UniqueConstraint(
+            "context_id",
+            "period_type",
+            "consolidated_type",
+            name="uq_contexts_natural_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    context_key = Column(Integer, primary_key=True, autoincrement=True)
+    context_id = Column(String(300), nullable=True)
+    period_type = Column(String(50), nullable=False)
+    consolidated_type = Column(String(10), nullable=False)
+    duration_type = Column(String(10), nullable=False)
+    relative_period = Column(String(50), nullable=True)
+    member = Column(String(250), nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=True
+    )
+
+    # Financial_dataテーブルへのリレーション
+    data = relationship("Financial_data", back_populates="context")
 
 
 class Financial_data(Base):
-    """財務情報テーブルのクラス"""
+    """財務情報テーブルのクラス
+
+    会計年度(fiscal_year)ごとのレンジパーティションに分割されたテーブルです。
+    パーティションキーを含めるため、主キーは(data_id, fiscal_year)の複合キーです。
+    年度ごとのパーティションは`utils.partitions`で作成・切り離しを行います。
+    コンテキストの属性は`Financial_context`に正規化し、`context_key`で参照します。
+    """
 
     __tablename__ = "financial_data"
+    __table_args__ = (
+        # 報告書・項目での検索を、テーブルを参照せずインデックスのみで完結させる
+        Index(
+            "idx_data_report_item",
+            "report_id",
+            "item_id",
+            postgresql_include=["value", "context_key"],
+        ),
+        {"postgresql_partition_by": "RANGE (fiscal_year)"},
+    )
+
     data_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    fiscal_year = Column(SmallInteger, primary_key=True, nullable=False)
     report_id = Column(
         Integer, ForeignKey("financial_reports.report_id"), nullable=False, index=True
     )
     item_id = Column(
         Integer, ForeignKey("financial_items.item_id"), nullable=False, index=True
     )
-    context_id = Column(String(300), nullable=True)
-    period_type = Column(String(50), nullable=False)
-    consolidated_type = Column(String(10), nullable=False)
-    duration_type = Column(String(10), nullable=False)
+    context_key = Column(
+        Integer, ForeignKey("contexts.context_key"), nullable=False, index=True
+    )
     value = Column(Numeric(20), nullable=True)
     value_text = Column(Text, nullable=True)
     is_numeric = Column(Boolean, server_default="true", nullable=True)
@@ -120,3 +185,83 @@ class Financial_data(Base):
     report = relationship("Financial_report", back_populates="data")
     # Financial_itemテーブルへのリレーション設定
     item = relationship("Financial_item", back_populates="data")
+    # Financial_contextテーブルへのリレーション設定
+    context = relationship("Financial_context", back_populates="data")
+
+
+@event.listens_for(Financial_data.__table__, "after_create")
+def _create_financial_data_partitions(target, connection, **kw) -> None:
+    """create_allでテーブルを作成した場合も、sql/ddl.sqlで初期化したDBと同じ
+    デフォルトパーティションと年度のパーティションを作成する。"""
+    if connection.dialect.name != "postgresql":
+        return
+    # utils.partitionsはこのモジュールに依存するため、循環importを避けてここでimportする
+    from utils.partitions import ensure_partitions
+
+    ensure_partitions(connection)
+
+
+class Ingestion_ledger(Base):
+    """取り込み台帳テーブル
+
+    docIDと入力ファイルのハッシュごとに取り込み結果を記録し、
+    取り込み済みの入力を解析前にスキップするために利用します。
+    """
+
+    __tablename__ = "ingestion_ledger"
+    __table_args__ = (UniqueConstraint("doc_id", "file_hash"),)
+
+    ledger_id = Column(Integer, primary_key=True, autoincrement=True)
+    doc_id = Column(String(20), nullable=False, index=True)
+    file_hash = Column(String(64), nullable=False)
+    source_path = Column(String(500), nullable=True)
+    status = Column(String(10), nullable=False)
+    row_count = Column(Integer, nullable=True)
+    fact_count = Column(Integer, nullable=True)
+    elapsed_ms = Column(Integer, nullable=True)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=True
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        onupdate=func.now(),
+        server_default=func.now(),
+        nullable=True,
+    )
+
+
+class Report_metrics(Base):
+    """報告書ごとの主要指標テーブル
+
+    売上高・各利益を`_SUMMARY_ITEMS`の候補から解決した値と、計算済みの利益率を
+    報告書ごとに1行で保持します。サマリーの表示やスクリーニングで、
+    financial_dataを参照せずに主キーで取得するために利用します。
+    """
+
+    __tablename__ = "report_metrics"
+
+    report_id = Column(
+        Integer,
+        ForeignKey("financial_reports.report_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    net_sales = Column(Numeric(20), nullable=True)
+    operating_income = Column(Numeric(20), nullable=True)
+    ordinary_income = Column(Numeric(20), nullable=True)
+    net_income = Column(Numeric(20), nullable=True)
+    operation_profit_rate = Column(Numeric, nullable=True)
+    ordinary_profit_rate = Column(Numeric, nullable=True)
+    net_profit_rate = Column(Numeric, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=True
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        onupdate=func.now(),
+        server_default=func.now(),
+        nullable=True,
+    )
+
+    # Financial_reportテーブルへのリレーション
+    report = relationship("Financial_report", back_populates="metrics")
@@ -0,0 +1,82 @@
+"""
+EDINETのCSVファイルの文字コード判定と読み込みを行うヘルパーモジュール。
+
+EDINETのCSVはBOM付きのUTF-16LEで提供されるため、まずBOMで文字コードを判定し、
+BOMがない場合のみ先頭の一部（サンプル）に対して`chardet`で推定します。
+ファイル全体に対する`chardet.detect`は低速なため行いません。
+
+CSVを読み込むすべての入口（API取得・CSV一括取り込み）から共通で利用します。
+"""
+
+import codecs
+import hashlib
+import io
+import logging
+
+import chardet
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# BOMと対応する文字コード。UTF-32LEのBOMはUTF-16LEのBOMを含むため先に判定する
+_BOM_ENCODINGS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# BOMがない場合にchardetへ渡す先頭バイト数
+DEFAULT_SAMPLE_SIZE = 64 * 1024
+
+
+def detect_encoding(raw_data: bytes, sample_size: int = DEFAULT_SAMPLE_SIZE) -> str:
+    """
+    バイト列の文字コードを判定する。
+
+    BOMがあればBOMから判定し、なければ先頭`sample_size`バイトのみを
+    `chardet`で推定します。推定できない場合は`utf-8`とみなします。
+
+    Args:
+        raw_data (bytes): 判定対象のバイト列。
+        sample_size (int, optional): BOMがない場合に推定に使うバイト数。
+
+    Returns:
+        str: Pythonのcodecsで利用可能な文字コード名。
+    """
+    for bom, encoding in _BOM_ENCODINGS:
+        if raw_data.startswith(bom):
+            return encoding
+
+    result = chardet.detect(raw_data[:sample_size])
+    encoding = result["encoding"] or "utf-8"
+    logger.info("Detected encoding: %s", encoding)
+    return encoding
+
+
+def content_hash(raw_data: bytes) -> str:
+    """CSVの内容のSHA-256ハッシュ（16進数）を返す。取り込み台帳のキーに利用する。"""
+    return hashlib.sha256(raw_data).hexdigest()
+
+
+def read_edinet_csv(raw_data: bytes, delimiter: str = "\t") -> pd.DataFrame:
+    """
+    メモリ上のCSVのバイト列を、文字コードを判定した上でDataFrameに変換する。
+
+    ファイルを開き直さず、既に読み込んだバイト列をそのまま利用します。
+    読み込み元の内容のハッシュを`DataFrame.attrs["content_hash"]`に保持します。
+
+    Args:
+        raw_data (bytes): CSVファイルの内容。
+        delimiter (str, optional): 区切り文字。EDINETのCSVはタブ区切り。
+
+    Returns:
+        pd.DataFrame: 読み込んだDataFrame。
+    """
+    encoding = detect_encoding(raw_data)
+    company_df = pd.read_csv(
+        io.BytesIO(raw_data), encoding=encoding, delimiter=delimiter
+    )
+    company_df.attrs["content_hash"] = content_hash(raw_data)
+    return company_df
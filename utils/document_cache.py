@@ -0,0 +1,289 @@
+"""
+EDINETからダウンロードした書類ZIPを保存する、コンテンツアドレス方式のローカルキャッシュ。
+
+書類はZIPのSHA-256ハッシュをファイル名として`objects/`配下に保存し、
+docIDとハッシュの対応をマニフェスト（`manifest.json`）で管理します。
+同じ内容の書類は1ファイルのみ保存されます。
+書類一覧APIのレスポンスも、提出日ごとに`lists/{YYYY-MM-DD}.json`として保存できます。
+
+キャッシュの合計サイズが上限を超えた場合は、最終参照日時が古い書類から削除します。
+参照日時の更新はメモリ上のマニフェストにのみ反映し、書類の保存・削除時か
+`close`（`flush`）の呼び出し時にまとめてファイルに書き出します。
+再取り込みやオフラインでのDB再構築時に、HTTP通信なしで書類を取得するために利用します。
+
+Example:
+    cache = DocumentCache("download/cache", max_bytes=2 * 1024**3)
+    content = cache.get("S100ABCD")
+    if content is None:
+        content = download(...)
+        cache.put("S100ABCD", content)
+    cache.close()
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Self
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCache:
+    """docIDとコンテンツハッシュをキーに書類ZIPを保存するローカルキャッシュ。
+
+    同一プロセス内のスレッド間では安全に共有できます。使い終わったら`close`を呼び出すか、
+    `with`文で利用してください（`get`で更新した最終参照日時がマニフェストに保存されます）。
+
+    Args:
+        cache_dir (str): キャッシュを保存するディレクトリ。
+        max_bytes (int, optional): キャッシュの合計サイズの上限。Noneの場合は無制限。
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, cache_dir: str, max_bytes: int | None = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+        # マニフェストの未保存の変更（最終参照日時の更新）の有無
+        self._dirty = False
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.cache_dir, self.MANIFEST_NAME)
+
+    def _object_path(self, content_hash: str) -> str:
+        return os.path.join(
+            self.cache_dir, "objects", content_hash[:2], f"{content_hash}.zip"
+        )
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {"documents": {}}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("キャッシュのマニフェストを読み込めませんでした: %s", e)
+            return {"documents": {}}
+
+    def _save_manifest(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._atomic_write(
+            self.manifest_path,
+            json.dumps(self._manifest, ensure_ascii=False, indent=2).encode("utf-8"),
+        )
+        self._dirty = False
+
+    def flush(self) -> None:
+        """未保存の最終参照日時の更新があれば、マニフェストに書き出す。"""
+        with self._lock:
+            if self._dirty:
+                self._save_manifest()
+
+    def close(self) -> None:
+        """未保存の変更をマニフェストに書き出す。"""
+        self.flush()
+
+    def _object_sizes(self) -> dict[str, int]:
+        """マニフェストが参照する内容ごとのサイズを返す（同一内容は1件にまとめる）。"""
+        return {
+            entry["sha256"]: entry["size"]
+            for entry in self._manifest["documents"].values()
+        }
+
+    def _remove_object(self, content_hash: str) -> None:
+        """どのdocIDからも参照されなくなった内容の実体を削除する。"""
+        if content_hash in self._object_sizes():
+            return
+        try:
+            os.remove(self._object_path(content_hash))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _atomic_write(path: str, content: bytes) -> None:
+        """一時ファイルに書き込んでから置き換え、書きかけのファイルを残さない。"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _document_list_path(self, submit_date: str) -> str:
+        return os.path.join(self.cache_dir, "lists", f"{submit_date}.json")
+
+    def get_document_list(self, submit_date: str) -> dict | None:
+        """提出日の書類一覧（書類一覧APIのJSON）をキャッシュから取得する。
+
+        Args:
+            submit_date (str): 提出日（YYYY-MM-DD）。
+
+        Returns:
+            dict | None: 書類一覧APIのレスポンス。キャッシュにない場合はNone。
+        """
+        try:
+            with open(self._document_list_path(submit_date), encoding="utf-8") as f:
+                document_list = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(
+                "キャッシュの書類一覧を読み込めませんでした(%s): %s", submit_date, e
+            )
+            return None
+        logger.info("キャッシュから書類一覧を取得しました: %s", submit_date)
+        return document_list
+
+    def put_document_list(self, submit_date: str, document_list: dict) -> None:
+        """提出日の書類一覧をキャッシュに保存する。
+
+        書類一覧は小さいため、サイズ上限による削除の対象外です。
+        """
+        self._atomic_write(
+            self._document_list_path(submit_date),
+            json.dumps(document_list, ensure_ascii=False).encode("utf-8"),
+        )
+
+    def doc_ids(self) -> list[str]:
+        """キャッシュ済みのdocIDの一覧を返す。"""
+        with self._lock:
+            return list(self._manifest["documents"])
+
+    def total_bytes(self) -> int:
+        """キャッシュ済みの書類の合計サイズ（同一内容は1回のみ計上）を返す。"""
+        with self._lock:
+            return self._total_bytes()
+
+    def _total_bytes(self) -> int:
+        return sum(self._object_sizes().values())
+
+    def get(self, doc_id: str) -> bytes | None:
+        """docIDの書類ZIPをキャッシュから取得する。
+
+        保存時のハッシュと一致しない（破損した）場合はエントリを削除してNoneを返します。
+
+        Args:
+            doc_id (str): EDINETの書類ID。
+
+        Returns:
+            bytes | None: 書類ZIPの内容。キャッシュにない場合はNone。
+        """
+        # ロックはマニフェストの参照・更新の間だけ保持し、読み込みとハッシュの検証は
+        # ロックの外で行う（他のスレッドの取得・保存を待たせない）
+        with self._lock:
+            entry = self._manifest["documents"].get(doc_id)
+            if entry is None:
+                return None
+            content_hash = entry["sha256"]
+        try:
+            with open(self._object_path(content_hash), "rb") as f:
+                content = f.read()
+        except OSError:
+            content = None
+        valid = (
+            content is not None and hashlib.sha256(content).hexdigest() == content_hash
+        )
+        with self._lock:
+            entry = self._manifest["documents"].get(doc_id)
+            # 読み込み中に別の内容で置き換えられた・削除された場合は何もしない
+            if entry is None or entry["sha256"] != content_hash:
+                return content if valid else None
+            if not valid:
+                logger.warning(
+                    "キャッシュの書類が見つからないか破損しています: %s", doc_id
+                )
+                del self._manifest["documents"][doc_id]
+                self._remove_object(content_hash)
+                self._save_manifest()
+                return None
+            # 参照のたびにマニフェストを書き出さず、保存・削除時かclose時にまとめて書き出す
+            entry["last_accessed"] = time.time()
+            self._dirty = True
+        logger.info("キャッシュから書類を取得しました: %s", doc_id)
+        return content
+
+    def put(self, doc_id: str, content: bytes) -> str:
+        """書類ZIPをキャッシュに保存し、上限を超えた場合は古い書類を削除する。
+
+        Args:
+            doc_id (str): EDINETの書類ID。
+            content (bytes): 書類ZIPの内容。
+
+        Returns:
+            str: 書類ZIPのSHA-256ハッシュ。
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(content_hash)
+        with self._lock:
+            if not os.path.exists(object_path):
+                self._atomic_write(object_path, content)
+            now = time.time()
+            entry = {
+                "sha256": content_hash,
+                "size": len(content),
+                "stored_at": now,
+                "last_accessed": now,
+            }
+            previous = self._manifest["documents"].get(doc_id)
+            self._manifest["documents"][doc_id] = entry
+            # 置き換え前の内容を参照する他のdocIDがなければ実体も削除する
+            if previous is not None:
+                self._remove_object(previous["sha256"])
+            self._evict()
+            self._save_manifest()
+        return content_hash
+
+    def _evict(self) -> list[str]:
+        """合計サイズが上限以下になるまで、最終参照日時が古い書類から削除する。"""
+        if self.max_bytes is None:
+            return []
+        documents = self._manifest["documents"]
+        object_sizes = self._object_sizes()
+        references = Counter(entry["sha256"] for entry in documents.values())
+        size = sum(object_sizes.values())
+        evicted = []
+        for doc_id in sorted(documents, key=lambda d: documents[d]["last_accessed"]):
+            if size <= self.max_bytes:
+                break
+            content_hash = documents.pop(doc_id)["sha256"]
+            evicted.append(doc_id)
+            # 同じ内容を参照する他のdocIDがなければ実体も削除する
+            references[content_hash] -= 1
+            if references[content_hash] == 0:
+                size -= object_sizes[content_hash]
+                self._remove_object(content_hash)
+        if evicted:
+            logger.info("キャッシュから%s件の書類を削除しました", len(evicted))
+        return evicted
+
+
+def create_document_cache(config: dict) -> DocumentCache | None:
+    """`[edinetapi]`の`CACHE_DIR`と`CACHE_MAX_MB`から書類キャッシュを作成する。
+
+    Returns:
+        DocumentCache | None: `CACHE_DIR`が未設定の場合はNone（キャッシュしない）。
+    """
+    edinet_config = config.get("edinetapi", {})
+    cache_dir = edinet_config.get("CACHE_DIR")
+    if not cache_dir:
+        return None
+    max_mb = edinet_config.get("CACHE_MAX_MB")
+    max_bytes = int(max_mb) * 1024 * 1024 if max_mb else None
+    return DocumentCache(cache_dir, max_bytes)
@@ -0,0 +1,414 @@
+"""
+取り込み処理のステージごとの処理時間・行数・SQL文の件数を計測するモジュール。
+
+`MetricsRecorder`でステージを囲むと、処理時間（秒）、処理した行数、ステージ中に
+実行したSQL文の件数を`StageMetric`として計測し、差し替え可能なシンクに送ります。
+SQL文の件数は、SQLAlchemyの`before_cursor_execute`イベントでスレッドごとに数えます。
+DBAPIのカーソルを直接使うCOPYなど、イベントを経由しない文は`count_statement`で数えます。
+
+シンクは以下を用意しています。
+
+- LogMetricsSink: 計測結果を1件ずつJSONでログに出力する。
+- InMemoryMetricsSink: 計測結果をメモリに保持し、ステージごとのパーセンタイルを集計する。
+- PrometheusMetricsSink: 集計結果をPrometheusのテキスト形式でファイルに書き出す、
+  またはローカルのHTTPエクスポーターで公開する。
+
+Example:
+    sink = InMemoryMetricsSink()
+    service = FinancialService(uow, metrics_sink=sink)
+    service.save_financial_data_from_dataframe(df, config)
+    print(format_summary(sink.summary()))
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 集計結果に表示するパーセンタイル
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+PROMETHEUS_METRIC_PREFIX = "ir_ingestion_stage"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_statement_counter = threading.local()
+
+
+def count_statement(count: int = 1) -> None:
+    """現在のスレッドで実行したSQL文の件数を加算する。"""
+    _statement_counter.count = statement_count() + count
+
+
+def statement_count() -> int:
+    """現在のスレッドでこれまでに実行したSQL文の件数を返す。"""
+    return getattr(_statement_counter, "count", 0)
+
+
+def _before_cursor_execute(
+    connection, cursor, statement, parameters, context, executemany
+) -> None:
+    count_statement()
+
+
+def install_statement_counter() -> None:
+    """全エンジンのSQL文の実行を数えるイベントリスナーを登録する（複数回呼んでも1回のみ）。"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@dataclass
+class StageMetric:
+    """1つのステージの計測結果
+
+    Attributes:
+        stage: ステージ名。
+        seconds: 処理時間（秒）。
+        rows: ステージで処理した行数。行数を持たないステージはNone。
+        statements: ステージ中に実行したSQL文の件数。
+        doc_id: 対象の書類のdocID。不明な場合はNone。
+    """
+
+    stage: str
+    seconds: float
+    rows: int | None = None
+    statements: int = 0
+    doc_id: str | None = None
+
+
+class MetricsSink:
+    """計測結果の送り先の基底クラス。既定では何もしない。"""
+
+    def emit(self, metric: StageMetric) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class LogMetricsSink(MetricsSink):
+    """計測結果を1件ずつ、JSON形式でログに出力するシンク。"""
+
+    def __init__(self, target_logger: logging.Logger | None = None, level=logging.INFO):
+        self.logger = target_logger if target_logger is not None else logger
+        self.level = level
+
+    def emit(self, metric: StageMetric) -> None:
+        self.logger.log(
+            self.level, "metrics %s", json.dumps(asdict(metric), ensure_ascii=False)
+        )
+
+
+def _percentile(sorted_values: list[float], quantile: float) -> float:
+    """昇順の値から、線形補間したパーセンタイルを求める。"""
+    position = (len(sorted_values) - 1) * quantile
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        position - lower
+    )
+
+
+class InMemoryMetricsSink(MetricsSink):
+    """計測結果をメモリに保持し、ステージごとに集計するシンク。
+
+    複数のスレッドから同時に`emit`できます。テストでの検証や、実行の最後に
+    集計結果を表示する用途を想定しています。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: list[StageMetric] = []
+
+    @property
+    def records(self) -> list[StageMetric]:
+        with self._lock:
+            return list(self._records)
+
+    def emit(self, metric: StageMetric) -> None:
+        with self._lock:
+            self._records.append(metric)
+
+    def summary(self) -> dict[str, dict]:
+        """ステージごとの件数・処理時間のパーセンタイル・行数・SQL文の件数を集計する。
+
+        Returns:
+            dict[str, dict]: ステージ名（計測順）をキーとし、`count`, `total_seconds`,
+            `p50`, `p90`, `p99`, `max_seconds`, `rows`, `rows_per_sec`, `statements`
+            を持つ辞書。
+        """
+        records_by_stage: dict[str, list[StageMetric]] = defaultdict(list)
+        for record in self.records:
+            records_by_stage[record.stage].append(record)
+
+        summary = {}
+        for stage, records in records_by_stage.items():
+            durations = sorted(record.seconds for record in records)
+            total_seconds = sum(durations)
+            rows = sum(record.rows for record in records if record.rows is not None)
+            stage_summary = {
+                "count": len(records),
+                "total_seconds": total_seconds,
+            }
+            for quantile in SUMMARY_QUANTILES:
+                stage_summary[f"p{int(quantile * 100)}"] = _percentile(
+                    durations, quantile
+                )
+            stage_summary.update(
+                {
+                    "max_seconds": durations[-1],
+                    "rows": rows,
+                    "rows_per_sec": rows / total_seconds if total_seconds else None,
+                    "statements": sum(record.statements for record in records),
+                }
+            )
+            summary[stage] = stage_summary
+        return summary
+
+
+class PrometheusMetricsSink(InMemoryMetricsSink):
+    """集計結果をPrometheusのテキスト形式で公開するシンク。
+
+    `path`を指定した場合は`close`（または`write`）でファイルに書き出します。
+    node_exporterのtextfileコレクターから読めるよう、一時ファイル経由で置き換えます。
+    `port`を指定した場合は、`127.0.0.1:{port}`でスクレイプ用のHTTPサーバーを起動します。
+
+    Args:
+        path (str, optional): 書き出すファイルのパス。
+        port (int, optional): HTTPエクスポーターのポート番号。
+        host (str, optional): HTTPエクスポーターの待ち受けアドレス。
+    """
+
+    def __init__(
+        self, path: str | None = None, port: int | None = None, host: str = "127.0.0.1"
+    ):
+        super().__init__()
+        self.path = path
+        self._server: ThreadingHTTPServer | None = None
+        if port is not None:
+            self.serve(port, host)
+
+    def render(self) -> str:
+        """ステージごとの集計結果を、Prometheusのテキスト形式に変換する。"""
+        summary = self.summary()
+        seconds_name = f"{PROMETHEUS_METRIC_PREFIX}_seconds"
+        rows_name = f"{PROMETHEUS_METRIC_PREFIX}_rows_total"
+        statements_name = f"{PROMETHEUS_METRIC_PREFIX}_sql_statements_total"
+        lines = [
+            f"# HELP {seconds_name} 取り込みのステージごとの処理時間（秒）",
+            f"# TYPE {seconds_name} summary",
+        ]
+        for stage, stage_summary in summary.items():
+            for quantile in SUMMARY_QUANTILES:
+                lines.append(
+                    f'{seconds_name}{{stage="{stage}",quantile="{quantile}"}} '
+                    f"{stage_summary[f'p{int(quantile * 100)}']:.6f}"
+                )
+            lines.append(
+                f'{seconds_name}_sum{{stage="{stage}"}} '
+                f"{stage_summary['total_seconds']:.6f}"
+            )
+            lines.append(
+                f'{seconds_name}_count{{stage="{stage}"}} {stage_summary["count"]}'
+            )
+        for name, key, description in (
+            (rows_name, "rows", "取り込みのステージごとの処理行数"),
+            (statements_name, "statements", "取り込みのステージごとのSQL文の実行件数"),
+        ):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for stage, stage_summary in summary.items():
+                lines.append(f'{name}{{stage="{stage}"}} {stage_summary[key]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        """集計結果をファイルに書き出す。"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=directory, delete=False, suffix=".tmp"
+        ) as temp_file:
+            temp_file.write(self.render())
+        os.replace(temp_file.name, self.path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """集計結果を返すHTTPサーバーを、デーモンスレッドで起動する。"""
+        sink = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.info(
+            "メトリクスのエクスポーターを起動しました: http://%s:%s/metrics",
+            host,
+            self._server.server_address[1],
+        )
+
+    @property
+    def server_address(self) -> tuple | None:
+        return self._server.server_address if self._server is not None else None
+
+    def close(self) -> None:
+        if self.path is not None:
+            self.write()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class MultiMetricsSink(MetricsSink):
+    """複数のシンクに同じ計測結果を送るシンク。"""
+
+    def __init__(self, sinks: Iterable[MetricsSink]):
+        self.sinks = list(sinks)
+
+    def emit(self, metric: StageMetric) -> None:
+        for sink in self.sinks:
+            sink.emit(metric)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class StageTimer:
+    """計測中のステージ。`end`を呼ぶと計測結果をシンクに送る。
+
+    Attributes:
+        rows: ステージで処理した行数。ステージの途中で設定できる。
+    """
+
+    def __init__(
+        self,
+        sink: MetricsSink,
+        stage: str,
+        rows: int | None = None,
+        doc_id: str | None = None,
+    ):
+        self.sink = sink
+        self.stage = stage
+        self.rows = rows
+        self.doc_id = doc_id
+        self._statements_at = statement_count()
+        self._started_at = time.perf_counter()
+
+    def end(self, rows: int | None = None) -> StageMetric:
+        metric = StageMetric(
+            stage=self.stage,
+            seconds=time.perf_counter() - self._started_at,
+            rows=rows if rows is not None else self.rows,
+            statements=statement_count() - self._statements_at,
+            doc_id=self.doc_id,
+        )
+        self.sink.emit(metric)
+        return metric
+
+
+class MetricsRecorder:
+    """ステージを計測し、結果をシンクに送る。
+
+    Args:
+        sink (MetricsSink, optional): 計測結果の送り先。省略時は何もしないシンク。
+    """
+
+    def __init__(self, sink: MetricsSink | None = None):
+        self.sink = sink if sink is not None else MetricsSink()
+        install_statement_counter()
+
+    def begin(
+        self, stage: str, rows: int | None = None, doc_id: str | None = None
+    ) -> StageTimer:
+        """ステージの計測を開始する。`with`で囲めない処理（コミットなど）に利用する。"""
+        return StageTimer(self.sink, stage, rows, doc_id)
+
+    @contextmanager
+    def stage(
+        self, stage: str, rows: int | None = None, doc_id: str | None = None
+    ) -> Iterator[StageTimer]:
+        """`with`ブロックをステージとして計測する。例外で抜けた場合は記録しない。"""
+        timer = self.begin(stage, rows, doc_id)
+        yield timer
+        timer.end()
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    """取り込みスクリプトに、計測結果の出力先を指定する引数を追加する。"""
+    parser.add_argument(
+        "--metrics-log",
+        action="store_true",
+        help="ステージごとの計測結果を1件ずつJSONでログに出力する",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="計測結果の集計をPrometheusのテキスト形式で書き出すファイル",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="計測結果の集計をPrometheus形式で公開するローカルのHTTPポート",
+    )
+
+
+def create_metrics_sink(
+    log: bool = False, path: str | None = None, port: int | None = None
+) -> tuple[MetricsSink, InMemoryMetricsSink]:
+    """スクリプトの引数からシンクを作成する。
+
+    実行の最後に集計結果を表示できるよう、集計用のシンクを常に含めます。
+
+    Returns:
+        tuple[MetricsSink, InMemoryMetricsSink]: 計測に使うシンクと、集計用のシンクの組。
+    """
+    if path is not None or port is not None:
+        summary_sink = PrometheusMetricsSink(path, port)
+    else:
+        summary_sink = InMemoryMetricsSink()
+    if log:
+        return MultiMetricsSink([summary_sink, LogMetricsSink()]), summary_sink
+    return summary_sink, summary_sink
+
+
+def format_summary(summary: dict[str, dict]) -> str:
+    """`InMemoryMetricsSink.summary`の結果を、表示用の表に整形する。"""
+    header = (
+        f"{'stage':<20} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+        f"{'max ms':>9} {'total s':>9} {'rows':>10} {'rows/s':>11} {'sql':>7}"
+    )
+    lines = [header]
+    for stage, stage_summary in summary.items():
+        rows_per_sec = stage_summary["rows_per_sec"]
+        lines.append(
+            f"{stage:<20} {stage_summary['count']:>6} "
+            f"{stage_summary['p50'] * 1000:>9.1f} {stage_summary['p90'] * 1000:>9.1f} "
+            f"{stage_summary['p99'] * 1000:>9.1f} "
+            f"{stage_summary['max_seconds'] * 1000:>9.1f} "
+            f"{stage_summary['total_seconds']:>9.2f} {stage_summary['rows']:>10} "
+            f"{'-' if rows_per_sec is None else f'{rows_per_sec:,.0f}':>11} "
+            f"{stage_summary['statements']:>7}"
+        )
+    return "\n".join(lines)
@@ -3,15 +3,59 @@
 
 XBRLデータから特定の情報（会計年度、四半期など）を抽出するための、
 再利用可能な関数を提供します。
+
+正規表現はモジュールの読み込み時に一度だけコンパイルし、同じ文字列の解析結果は
+メモ化して再利用します。多数の報告書をまとめて解析する場合は、pandasのSeriesを
+受け取り`str.extract`で一括処理する`extract_fiscal_years`・`extract_quarter_types`
+を利用してください。
 """
 
 import logging
-import unicodedata
 import re
-from typing import Optional
+import unicodedata
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# 解析結果をメモ化する文字列の最大件数（報告書の期間表記は種類が限られる）
+_PARSE_CACHE_SIZE = 4096
+
+# 会計年度の抽出パターン（上から順に優先する）
+# パターン1: 日付範囲の西暦
+_DATE_RANGE_PATTERN = re.compile(r"自\s*(\d{4})年.*?至\s*(\d{4})年")
+# パターン2: 日付範囲の和暦（令和）
+_JAPANESE_YEAR_PATTERN = re.compile(
+    r"自\s*令和(元|\d+|[０-９]+)年.*?至\s*令和(元|\d+|[０-９]+)年"
+)
+# パターン3: 単純な4桁年度
+_YEAR_PATTERN = re.compile(r"(\d{4})")
+# 単純な4桁年度として採用する範囲
+_MIN_FISCAL_YEAR = 1990
+_MAX_FISCAL_YEAR = 2100
+# 令和元年の西暦
+_REIWA_FIRST_YEAR = 2019
+
+_QUARTER_PATTERN = re.compile(r"第\s*([0-4０-４一二三四１２３４]+)\s*四半期")
+
+_TO_NUMBER_MAPPING = {
+    "一": 1,
+    "二": 2,
+    "三": 3,
+    "四": 4,
+    "１": 1,
+    "２": 2,
+    "３": 3,
+    "４": 4,  # 全角数字
+    "1": 1,
+    "2": 2,
+    "3": 3,
+    "4": 4,  # 半角数字
+}
+
 
 def extract_fiscal_year(content: str) -> Optional[str]:
     """
@@ -24,36 +68,29 @@ def extract_fiscal_year(content: str) -> Optional[str]:
     '第52期第１四半期(自  令和５年10月21日  至  令和６年１月20日)'
 
     """
-    # パターン1: 日付範囲から西暦を抽出
-    pattern_date_range = r"自\s*(\d{4})年.*?至\s*(\d{4})年"
-    match_date = re.search(pattern_date_range, content)
+    fiscal_year = _parse_fiscal_year(content)
+    if fiscal_year is None:
+        logger.warning("会計年度の抽出に失敗しました: '%s'", content)
+    return fiscal_year
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _parse_fiscal_year(content: str) -> str | None:
+    """`extract_fiscal_year`の解析処理。同じ文字列の結果はメモ化される。"""
+    match_date = _DATE_RANGE_PATTERN.search(content)
     if match_date:
-        # start_year = int(match_date.group(1))
-        end_year = int(match_date.group(2))
         # 通常、会計年度は終了年度を使用
-        return str(end_year)
+        return str(int(match_date.group(2)))
 
-    # パターン2: 和暦を抽出し、変換
-    pattern_japanese_year = (
-        r"自\s*令和(元|\d+|[０-９]+)年.*?至\s*令和(元|\d+|[０-９]+)年"
-    )
-    match_japanese_year = re.search(pattern_japanese_year, content)
+    match_japanese_year = _JAPANESE_YEAR_PATTERN.search(content)
     if match_japanese_year:
-        match_japanese_year_end = str(match_japanese_year.group(2))
-        convert_result = _convert_japanese_year_to_number(match_japanese_year_end)
-        year_calculate_result = 2019 + convert_result - 1
-        return str(year_calculate_result)
-
-    # パターン3: 単純な4桁年度パターン
-    pattern_year = r"(\d{4})"
-    match_year = re.search(pattern_year, content)
+        return _japanese_year_to_western(match_japanese_year.group(2))
+
+    match_year = _YEAR_PATTERN.search(content)
     if match_year:
         year_str = match_year.group(1)
-        year_int = int(year_str)
-        if 1990 <= year_int <= 2100:
+        if _MIN_FISCAL_YEAR <= int(year_str) <= _MAX_FISCAL_YEAR:
             return year_str
-
-    logger.warning("会計年度の抽出に失敗しました: '%s'", content)
     return None
 
 
@@ -69,29 +106,45 @@ def _convert_japanese_year_to_number(content: str) -> int:
         return int(return_value)
 
 
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _japanese_year_to_western(content: str) -> str:
+    """令和の年（"元"、全角数字を含む）を西暦の文字列に変換する。"""
+    return str(_REIWA_FIRST_YEAR + _convert_japanese_year_to_number(content) - 1)
+
+
 def extract_quarter_type(content: str) -> Optional[str]:
     """
     実際のXBRLデータ形式に対応した四半期抽出
 
     例: "第121期 第３四半期(自  2023年10月１日  至  2023年12月31日)"
     """
-    pattern_quarter = r"第\s*([0-4０-４一二三四１２３４]+)\s*四半期"
-    match_quarter = re.search(pattern_quarter, content)
+    quarter_text, quarter_type = _parse_quarter_type(content)
 
-    if match_quarter is None:
+    if quarter_text is None:
         logger.warning("四半期の抽出に失敗しました: '%s'", content)
-        return None
+    elif quarter_type is None:
+        logger.warning(
+            "四半期の変換に失敗しました: '%s' (content: '%s')", quarter_text, content
+        )
+    return quarter_type
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _parse_quarter_type(content: str) -> tuple[str | None, str | None]:
+    """`extract_quarter_type`の解析処理。同じ文字列の結果はメモ化される。
+
+    Returns:
+        抽出した四半期の文字列と、"Q1"〜"Q4"の四半期。抽出・変換できない場合はNone。
+    """
+    match_quarter = _QUARTER_PATTERN.search(content)
+    if match_quarter is None:
+        return None, None
 
     quarter_text = match_quarter.group(1).strip()
     quarter_num = convert_quarter_to_number(quarter_text)
-
     if quarter_num is not None and 1 <= quarter_num <= 4:
-        return f"Q{quarter_num}"
-    else:
-        logger.warning(
-            "四半期の変換に失敗しました: '%s' (content: '%s')", quarter_text, content
-        )
-        return None
+        return quarter_text, f"Q{quarter_num}"
+    return quarter_text, None
 
 
 def convert_quarter_to_number(quarter_text: str) -> Optional[int]:
@@ -104,23 +157,8 @@ def convert_quarter_to_number(quarter_text: str) -> Optional[int]:
     Returns:
         Optional[int]: 変換された四半期番号（1-4）。変換できない場合はNone。
     """
-    to_number_mapping = {
-        "一": 1,
-        "二": 2,
-        "三": 3,
-        "四": 4,
-        "１": 1,
-        "２": 2,
-        "３": 3,
-        "４": 4,  # 全角数字
-        "1": 1,
-        "2": 2,
-        "3": 3,
-        "4": 4,  # 半角数字
-    }
-
-    if quarter_text in to_number_mapping:
-        return to_number_mapping[quarter_text]
+    if quarter_text in _TO_NUMBER_MAPPING:
+        return _TO_NUMBER_MAPPING[quarter_text]
 
     # 直接数値変換を試行
     try:
@@ -129,3 +167,103 @@ def convert_quarter_to_number(quarter_text: str) -> Optional[int]:
     except ValueError:
         logger.warning("四半期文字列の変換に失敗しました: '%s'", quarter_text)
         return None
+
+
+def extract_fiscal_years(contents: "pd.Series") -> "pd.Series":
+    """
+    `extract_fiscal_year`のバッチ版。Seriesの全要素から会計年度を一括で抽出する。
+
+    各パターンを`str.extract`で列全体に適用し、`extract_fiscal_year`と同じ優先順位
+    （西暦の日付範囲 > 和暦の日付範囲 > 4桁の年）で結果を採用します。
+
+    Args:
+        contents (pd.Series): 会計年度・四半期を含む文字列のSeries。
+
+    Returns:
+        pd.Series: 会計年度の文字列のSeries（インデックスは`contents`と同じ）。
+            抽出できなかった要素はNone。
+    """
+    texts = contents.astype("string")
+    date_range_years = texts.str.extract(_DATE_RANGE_PATTERN)[1]
+    japanese_years = (
+        texts.str.extract(_JAPANESE_YEAR_PATTERN)[1]
+        .dropna()
+        .map(_japanese_year_to_western)
+    )
+    plain_years = texts.str.extract(_YEAR_PATTERN)[0]
+    plain_years = plain_years.where(
+        plain_years.astype("Int64").between(_MIN_FISCAL_YEAR, _MAX_FISCAL_YEAR)
+    )
+
+    fiscal_years = date_range_years.fillna(japanese_years).fillna(plain_years)
+    return _report_failures(fiscal_years, contents, "会計年度")
+
+
+def extract_quarter_types(contents: "pd.Series") -> "pd.Series":
+    """
+    `extract_quarter_type`のバッチ版。Seriesの全要素から四半期を一括で抽出する。
+
+    Args:
+        contents (pd.Series): 会計年度・四半期を含む文字列のSeries。
+
+    Returns:
+        pd.Series: "Q1"〜"Q4"の文字列のSeries（インデックスは`contents`と同じ）。
+            抽出できなかった要素はNone。
+    """
+    quarter_texts = contents.astype("string").str.extract(_QUARTER_PATTERN)[0]
+    quarter_numbers = quarter_texts.str.strip().map(
+        _TO_NUMBER_MAPPING, na_action="ignore"
+    )
+    quarter_types = ("Q" + quarter_numbers.astype("Int64").astype("string")).astype(
+        "string"
+    )
+    return _report_failures(quarter_types, contents, "四半期")
+
+
+def _report_failures(
+    results: "pd.Series", contents: "pd.Series", label: str
+) -> "pd.Series":
+    """抽出に失敗した件数をログに出力し、欠損値をNoneにしたobject型のSeriesを返す。"""
+    failed = results.isna()
+    if failed.any():
+        logger.warning(
+            "%sの抽出に失敗しました: %d件 (例: '%s')",
+            label,
+            int(failed.sum()),
+            contents[failed].iloc[0],
+        )
+    return results.astype(object).where(~failed, None)
+
+
+# XBRLのコンテキストID（例: "CurrentYTDDuration_NonConsolidatedMember"）の構成
+_CONTEXT_ID_PATTERN = re.compile(
+    r"^(?P<relative_period>.+?)(?P<duration_type>Duration|Instant)(?:_(?P<member>.+))?$"
+)
+
+
+def parse_context_id(context_id: str | None) -> dict:
+    """
+    XBRLのコンテキストIDを、相対期間・期間/時点・メンバーに分解する。
+
+    例: "CurrentYTDDuration_NonConsolidatedMember"
+        -> relative_period="CurrentYTD", duration_type="Duration",
+           member="NonConsolidatedMember"
+
+    Args:
+        context_id (str | None): XBRLのコンテキストID。
+
+    Returns:
+        dict: `relative_period`, `duration_type`, `member`をキーとする辞書。
+            形式に一致しない場合、`relative_period`と`member`はNoneになり、
+            `duration_type`はIDに"Duration"を含むかどうかで判定します。
+    """
+    match = _CONTEXT_ID_PATTERN.match(context_id) if context_id else None
+    if match is None:
+        return {
+            "relative_period": None,
+            "duration_type": (
+                "Duration" if context_id and "Duration" in context_id else "Instant"
+            ),
+            "member": None,
+        }
+    return match.groupdict()
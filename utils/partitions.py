@@ -0,0 +1,397 @@
+"""
+financial_dataテーブルの会計年度パーティションを管理するモジュール。
+
+financial_dataは会計年度(fiscal_year)ごとのレンジパーティション
+（`financial_data_yYYYY`）と、該当するパーティションがない行を受け止める
+デフォルトパーティション（`financial_data_default`）で構成されます。
+
+翌年度以降のパーティションを事前に作成しておくことで、取り込み時に行が
+デフォルトパーティションに溜まることを防ぎます。既にデフォルトパーティションに
+該当年度の行がある場合は、同じトランザクション内で新しいパーティションへ移動します。
+
+`sql/ddl.sql`で初期化したDBと`Base.metadata.create_all`で作成したDBのどちらも、
+`ensure_partitions`で`partition_year_range`の範囲のパーティションを作成します。
+パーティション化前、またはコンテキストを文字列で保持していた頃のfinancial_dataは、
+`migrate_financial_data`で現在の構造に移行します。
+報告書の自然キーの一意制約がない（導入前に作成した）financial_reportsには、
+`ensure_report_natural_key`で一意制約を追加します。
+
+Example:
+    with engine.begin() as connection:
+        ensure_partitions(connection)
+        create_year_partitions(connection, 2025, 2026)
+        detach_year_partition(connection, 2019)
+"""
+
+import datetime
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+
+from utils import parser
+from utils.db_models import Financial_context, Financial_data, Financial_report
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = Financial_data.__tablename__
+REPORT_NATURAL_KEY = "uq_financial_reports_natural_key"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+LEGACY_TABLE = f"{PARENT_TABLE}_legacy"
+
+# 事前に作成するパーティションの範囲（当年の何年前から何年先までか）
+PARTITION_YEARS_BEHIND = 6
+PARTITION_YEARS_AHEAD = 1
+
+
+def partition_year_range(today: datetime.date | None = None) -> tuple[int, int]:
+    """事前に作成するパーティションの会計年度の範囲（両端を含む）を返す。"""
+    year = (today or datetime.date.today()).year
+    return year - PARTITION_YEARS_BEHIND, year + PARTITION_YEARS_AHEAD
+
+
+def partition_name(fiscal_year: int) -> str:
+    """会計年度に対応するパーティション名を返す。"""
+    return f"{PARENT_TABLE}_y{int(fiscal_year)}"
+
+
+def list_partitions(connection: Connection) -> list[tuple[str, str]]:
+    """financial_dataのパーティション名と範囲の一覧を、名前順に返す。"""
+    statement = text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:parent AS regclass) "
+        "ORDER BY c.relname"
+    )
+    return [
+        tuple(row) for row in connection.execute(statement, {"parent": PARENT_TABLE})
+    ]
+
+
+def _table_exists(connection: Connection, table_name: str) -> bool:
+    statement = text("SELECT to_regclass(:table_name) IS NOT NULL")
+    return connection.execute(statement, {"table_name": table_name}).scalar()
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """financial_dataがパーティションテーブルとして作成されているかを返す。"""
+    statement = text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table_name)"
+    )
+    return bool(connection.execute(statement, {"table_name": PARENT_TABLE}).scalar())
+
+
+def create_default_partition(connection: Connection) -> bool:
+    """デフォルトパーティションを作成する。既に存在する場合はFalseを返す。"""
+    if _table_exists(connection, DEFAULT_PARTITION):
+        return False
+    connection.execute(
+        text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT")
+    )
+    logger.info("デフォルトパーティションを作成しました: %s", DEFAULT_PARTITION)
+    return True
+
+
+def ensure_partitions(connection: Connection) -> list[int]:
+    """デフォルトパーティションと、`partition_year_range`の各年度のパーティションを作成する。
+
+    作成済みのパーティションはそのまま残すため、取り込みの開始時に毎回呼び出せます。
+
+    Returns:
+        list[int]: 新たにパーティションを作成した会計年度。
+
+    Raises:
+        RuntimeError: financial_dataが移行前の構造のテーブルの場合。
+    """
+    if needs_migration(connection):
+        raise RuntimeError(
+            f"{PARENT_TABLE}が移行前の構造のテーブルです。"
+            "scripts/manage_partitions.py migrate を実行して移行してください。"
+        )
+    create_default_partition(connection)
+    return create_year_partitions(connection, *partition_year_range())
+
+
+def create_year_partition(connection: Connection, fiscal_year: int) -> bool:
+    """会計年度のパーティションを作成する。
+
+    デフォルトパーティションに該当年度の行がある場合は、新しいテーブルへ行を移動した
+    上でパーティションとして接続します。呼び出し元のトランザクション内で実行されます。
+
+    Args:
+        connection (Connection): DBへの接続。
+        fiscal_year (int): 作成するパーティションの会計年度。
+
+    Returns:
+        bool: 作成した場合はTrue。既に存在する場合はFalse。
+    """
+    fiscal_year = int(fiscal_year)
+    name = partition_name(fiscal_year)
+    if _table_exists(connection, name):
+        return False
+
+    bounds = f"FROM ({fiscal_year}) TO ({fiscal_year + 1})"
+    year_condition = f"fiscal_year >= {fiscal_year} AND fiscal_year < {fiscal_year + 1}"
+    has_default_rows = connection.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {year_condition})"
+        )
+    ).scalar()
+    if not has_default_rows:
+        connection.execute(
+            text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES {bounds}")
+        )
+        logger.info("パーティションを作成しました: %s", name)
+        return True
+
+    # デフォルトパーティションの行を移動してから接続する（接続時の範囲検証を通すため）
+    columns = ", ".join(column.name for column in Financial_data.__table__.columns)
+    connection.execute(
+        text(
+            f"CREATE TABLE {name} "
+            f"(LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    moved = connection.execute(
+        text(
+            f"INSERT INTO {name} ({columns}) "
+            f"SELECT {columns} FROM {DEFAULT_PARTITION} WHERE {year_condition}"
+        )
+    ).rowcount
+    connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {year_condition}"))
+    connection.execute(
+        text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}")
+    )
+    logger.info(
+        "パーティションを作成し、デフォルトパーティションから%d行を移動しました: %s",
+        moved,
+        name,
+    )
+    return True
+
+
+def create_year_partitions(
+    connection: Connection, start_year: int, end_year: int
+) -> list[int]:
+    """start_yearからend_yearまで（両端を含む）の会計年度のパーティションを作成する。
+
+    Returns:
+        list[int]: 新たにパーティションを作成した会計年度。
+
+    Raises:
+        ValueError: end_yearがstart_yearより前の場合。
+    """
+    if end_year < start_year:
+        raise ValueError(
+            f"終了年度({end_year})が開始年度({start_year})より前になっています。"
+        )
+    return [
+        fiscal_year
+        for fiscal_year in range(start_year, end_year + 1)
+        if create_year_partition(connection, fiscal_year)
+    ]
+
+
+def detach_year_partition(
+    connection: Connection, fiscal_year: int, drop: bool = False
+) -> str:
+    """会計年度のパーティションをfinancial_dataから切り離す。
+
+    切り離したテーブルはそのまま残るため、アーカイブ後に削除できます。
+    `drop`がTrueの場合は切り離した後に削除します。
+
+    Returns:
+        str: 切り離したパーティション名。
+
+    Raises:
+        ValueError: 該当年度のパーティションが存在しない場合。
+    """
+    name = partition_name(fiscal_year)
+    if not _table_exists(connection, name):
+        raise ValueError(f"パーティションが存在しません: {name}")
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+    if drop:
+        connection.execute(text(f"DROP TABLE {name}"))
+    logger.info("パーティションを切り離しました: %s (drop=%s)", name, drop)
+    return name
+
+
+def needs_migration(connection: Connection) -> bool:
+    """financial_dataが移行前の構造（パーティション化前、またはcontext_keyがない）かを返す。"""
+    if not is_partitioned(connection):
+        return True
+    statement = text(
+        "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table_name "
+        "AND column_name = 'context_key')"
+    )
+    return not connection.execute(statement, {"table_name": PARENT_TABLE}).scalar()
+
+
+def _rename_to_legacy(connection: Connection) -> None:
+    """移行前のfinancial_dataとそのパーティション・インデックス・シーケンスを退避用の名前に変更する。"""
+    # インデックス名・シーケンス名・パーティション名はスキーマ内で一意のため、
+    # 新しいテーブルと衝突しないよう全て改名する
+    partition_names = [name for name, _ in list_partitions(connection)]
+    sequence = connection.execute(
+        text("SELECT pg_get_serial_sequence(:table_name, 'data_id')"),
+        {"table_name": PARENT_TABLE},
+    ).scalar()
+    index_names = connection.execute(
+        text(
+            "SELECT indexname FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = ANY(:table_names)"
+        ),
+        {"table_names": [PARENT_TABLE, *partition_names]},
+    ).scalars()
+    # 長いインデックス名に接尾辞を付けると63文字で切り詰められるため、連番で改名する
+    for number, index_name in enumerate(list(index_names)):
+        connection.execute(
+            text(f'ALTER INDEX "{index_name}" RENAME TO "{LEGACY_TABLE}_idx{number}"')
+        )
+    for name in partition_names:
+        connection.execute(text(f"ALTER TABLE {name} RENAME TO {name}_legacy"))
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_TABLE}"))
+    if sequence is not None:
+        connection.execute(
+            text(
+                f"ALTER SEQUENCE {sequence} RENAME TO {PARENT_TABLE}_data_id_seq_legacy"
+            )
+        )
+
+
+def ensure_report_natural_key(connection: Connection) -> bool:
+    """financial_reportsに企業・会計年度・四半期の一意制約がなければ追加する。
+
+    報告書の登録は`INSERT ... ON CONFLICT`でこの一意制約を参照するため、
+    一意制約の導入前に作成したDBでは、取り込みの前に追加しておく必要があります。
+
+    Returns:
+        bool: 一意制約を追加した場合はTrue。既に存在する場合はFalse。
+
+    Raises:
+        RuntimeError: 自然キーが重複する報告書が既に登録されている場合。
+    """
+    table_name = Financial_report.__tablename__
+    exists = connection.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_constraint "
+            "WHERE conname = :name AND conrelid = to_regclass(:table_name))"
+        ),
+        {"name": REPORT_NATURAL_KEY, "table_name": table_name},
+    ).scalar()
+    if exists:
+        return False
+    duplicates = connection.execute(
+        text(
+            f"SELECT count(*) FROM (SELECT 1 FROM {table_name} "
+            "GROUP BY company_id, fiscal_year, quarter_type HAVING count(*) > 1) d"
+        )
+    ).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{table_name}に企業・会計年度・四半期が重複する報告書が{duplicates}組あります。"
+            "重複を解消してから再実行してください。"
+        )
+    connection.execute(
+        text(
+            f"ALTER TABLE {table_name} ADD CONSTRAINT {REPORT_NATURAL_KEY} "
+            "UNIQUE NULLS NOT DISTINCT (company_id, fiscal_year, quarter_type)"
+        )
+    )
+    logger.info("%sに一意制約を追加しました: %s", table_name, REPORT_NATURAL_KEY)
+    return True
+
+
+def _migrate_contexts(connection: Connection) -> int:
+    """退避したテーブルのコンテキストの組み合わせを、contextsテーブルに登録する。"""
+    Financial_context.__table__.create(connection, checkfirst=True)
+    legacy_contexts = connection.execute(
+        text(
+            "SELECT DISTINCT context_id, period_type, consolidated_type "
+            f"FROM {LEGACY_TABLE}"
+        )
+    ).all()
+    if not legacy_contexts:
+        return 0
+    rows = [
+        {
+            "context_id": context_id,
+            "period_type": period_type,
+            "consolidated_type": consolidated_type,
+            **parser.parse_context_id(context_id),
+        }
+        for context_id, period_type, consolidated_type in legacy_contexts
+    ]
+    connection.execute(
+        postgresql.insert(Financial_context)
+        .values(rows)
+        .on_conflict_do_nothing(constraint="uq_contexts_natural_key")
+    )
+    return len(rows)
+
+
+def migrate_financial_data(connection: Connection) -> int:
+    """移行前のfinancial_dataを、会計年度パーティションとcontextsを参照する構造に移行する。
+
+    既存のテーブル（パーティション化済みの場合は各パーティションも）を退避用の名前に
+    変更し、新しいテーブルを作成した上で、financial_reportsの会計年度と
+    contextsのcontext_keyを付与して全行を移します（data_idは維持します）。
+    呼び出し元のトランザクション内で実行されるため、失敗した場合は元のテーブルに戻ります。
+
+    Returns:
+        int: 移行した行数。既に最新の構造の場合は0。
+    """
+    if not needs_migration(connection):
+        logger.info("%sは既に最新の構造です", PARENT_TABLE)
+        return 0
+
+    _rename_to_legacy(connection)
+    context_count = _migrate_contexts(connection)
+
+    # パーティションテーブルを作成し（after_createでensure_partitionsが実行される）、
+    # 範囲外の年度の行がデフォルトパーティションに入らないよう先にパーティションを作成する
+    Financial_data.__table__.create(connection)
+    legacy_years = connection.execute(
+        text(
+            "SELECT DISTINCT CAST(r.fiscal_year AS integer) "
+            f"FROM {LEGACY_TABLE} d JOIN financial_reports r ON r.report_id = d.report_id"
+        )
+    ).scalars()
+    for fiscal_year in list(legacy_years):
+        create_year_partition(connection, fiscal_year)
+
+    columns = [column.name for column in Financial_data.__table__.columns]
+    source_columns = {
+        "fiscal_year": "CAST(r.fiscal_year AS smallint)",
+        "context_key": "c.context_key",
+    }
+    select_columns = ", ".join(
+        source_columns.get(column, f"d.{column}") for column in columns
+    )
+    migrated = connection.execute(
+        text(
+            f"INSERT INTO {PARENT_TABLE} ({', '.join(columns)}) OVERRIDING SYSTEM VALUE "
+            f"SELECT {select_columns} FROM {LEGACY_TABLE} d "
+            "JOIN financial_reports r ON r.report_id = d.report_id "
+            "JOIN contexts c ON c.context_id IS NOT DISTINCT FROM d.context_id "
+            "AND c.period_type = d.period_type "
+            "AND c.consolidated_type = d.consolidated_type"
+        )
+    ).rowcount
+    # 移行後の登録でdata_idが重複しないよう、採番を移行した最大値の後に進める
+    connection.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{PARENT_TABLE}', 'data_id'), "
+            f"max(data_id)) FROM {PARENT_TABLE} HAVING count(*) > 0"
+        )
+    )
+    connection.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+    logger.info(
+        "%sを移行しました: %d行 (コンテキスト: %d件)",
+        PARENT_TABLE,
+        migrated,
+        context_count,
+    )
+    return migrated
@@ -0,0 +1,94 @@
+"""
+Financial_contextモデルのためのリポジトリクラス。
+汎用的なCRUD操作はBaseRepositoryから継承し、
+コンテキストの次元テーブルの一括登録とcontext_keyの解決を提供します。
+"""
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from utils.db_models import Financial_context
+from utils.repositories.base_repository import BaseRepository
+
+
+def context_natural_key(context: dict) -> tuple:
+    """コンテキストの辞書から、次元テーブルの自然キーのタプルを返す。"""
+    return (
+        context["context_id"],
+        context["period_type"],
+        context["consolidated_type"],
+    )
+
+
+class ContextRepository(BaseRepository[Financial_context]):
+    def __init__(self, session: Session):
+        super().__init__(session, Financial_context)
+
+    def bulk_get_or_create(self, contexts: list[dict]) -> dict[tuple, int]:
+        """コンテキストを一括で登録（既存はスキップ）し、自然キーとcontext_keyの対応を返す。
+
+        PostgreSQLでは`INSERT ... ON CONFLICT DO NOTHING`を1回、context_keyの
+        SELECTを1回だけ発行します。複数の取り込みワーカーが同じ新規コンテキストを
+        同時に登録しても、一意制約の競合はDB側で吸収されます。
+
+        Args:
+            contexts: `Financial_context`モデルのカラム名を持つ辞書のリスト。
+                `data_mapper._context_mapping`の戻り値を想定。
+
+        Returns:
+            `(context_id, period_type, consolidated_type)`をキー、
+            context_keyを値とする辞書。
+        """
+        # 自然キーで重複を排除し、ロック順序を揃えるためにソートしておく
+        unique_contexts = {
+            context_natural_key(context): context for context in contexts
+        }
+        if not unique_contexts:
+            return {}
+        keys = sorted(unique_contexts, key=lambda key: tuple(map(str, key)))
+        rows = [unique_contexts[key] for key in keys]
+
+        connection = self.session.connection()
+        if connection.dialect.name == "postgresql":
+            statement = (
+                postgresql.insert(Financial_context)
+                .values(rows)
+                .on_conflict_do_nothing(constraint="uq_contexts_natural_key")
+            )
+            self.session.execute(statement)
+            return self._find_context_keys(keys)
+
+        existing_keys = self._find_context_keys(keys)
+        new_rows = [
+            row for row in rows if context_natural_key(row) not in existing_keys
+        ]
+        if new_rows:
+            self.session.execute(insert(Financial_context), new_rows)
+            existing_keys = self._find_context_keys(keys)
+        return existing_keys
+
+    def _find_context_keys(self, keys: list[tuple]) -> dict[tuple, int]:
+        """自然キーのリストに対応する登録済みのcontext_keyを返す。"""
+        context_ids = {
+            context_id for context_id, _, _ in keys if context_id is not None
+        }
+        statement = select(
+            Financial_context.context_id,
+            Financial_context.period_type,
+            Financial_context.consolidated_type,
+            Financial_context.context_key,
+        ).where(
+            or_(
+                Financial_context.context_id.in_(context_ids),
+                Financial_context.context_id.is_(None),
+            )
+        )
+        requested_keys = set(keys)
+        return {
+            (context_id, period_type, consolidated_type): context_key
+            for context_id, period_type, consolidated_type, context_key in (
+                self.session.execute(statement)
+            )
+            if (context_id, period_type, consolidated_type) in requested_keys
+        }
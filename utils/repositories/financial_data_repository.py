@@ -5,34 +5,89 @@ Financial_dataモデルのためのリポジトリクラス。
 Financial_dataモデルに特化したデータアクセスロジックを提供します。
 """
 
-from typing import List
+import csv
+import io
+from collections.abc import Iterable
+from decimal import Decimal
 
+import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select
 
-from utils.db_models import Financial_data, Financial_report, Financial_item
+from utils.db_models import (
+    Company,
+    Financial_context,
+    Financial_data,
+    Financial_item,
+    Financial_report,
+)
+from utils.metrics import count_statement
 from utils.repositories.base_repository import BaseRepository
 
+# COPY時にNULLとして扱う文字列（空文字列のテキスト値と区別するため）
+_COPY_NULL = r"\N"
+
 
 class FinancialDataRepository(BaseRepository[Financial_data]):
     def __init__(self, session: Session):
         super().__init__(session, Financial_data)
 
-    def find_by_report_id_and_element_ids(
-        self, report_id: int, element_ids: list[str]
-    ) -> List[Financial_data]:
+    def find_facts_by_report_id_and_element_ids(
+        self, report_id: int, element_ids: list[str], fiscal_year: int | None = None
+    ) -> list[tuple[str, Decimal | None, str | None]]:
+        """報告書の指定した項目の値を、読み取り専用の軽量なタプルで取得する。
+
+        `Financial_item`と`Financial_context`を結合した1回のSELECTで必要なカラムのみを
+        取得するため、ORMオブジェクトの生成や`data.item`の遅延読み込みが発生しません。
+        報告書の会計年度を`fiscal_year`に指定すると、該当年度のパーティションのみを検索します。
+
+        Returns:
+            (element_id, value, context_id)のリスト。登録順。
+        """
+        return [
+            (element_id, value, context_id)
+            for _, element_id, value, context_id in (
+                self.find_facts_by_report_ids_and_element_ids(
+                    [report_id],
+                    element_ids,
+                    [fiscal_year] if fiscal_year is not None else None,
+                )
+            )
+        ]
+
+    def find_facts_by_report_ids_and_element_ids(
+        self,
+        report_ids: list[int],
+        element_ids: list[str],
+        fiscal_years: Iterable[int] | None = None,
+    ) -> list[tuple[int, str, Decimal | None, str | None]]:
+        """複数の報告書の指定した項目の値を、1回のクエリで読み取り専用のタプルで取得する。
+
+        報告書の会計年度を`fiscal_years`に指定すると、該当年度のパーティションのみを検索します。
+
+        Returns:
+            (report_id, element_id, value, context_id)のリスト。登録順。
+        """
+        if not report_ids or not element_ids:
+            return []
         statement = (
-            select(self.model)
+            select(
+                self.model.report_id,
+                Financial_item.element_id,
+                self.model.value,
+                Financial_context.context_id,
+            )
             .join(Financial_item)
+            .join(Financial_context)
             .where(
-                self.model.report_id == report_id,
-                Financial_item.element_id.in_(
-                    element_ids
-                ),  # 複数のelement_idに対応できるようにin_を使用
+                self.model.report_id.in_(report_ids),
+                Financial_item.element_id.in_(element_ids),
             )
+            .order_by(self.model.data_id)
         )
-        result = self.session.scalars(statement).all()
-        return result
+        if fiscal_years is not None:
+            statement = statement.where(self.model.fiscal_year.in_(set(fiscal_years)))
+        return [tuple(row) for row in self.session.execute(statement).all()]
 
     def find_by_series_by_company_and_time(
         self, company_id: int, item_id: int
@@ -47,3 +102,125 @@ class FinancialDataRepository(BaseRepository[Financial_data]):
         )
         result = self.session.scalars(statement).all()
         return result
+
+    def find_series_by_edinet_code_and_element_ids(
+        self,
+        edinet_code: str,
+        element_ids: list[str],
+        consolidated_types: list[str] | None = None,
+    ) -> list[tuple]:
+        """企業の全報告書にわたる複数項目の値を、1回のクエリで時系列順に取得する。
+
+        Args:
+            edinet_code: 企業のEDINETコード。
+            element_ids: 取得する項目のelement_id。
+            consolidated_types: 連結種別（"連結"、"個別"など）で絞り込む場合に指定する。
+
+        Returns:
+            (report_id, fiscal_year, quarter_type, fiscal_year_end, element_id,
+            value, context_id)のリスト。会計年度末日・四半期・登録順。
+        """
+        if not element_ids:
+            return []
+        statement = (
+            select(
+                Financial_report.report_id,
+                Financial_report.fiscal_year,
+                Financial_report.quarter_type,
+                Financial_report.fiscal_year_end,
+                Financial_item.element_id,
+                self.model.value,
+                Financial_context.context_id,
+            )
+            .join(Financial_item)
+            .join(Financial_context)
+            .join(Financial_report)
+            .join(Company)
+            .where(
+                Company.edinet_code == edinet_code,
+                Financial_item.element_id.in_(element_ids),
+            )
+            .order_by(
+                Financial_report.fiscal_year_end,
+                Financial_report.quarter_type,
+                Financial_report.report_id,
+                self.model.data_id,
+            )
+        )
+        if consolidated_types is not None:
+            statement = statement.where(
+                Financial_context.consolidated_type.in_(consolidated_types)
+            )
+        return [tuple(row) for row in self.session.execute(statement).all()]
+
+    def delete_by_report_id(
+        self, report_id: int, fiscal_year: int | None = None
+    ) -> int:
+        """報告書の財務データを削除する。再取り込みで財務データを置き換える際に利用する。
+
+        Args:
+            report_id: 報告書のID。
+            fiscal_year: 報告書の会計年度。指定すると対象のパーティションのみを走査する。
+
+        Returns:
+            削除した行数。
+        """
+        statement = delete(Financial_data).where(Financial_data.report_id == report_id)
+        if fiscal_year is not None:
+            statement = statement.where(Financial_data.fiscal_year == fiscal_year)
+        return self.session.execute(statement).rowcount
+
+    def bulk_load(self, data_frame: pd.DataFrame, batch_size: int = 5000) -> int:
+        """財務データのDataFrameを一括でテーブルに登録する。
+
+        PostgreSQLの場合は、UoWのセッションが保持するpsycopg2の接続を通じて
+        `COPY ... FROM STDIN`でストリーミング登録します。その他のDBの場合は、
+        `batch_size`件ごとに`insert()`のexecutemanyで登録します。
+        いずれもセッションと同一のトランザクション内で実行されるため、
+        commit/rollbackは呼び出し元(UoW)に委ねられます。
+
+        Args:
+            data_frame: `Financial_data`モデルのカラム名を持つDataFrame。
+                `data_mapper.financial_data_columnar_mapping`の戻り値を想定。
+            batch_size: COPYを利用しない場合の1回あたりの登録件数。
+
+        Returns:
+            登録した行数。
+        """
+        if data_frame.empty:
+            return 0
+
+        connection = self.session.connection()
+        if connection.dialect.name == "postgresql":
+            self._copy_from_dataframe(connection, data_frame)
+        else:
+            records = data_frame.to_dict("records")
+            for start in range(0, len(records), batch_size):
+                connection.execute(
+                    insert(self.model), records[start : start + batch_size]
+                )
+        return len(data_frame)
+
+    def _copy_from_dataframe(self, connection, data_frame: pd.DataFrame) -> None:
+        """DataFrameをCSVとしてメモリに書き出し、COPYでテーブルに流し込む。"""
+        buffer = io.StringIO()
+        data_frame.to_csv(
+            buffer,
+            index=False,
+            header=False,
+            na_rep=_COPY_NULL,
+            quoting=csv.QUOTE_MINIMAL,
+        )
+        buffer.seek(0)
+
+        columns = ", ".join(f'"{column}"' for column in data_frame.columns)
+        copy_sql = (
+            f"COPY {self.model.__tablename__} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')"
+        )
+        # SQLAlchemyの接続から、セッションと同一トランザクションのDBAPI接続を取得
+        dbapi_connection = connection.connection.driver_connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, buffer)
+        # DBAPIのカーソルを直接使うため、SQL文の件数の計測に手動で加算する
+        count_statement()
@@ -6,15 +6,20 @@ Financial_itemモデルに特化したデータアクセスロジックを提供
 
 from typing import List
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import any_, insert, select
+from sqlalchemy.dialects import postgresql
 
 from utils.db_models import Financial_item
 from utils.repositories.base_repository import BaseRepository
+from utils.repositories.item_id_cache import ItemIdCache
 
 
 class FinancialItemRepository(BaseRepository[Financial_item]):
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, item_id_cache: ItemIdCache | None = None):
         super().__init__(session, Financial_item)
+        self.item_id_cache = item_id_cache
+        # このセッションで新たに解決した対応。コミット時にUoWがキャッシュへ反映する
+        self.pending_item_ids: dict[str, int] = {}
 
     def find_by_element_id(self, element_id: str) -> List[Financial_item] | None:
         statement = select(Financial_item).where(
@@ -30,3 +35,71 @@ class FinancialItemRepository(BaseRepository[Financial_item]):
         )
         result = self.session.scalars(statement).all()
         return list(result)
+
+    def bulk_get_or_create(self, items: list[dict]) -> dict[str, int]:
+        """財務項目を一括で登録（既存はスキップ）し、element_idとitem_idの対応を返す。
+
+        PostgreSQLでは`INSERT ... ON CONFLICT (element_id) DO NOTHING`を1回、
+        `SELECT element_id, item_id ... WHERE element_id = ANY(...)`を1回だけ
+        発行します。複数の取り込みワーカーが同じ新規項目を同時に登録しても、
+        一意制約の競合はDB側で吸収されるため安全です。
+
+        `item_id_cache`が設定されている場合は、キャッシュに存在する項目について
+        DBへの問い合わせを行わず、存在しない項目のみをDBで解決します。
+
+        Args:
+            items: `Financial_item`モデルのカラム名を持つ辞書のリスト。
+                `data_mapper._financial_item_mapping`の戻り値を想定。
+
+        Returns:
+            element_idをキー、item_idを値とする辞書。
+        """
+        # element_idで重複を排除し、ロック順序を揃えるためにソートしておく
+        unique_items = {item["element_id"]: item for item in items}
+        if not unique_items:
+            return {}
+        element_ids = sorted(unique_items)
+
+        if self.item_id_cache is None:
+            return self._get_or_create_in_db(unique_items, element_ids)
+
+        self.item_id_cache.warm_up(self.session)
+        cached_ids, missing_ids = self.item_id_cache.lookup(element_ids)
+        if not missing_ids:
+            return cached_ids
+        created_ids = self._get_or_create_in_db(unique_items, missing_ids)
+        self.pending_item_ids.update(created_ids)
+        return {**cached_ids, **created_ids}
+
+    def _get_or_create_in_db(
+        self, unique_items: dict[str, dict], element_ids: list[str]
+    ) -> dict[str, int]:
+        """element_idのソート済みリストに対応する項目をDBで登録・解決する。"""
+        rows = [unique_items[element_id] for element_id in element_ids]
+
+        connection = self.session.connection()
+        if connection.dialect.name == "postgresql":
+            statement = (
+                postgresql.insert(Financial_item)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["element_id"])
+            )
+            self.session.execute(statement)
+            id_statement = select(
+                Financial_item.element_id, Financial_item.item_id
+            ).where(Financial_item.element_id == any_(element_ids))
+        else:
+            id_statement = select(
+                Financial_item.element_id, Financial_item.item_id
+            ).where(Financial_item.element_id.in_(element_ids))
+            existing_ids = {
+                element_id for element_id, _ in self.session.execute(id_statement)
+            }
+            new_rows = [row for row in rows if row["element_id"] not in existing_ids]
+            if new_rows:
+                self.session.execute(insert(Financial_item), new_rows)
+
+        return {
+            element_id: item_id
+            for element_id, item_id in self.session.execute(id_statement)
+        }
@@ -4,22 +4,148 @@ Financial_reportモデルのためのリポジトリクラス。
 Financial_reportモデルに特化したデータアクセスロジックを提供します。
 """
 
+from collections.abc import Iterable
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
-from sqlalchemy import select
 
-from utils.db_models import Financial_report
+from utils.db_models import Company, Financial_report
 from utils.repositories.base_repository import BaseRepository
 
+# 最新の報告書を判定する並び順（会計年度、四半期、登録順の降順）
+_LATEST_REPORT_ORDER = (
+    Financial_report.fiscal_year.desc(),
+    Financial_report.quarter_type.desc().nulls_last(),
+    Financial_report.report_id.desc(),
+)
+
 
 class FinancialReportRepository(BaseRepository[Financial_report]):
     def __init__(self, session: Session):
         super().__init__(session, Financial_report)
 
+    def find_by_natural_key(
+        self, company_id: int, fiscal_year: str, quarter_type: str | None
+    ) -> Financial_report | None:
+        """企業・会計年度・四半期が一致する報告書を返す。複数ある場合は最後に登録されたもの。"""
+        statement = (
+            select(Financial_report)
+            .where(
+                Financial_report.company_id == company_id,
+                Financial_report.fiscal_year == str(fiscal_year),
+                Financial_report.quarter_type.is_not_distinct_from(quarter_type),
+            )
+            .order_by(Financial_report.report_id.desc())
+        )
+        return self.session.scalars(statement).first()
+
+    def upsert_by_natural_key(
+        self, entity: Financial_report
+    ) -> tuple[Financial_report, bool]:
+        """企業・会計年度・四半期が一致する報告書があれば更新し、なければ追加する。
+
+        `upsert`（`session.merge`）は主キーでのみ同一性を判定するため、主キーを持たない
+        報告書は常に新規に追加されてしまいます。訂正などで同じ報告書を再取り込みした際に
+        報告書が重複しないよう、自然キーの一意制約（`uq_financial_reports_natural_key`）で
+        既存の報告書を判定します。PostgreSQLでは`INSERT ... ON CONFLICT ... DO UPDATE
+        ... RETURNING`を1回だけ発行するため、複数の書き込みワーカーが同じ報告書を
+        同時に登録しても重複しません。
+
+        Returns:
+            登録・更新した報告書と、新規に追加した場合はTrue、既存の報告書を
+            更新した場合はFalseの組。Falseの場合、呼び出し側で財務データの置き換えを行う。
+        """
+        values = {
+            column: getattr(entity, column)
+            for column in (
+                "company_id",
+                "document_type",
+                "fiscal_year",
+                "quarter_type",
+                "fiscal_year_end",
+                "filing_date",
+            )
+        }
+        values["fiscal_year"] = str(values["fiscal_year"])
+        connection = self.session.connection()
+        if connection.dialect.name != "postgresql":
+            existing = self.find_by_natural_key(
+                entity.company_id, entity.fiscal_year, entity.quarter_type
+            )
+            if existing is None:
+                self.add(entity)
+                return entity, True
+            for column in ("document_type", "fiscal_year_end", "filing_date"):
+                setattr(existing, column, values[column])
+            existing.updated_at = func.now()
+            return existing, False
+
+        insert_statement = postgresql.insert(Financial_report).values(values)
+        statement = insert_statement.on_conflict_do_update(
+            constraint="uq_financial_reports_natural_key",
+            set_={
+                "document_type": insert_statement.excluded.document_type,
+                "fiscal_year_end": insert_statement.excluded.fiscal_year_end,
+                "filing_date": insert_statement.excluded.filing_date,
+                "updated_at": func.now(),
+            },
+        ).returning(
+            Financial_report,
+            # 追加した行はxmaxが0になるため、更新と区別できる
+            literal_column("xmax = 0").label("inserted"),
+        )
+        report, inserted = self.session.execute(
+            statement, execution_options={"populate_existing": True}
+        ).one()
+        return report, inserted
+
     def find_latest_by_company_id(self, company_id: int) -> Financial_report | None:
         statement = (
             select(Financial_report)
             .where(Financial_report.company_id == company_id)
-            .order_by(Financial_report.fiscal_year.desc())
+            .order_by(*_LATEST_REPORT_ORDER)
         )
         result = self.session.scalars(statement).first()
         return result
+
+    def find_latest_with_company(
+        self, edinet_codes: Iterable[str] | None = None
+    ) -> list[tuple[Company, Financial_report]]:
+        """企業ごとの最新の報告書を、企業と組にして1回のクエリで取得する。
+
+        ウィンドウ関数(`row_number() OVER (PARTITION BY company_id ...)`)で
+        企業ごとに報告書を順位付けし、1位の報告書のみを返します。
+
+        Args:
+            edinet_codes: 対象企業のEDINETコード。Noneの場合は全企業。
+
+        Returns:
+            (企業, 最新の報告書)のリスト。EDINETコード順。報告書がない企業は含まない。
+        """
+        ranked = select(
+            Financial_report.report_id,
+            func.row_number()
+            .over(
+                partition_by=Financial_report.company_id,
+                order_by=_LATEST_REPORT_ORDER,
+            )
+            .label("report_rank"),
+        )
+        if edinet_codes is not None:
+            edinet_codes = list(edinet_codes)
+            if not edinet_codes:
+                return []
+            ranked = ranked.join(Financial_report.company).where(
+                Company.edinet_code.in_(edinet_codes)
+            )
+        ranked = ranked.subquery()
+
+        statement = (
+            select(Company, Financial_report)
+            .join(Financial_report.company)
+            .join(ranked, ranked.c.report_id == Financial_report.report_id)
+            .where(ranked.c.report_rank == 1)
+            .order_by(Company.edinet_code)
+        )
+        return [tuple(row) for row in self.session.execute(statement).all()]
@@ -0,0 +1,101 @@
+"""
+Ingestion_ledgerモデルのためのリポジトリクラス。
+汎用的なCRUD操作はBaseRepositoryから継承し、
+取り込み済みの入力の判定と取り込み結果の記録を提供します。
+"""
+
+from collections.abc import Iterable
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from utils.db_models import Ingestion_ledger
+from utils.repositories.base_repository import BaseRepository
+
+# 取り込み台帳のステータス
+INGESTION_SUCCEEDED = "succeeded"
+INGESTION_FAILED = "failed"
+
+
+class IngestionLedgerRepository(BaseRepository[Ingestion_ledger]):
+    def __init__(self, session: Session):
+        super().__init__(session, Ingestion_ledger)
+
+    def find_by_key(self, doc_id: str, file_hash: str) -> Ingestion_ledger | None:
+        statement = select(Ingestion_ledger).where(
+            Ingestion_ledger.doc_id == doc_id,
+            Ingestion_ledger.file_hash == file_hash,
+        )
+        return self.session.scalars(statement).first()
+
+    def find_succeeded_doc_ids(self, doc_ids: Iterable[str]) -> set[str]:
+        """指定したdocIDのうち、取り込みに成功済みのものを返す。"""
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return set()
+        statement = select(Ingestion_ledger.doc_id).where(
+            Ingestion_ledger.doc_id.in_(doc_ids),
+            Ingestion_ledger.status == INGESTION_SUCCEEDED,
+        )
+        return set(self.session.scalars(statement).all())
+
+    def find_succeeded_keys(
+        self, keys: Iterable[tuple[str, str]]
+    ) -> set[tuple[str, str]]:
+        """指定した(docID, ファイルハッシュ)のうち、取り込みに成功済みのものを返す。"""
+        keys = list(keys)
+        if not keys:
+            return set()
+        statement = select(Ingestion_ledger.doc_id, Ingestion_ledger.file_hash).where(
+            tuple_(Ingestion_ledger.doc_id, Ingestion_ledger.file_hash).in_(keys),
+            Ingestion_ledger.status == INGESTION_SUCCEEDED,
+        )
+        return {tuple(row) for row in self.session.execute(statement).all()}
+
+    def get_version_token(self) -> str:
+        """取り込み成功の件数と最終更新日時から、DBのデータの版を表すトークンを返す。
+
+        新たな取り込みが成功するたびに値が変わるため、読み取り結果のキャッシュの
+        無効化に利用できます。
+        """
+        statement = select(
+            func.count(Ingestion_ledger.ledger_id),
+            func.max(Ingestion_ledger.updated_at),
+        ).where(Ingestion_ledger.status == INGESTION_SUCCEEDED)
+        count, latest = self.session.execute(statement).one()
+        return f"{count}:{latest.isoformat() if latest is not None else ''}"
+
+    def record(self, doc_id: str, file_hash: str, **fields) -> Ingestion_ledger:
+        """(docID, ファイルハッシュ)の取り込み結果を記録する。
+
+        既に記録がある場合（前回失敗した入力の再取り込みなど）は上書きします。
+        PostgreSQLでは`(doc_id, file_hash)`の一意制約に対する
+        `INSERT ... ON CONFLICT ... DO UPDATE ... RETURNING`を1回だけ発行するため、
+        複数の書き込みワーカーが同じ入力を同時に記録しても台帳は重複しません。
+
+        Args:
+            doc_id (str): EDINETの書類ID。
+            file_hash (str): 入力ファイルのSHA-256ハッシュ。
+            **fields: status, row_count, fact_count, elapsed_ms, error_message,
+                source_pathなど、記録するカラムの値。
+        """
+        if self.session.connection().dialect.name == "postgresql":
+            insert_statement = postgresql.insert(Ingestion_ledger).values(
+                doc_id=doc_id, file_hash=file_hash, **fields
+            )
+            statement = insert_statement.on_conflict_do_update(
+                index_elements=["doc_id", "file_hash"],
+                set_={**fields, "updated_at": func.now()},
+            ).returning(Ingestion_ledger)
+            return self.session.scalars(
+                statement, execution_options={"populate_existing": True}
+            ).one()
+
+        entry = self.find_by_key(doc_id, file_hash)
+        if entry is None:
+            entry = Ingestion_ledger(doc_id=doc_id, file_hash=file_hash)
+            self.add(entry)
+        for column, value in fields.items():
+            setattr(entry, column, value)
+        return entry
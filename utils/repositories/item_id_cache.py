@@ -0,0 +1,118 @@
+"""
+Financial_itemのelement_idとitem_idの対応を保持する、プロセス内キャッシュ。
+
+`financial_items`マスタは小さく（想定約10,000件）、ほとんど変更されないため、
+初回利用時にテーブル全体を読み込み、以降の参照はDBに問い合わせずに応答します。
+キャッシュに存在しないelement_idはDBへの問い合わせにフォールバックします。
+
+キャッシュの更新はUnit of Workが担当します。トランザクション内で新規登録された
+項目はコミット成功時にのみキャッシュへ反映し、ロールバック時はキャッシュ全体を
+破棄して、次回利用時にDBから再読み込みします。
+
+Attributes:
+    shared_item_id_cache (ItemIdCache): プロセス全体で共有されるキャッシュ。
+"""
+
+import logging
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from utils.db_models import Financial_item
+
+logger = logging.getLogger(__name__)
+
+
+class ItemIdCache:
+    """element_id -> item_id の対応を保持するスレッドセーフなキャッシュ。
+
+    Attributes:
+        hits (int): キャッシュから応答できたelement_idの累計数。
+        misses (int): キャッシュに存在せずDBへフォールバックしたelement_idの累計数。
+    """
+
+    def __init__(self):
+        self._item_ids: dict[str, int] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def warm_up(self, session: Session) -> None:
+        """未読み込みの場合のみ、financial_itemsテーブル全体を読み込む。
+
+        複数のスレッドが同時に呼び出しても、テーブルの読み込みは1回のみ行います。
+        """
+        with self._lock:
+            if self._loaded:
+                return
+            rows = session.execute(
+                select(Financial_item.element_id, Financial_item.item_id)
+            ).all()
+            self._item_ids.update({element_id: item_id for element_id, item_id in rows})
+            self._loaded = True
+        logger.info("財務項目キャッシュを読み込みました: %s件", len(rows))
+
+    def lookup(self, element_ids: list[str]) -> tuple[dict[str, int], list[str]]:
+        """element_idのリストをキャッシュから引き当てる。
+
+        Args:
+            element_ids: 検索するelement_idのリスト。
+
+        Returns:
+            キャッシュに存在した`{element_id: item_id}`と、存在しなかったelement_idのリスト。
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for element_id in element_ids:
+                item_id = self._item_ids.get(element_id)
+                if item_id is None:
+                    missing.append(element_id)
+                else:
+                    found[element_id] = item_id
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def update(self, item_id_map: dict[str, int]) -> None:
+        """コミット済みの対応をキャッシュに追加する。"""
+        if not item_id_map:
+            return
+        with self._lock:
+            self._item_ids.update(item_id_map)
+
+    def invalidate(self) -> None:
+        """キャッシュを破棄し、次回利用時にDBから再読み込みさせる。"""
+        with self._lock:
+            self._item_ids.clear()
+            self._loaded = False
+
+    def stats(self) -> dict:
+        """キャッシュの件数とヒット率を返す。大量取り込み時の効果測定に利用する。"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._item_ids),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else None,
+            }
+
+    def format_stats(self) -> str:
+        """`stats`の結果を、取り込みスクリプトの実行結果として表示する1行に整形する。"""
+        stats = self.stats()
+        hit_rate = stats["hit_rate"]
+        return (
+            f"item_id cache: {stats['size']} items, "
+            f"{stats['hits']} hits, {stats['misses']} misses, hit rate: "
+            f"{'-' if hit_rate is None else f'{hit_rate:.1%}'}"
+        )
+
+
+shared_item_id_cache = ItemIdCache()
@@ -0,0 +1,114 @@
+"""
+Report_metricsモデルのためのリポジトリクラス。
+汎用的なCRUD操作はBaseRepositoryから継承し、
+報告書ごとの主要指標の一括取得と登録・更新を提供します。
+"""
+
+from collections.abc import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from utils.db_models import Financial_report, Report_metrics
+from utils.repositories.base_repository import BaseRepository
+
+
+class ReportMetricsRepository(BaseRepository[Report_metrics]):
+    def __init__(self, session: Session):
+        super().__init__(session, Report_metrics)
+
+    def find_by_report_ids(
+        self, report_ids: Iterable[int]
+    ) -> dict[int, Report_metrics]:
+        """指定した報告書の主要指標を、report_idをキーとする辞書で返す。
+
+        主要指標が未登録の報告書は含まれません。
+        """
+        report_ids = list(report_ids)
+        if not report_ids:
+            return {}
+        statement = select(Report_metrics).where(
+            Report_metrics.report_id.in_(report_ids)
+        )
+        return {
+            metrics.report_id: metrics for metrics in self.session.scalars(statement)
+        }
+
+    def find_report_ids(self, missing_only: bool = False) -> list[int]:
+        """主要指標の再構築対象となる報告書のIDを、report_id順に返す。
+
+        Args:
+            missing_only (bool): Trueの場合は、主要指標が未登録の報告書のみを返す。
+        """
+        statement = select(Financial_report.report_id).order_by(
+            Financial_report.report_id
+        )
+        if missing_only:
+            statement = statement.outerjoin(
+                Report_metrics,
+                Report_metrics.report_id == Financial_report.report_id,
+            ).where(Report_metrics.report_id.is_(None))
+        return list(self.session.scalars(statement).all())
+
+    def save(self, report_id: int, **values) -> Report_metrics:
+        """報告書の主要指標を登録する。既に登録済みの場合は上書きする。
+
+        Args:
+            report_id (int): 報告書のID。
+            **values: net_sales, operating_income, ordinary_income, net_income,
+                各利益率など、登録するカラムの値。
+        """
+        metrics = self.get(report_id)
+        if metrics is None:
+            metrics = Report_metrics(report_id=report_id)
+            self.add(metrics)
+        for column, value in values.items():
+            setattr(metrics, column, value)
+        return metrics
+
+    def save_many(self, metrics_by_report: dict[int, dict]) -> int:
+        """複数の報告書の主要指標を一括で登録・上書きする。
+
+        PostgreSQLでは`INSERT ... ON CONFLICT (report_id) DO UPDATE`を1回だけ発行し、
+        報告書ごとに既存の行を取得しません。主要指標の再構築で利用します。
+
+        Args:
+            metrics_by_report (dict[int, dict]): report_idをキー、`save`の`values`と
+                同じカラムの値の辞書を値とする辞書。全報告書で同じカラムを指定する。
+
+        Returns:
+            int: 登録・上書きした報告書の件数。
+        """
+        rows = [
+            {"report_id": report_id, **values}
+            for report_id, values in metrics_by_report.items()
+        ]
+        if not rows:
+            return 0
+        if self.session.connection().dialect.name != "postgresql":
+            existing = self.find_by_report_ids(metrics_by_report)
+            for row in rows:
+                metrics = existing.get(row["report_id"])
+                if metrics is None:
+                    self.add(Report_metrics(**row))
+                else:
+                    for column, value in row.items():
+                        setattr(metrics, column, value)
+            return len(rows)
+
+        insert_statement = postgresql.insert(Report_metrics).values(rows)
+        value_columns = [column for column in rows[0] if column != "report_id"]
+        self.session.execute(
+            insert_statement.on_conflict_do_update(
+                index_elements=["report_id"],
+                set_={
+                    **{
+                        column: insert_statement.excluded[column]
+                        for column in value_columns
+                    },
+                    "updated_at": func.now(),
+                },
+            )
+        )
+        return len(rows)
@@ -10,6 +10,8 @@
 
 Attributes:
     FinancialSummaryDTO: 単一期間における財務サマリーを保持するDTO。
+    IngestionSource: 取り込み台帳に記録する、取り込み元の入力を表すDTO。
+    prepare_financial_data: CSVの内容を標準化し、DBモデルへマッピングする関数。
     FinancialService: 財務関連のビジネスロジックをカプセル化したサービスクラス。
 
 Example:
@@ -21,13 +23,22 @@ Example:
 
 """
 
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable
 from typing import Literal, List, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import pandas as pd
 
 import utils.service.unitofwork as uow
 import utils.data_mapper as data_mapper
-from utils.db_models import Company, Financial_item, Financial_report, Financial_data
+from utils.db_models import Company, Financial_report
+from utils.metrics import MetricsRecorder, MetricsSink
+from utils.staging import StagingStore
+from utils.repositories.ingestion_ledger_repository import (
+    INGESTION_FAILED,
+    INGESTION_SUCCEEDED,
+)
 
 
 @dataclass
@@ -50,6 +61,83 @@ class FinancialSummaryDTO:
     net_profit_rate: float | None
 
 
+@dataclass
+class IngestionSource:
+    """取り込み台帳に記録する取り込み元の入力
+
+    Attributes:
+        doc_id: EDINETの書類ID。
+        file_hash: 入力CSVのSHA-256ハッシュ。
+        source_path: 入力ファイルのパスなど、取り込み元を示す文字列。
+        started_at: 取り込みを開始した時刻（UNIX時間）。経過時間の計測に利用する。
+    """
+
+    doc_id: str
+    file_hash: str
+    source_path: str | None = None
+    started_at: float = field(default_factory=time.time)
+
+    @property
+    def elapsed_ms(self) -> int:
+        return int((time.time() - self.started_at) * 1000)
+
+
+def prepare_financial_data(
+    raw: pd.DataFrame | Callable[[], pd.DataFrame],
+    config: dict,
+    metrics: MetricsRecorder | None = None,
+    doc_id: str | None = None,
+    staging_store: StagingStore | None = None,
+    file_hash: str | None = None,
+) -> tuple[pd.DataFrame, dict] | None:
+    """CSVの内容を標準化し、DBモデルへのマッピングまで変換する。
+
+    DBに接続しない純粋な変換処理のため、ワーカープロセスでも実行できます。
+    `staging_store`と`file_hash`が指定された場合、標準化済みのParquetがあれば
+    標準化を行わずに読み込み、なければ標準化後にParquetとして保存します。
+    各ステージ（staging_load, decode, standardize, staging_save, map_models）の
+    処理時間は`metrics`に送ります。
+
+    Args:
+        raw: EDINETのCSVから読み込んだ生のDataFrame。CSVの読み込み自体を
+            Parquetの読み込みで省略したい場合は、DataFrameを返す関数を渡す
+            （decodeステージとして計測し、Parquetがない場合のみ呼び出す）。
+        config: `config.toml`の内容。
+        metrics: 各ステージの計測に利用するレコーダー。Noneの場合は計測しない。
+        doc_id: 計測結果に付与するEDINETの書類ID。
+        staging_store: 標準化済みDataFrameを保存するストア。Noneの場合は保存しない。
+        file_hash: 入力CSVのSHA-256ハッシュ。`staging_store`のキーに利用する。
+
+    Returns:
+        標準化済みDataFrameとマッピング結果の組。CSVが空の場合はNone。
+    """
+    if metrics is None:
+        metrics = MetricsRecorder()
+    if not file_hash:
+        staging_store = None
+    standardized_df = None
+    if staging_store is not None:
+        with metrics.stage("staging_load", doc_id=doc_id) as stage:
+            standardized_df = staging_store.load(file_hash)
+            stage.rows = len(standardized_df) if standardized_df is not None else 0
+    if standardized_df is None:
+        if callable(raw):
+            with metrics.stage("decode", doc_id=doc_id) as stage:
+                raw = raw()
+                stage.rows = len(raw)
+        if raw.empty:
+            return None
+        with metrics.stage("standardize", len(raw), doc_id):
+            standardized_df = data_mapper.standardize_raw_data(raw)
+        if staging_store is not None:
+            with metrics.stage("staging_save", len(standardized_df), doc_id):
+                staging_store.save(file_hash, standardized_df)
+    with metrics.stage("map_models", doc_id=doc_id) as stage:
+        model_data_bundle = data_mapper.map_data_to_models(standardized_df, config)
+        stage.rows = len(model_data_bundle["items"])
+    return standardized_df, model_data_bundle
+
+
 # 主要財務項目リスト ユニークなelement_idを指定する
 _SUMMARY_ITEMS = {
     # 売上高
@@ -75,17 +163,178 @@ _SUMMARY_ITEMS = {
 }
 
 
+# サマリーの取得対象となる全element_id
+_SUMMARY_ELEMENT_IDS = [
+    element_id for id_list in _SUMMARY_ITEMS.values() for element_id in id_list
+]
+
+
+# 連結種別（financial_data.consolidated_type）の値。IFRS適用企業の値は"その他"になる
+_CONSOLIDATED_TYPES = ["連結", "その他"]
+_NON_CONSOLIDATED_TYPES = ["個別"]
+_NON_CONSOLIDATED_MEMBER = "_NonConsolidatedMember"
+
+
+def _context_priority(context_id: str | None, consolidated: bool = True) -> int:
+    """サマリーに採用するコンテキストの優先度（小さいほど優先）を返す。
+
+    当期累計（`CurrentYTD*`）、当期のその他の期間・時点（`CurrentQuarter*`など）、
+    前期以前の順に優先します。セグメントや個別などメンバー付きのコンテキスト
+    （`CurrentYTDDuration_...Member`）は最後の候補です。
+    `consolidated`がFalseの場合は、個別（`_NonConsolidatedMember`）を
+    メンバーなしのコンテキストとして扱います。
+    """
+    if context_id is None:
+        return 3
+    if not consolidated:
+        context_id = context_id.removesuffix(_NON_CONSOLIDATED_MEMBER)
+    if "_" in context_id:
+        return 4
+    if context_id.startswith("CurrentYTD"):
+        return 0
+    if context_id.startswith("Current"):
+        return 1
+    return 2
+
+
+def _build_data_map(facts: Iterable[tuple], consolidated: bool = True) -> dict:
+    """(element_id, value, context_id)から、項目ごとに優先度の最も高い値を選ぶ。
+
+    同じ優先度の値が複数ある場合は、後に登録された値を採用します。
+    """
+    data_map: dict = {}
+    priorities: dict[str, int] = {}
+    for element_id, value, context_id in facts:
+        priority = _context_priority(context_id, consolidated)
+        if priority <= priorities.get(element_id, priority):
+            data_map[element_id] = value
+            priorities[element_id] = priority
+    return data_map
+
+
+def _get_value_from_candidates(data_map: dict, condidates_list: list) -> int | None:
+    for conditate in condidates_list:
+        if conditate in data_map:
+            return data_map.get(conditate)
+    return None
+
+
+def _profit_rate(profit, net_sales) -> float | None:
+    """売上高に対する利益率(%)を計算する。いずれかの値がない場合はNone。"""
+    if profit and net_sales and net_sales != 0:
+        return profit / net_sales * 100
+    return None
+
+
+def _to_million(value) -> float | None:
+    """100万円単位に変換する。値がない場合はNone。"""
+    return value / 1000000 if value is not None else None
+
+
+def _group_facts_by_report(facts: Iterable[tuple]) -> dict[int, list]:
+    """(report_id, element_id, value, context_id)を報告書ごとにまとめる。"""
+    facts_by_report: dict[int, list] = defaultdict(list)
+    for report_id, element_id, value, context_id in facts:
+        facts_by_report[report_id].append((element_id, value, context_id))
+    return facts_by_report
+
+
+def _facts_from_dataframe(standarized_df: pd.DataFrame) -> list[tuple]:
+    """標準化済みDataFrameから、主要指標の(element_id, value, context_id)を取り出す。
+
+    DBに登録する前のデータから主要指標を求めるために利用します。
+    欠損値はDBから読み込んだ場合と同様にNoneとして扱います。
+    """
+    summary_df = standarized_df.loc[
+        standarized_df["element_id"].isin(_SUMMARY_ELEMENT_IDS),
+        ["element_id", "value", "context_id"],
+    ]
+    return [
+        (
+            element_id,
+            None if pd.isna(value) else value,
+            None if pd.isna(context_id) else context_id,
+        )
+        for element_id, value, context_id in summary_df.itertuples(
+            index=False, name=None
+        )
+    ]
+
+
+# report_metricsテーブルに保持する主要指標のカラム
+_REPORT_METRIC_COLUMNS = (
+    "net_sales",
+    "operating_income",
+    "ordinary_income",
+    "net_income",
+    "operation_profit_rate",
+    "ordinary_profit_rate",
+    "net_profit_rate",
+)
+
+
+def _resolve_report_metrics(data_map: dict) -> dict:
+    """{element_id: 値}から、売上高・各利益の値（円単位）と利益率を求める。
+
+    戻り値のキーは`report_metrics`テーブルのカラム名と一致します。
+    値が存在しない項目はNoneのまま扱います。
+    """
+    net_sales = _get_value_from_candidates(data_map, _SUMMARY_ITEMS["NetSales"])
+    operating_income = _get_value_from_candidates(
+        data_map, _SUMMARY_ITEMS["OperationIncome"]
+    )
+    ordinary_income = _get_value_from_candidates(
+        data_map, _SUMMARY_ITEMS["OrdinaryIncome"]
+    )
+    net_income = _get_value_from_candidates(data_map, _SUMMARY_ITEMS["Profit"])
+    return {
+        "net_sales": net_sales,
+        "operating_income": operating_income,
+        "ordinary_income": ordinary_income,
+        "net_income": net_income,
+        # 営業利益率・経常利益率・当期純利益率
+        "operation_profit_rate": _profit_rate(operating_income, net_sales),
+        "ordinary_profit_rate": _profit_rate(ordinary_income, net_sales),
+        "net_profit_rate": _profit_rate(net_income, net_sales),
+    }
+
+
+def _metrics_as_dict(report_metrics) -> dict:
+    """Report_metricsのオブジェクトを、`_resolve_report_metrics`と同じ形式の辞書に変換する。"""
+    return {
+        column: getattr(report_metrics, column) for column in _REPORT_METRIC_COLUMNS
+    }
+
+
+def _build_summary_dto(
+    company_name: str, financial_report: Financial_report, metrics: dict
+) -> FinancialSummaryDTO:
+    """財務報告と主要指標から、財務サマリーを作成する。
+
+    単一企業・複数企業のサマリーで共通に利用します。`metrics`は
+    `_resolve_report_metrics`の戻り値、またはreport_metricsテーブルの値です。
+    """
+    return FinancialSummaryDTO(
+        company_name=company_name,
+        period_name=f"{financial_report.fiscal_year} {financial_report.quarter_type}",
+        fiscal_year=int(financial_report.fiscal_year),
+        quarter_type=financial_report.quarter_type,
+        # 数字の桁を加工 100万円を基準に表示
+        net_sales=_to_million(metrics["net_sales"]),
+        operating_income=_to_million(metrics["operating_income"]),
+        ordinary_income=_to_million(metrics["ordinary_income"]),
+        net_income=_to_million(metrics["net_income"]),
+        operation_profit_rate=metrics["operation_profit_rate"],
+        ordinary_profit_rate=metrics["ordinary_profit_rate"],
+        net_profit_rate=metrics["net_profit_rate"],
+    )
+
+
 class FinancialService:
-    def __init__(self, uow: uow.UnitOfWork):
+    def __init__(self, uow: uow.UnitOfWork, metrics_sink: MetricsSink | None = None):
         self.uow = uow
-
-    def _get_value_from_candidates(
-        self, data_map: dict, condidates_list: list
-    ) -> int | None:
-        for conditate in condidates_list:
-            if conditate in data_map:
-                return data_map.get(conditate)
-        return None
+        # 取り込みのステージごとの処理時間・行数・SQL文の件数の送り先
+        self.metrics = MetricsRecorder(metrics_sink)
 
     def get_financial_summary(
         self, edinet_code: str
@@ -101,7 +350,7 @@ class FinancialService:
 
         Returns:
             企業が見つかった場合は、財務サマリー情報を含むFinancialSummaryDTO。
-            見つからない場合はNone。
+            企業または財務報告が見つからない場合はNone。
         """
         # 1.企業情報の取得
         # 2. 財務報告の特定　UIから選択された企業名をedinet_codeから取得
@@ -114,55 +363,193 @@ class FinancialService:
             financial_report = self.uow.financial_reports.find_latest_by_company_id(
                 company_info.company_id
             )
-            all_element_ids = [
-                element_id
-                for id_list in _SUMMARY_ITEMS.values()
-                for element_id in id_list
-            ]
-            financial_data = self.uow.financial_data.find_by_report_id_and_element_ids(
-                financial_report.report_id, all_element_ids
+            if financial_report is None:
+                return None
+
+            # 4. 報告書の主要指標（取り込み時に計算済み）を主キーで取得
+            report_metrics = self.uow.report_metrics.get(financial_report.report_id)
+            if report_metrics is not None:
+                metrics = _metrics_as_dict(report_metrics)
+            else:
+                # 主要指標が未作成の報告書は、主要財務データから計算する
+                facts = self.uow.financial_data.find_facts_by_report_id_and_element_ids(
+                    financial_report.report_id,
+                    _SUMMARY_ELEMENT_IDS,
+                    fiscal_year=int(financial_report.fiscal_year),
+                )
+                metrics = _resolve_report_metrics(_build_data_map(facts))
+            # 5. DTOマッピング
+            return _build_summary_dto(
+                company_info.company_name, financial_report, metrics
             )
 
-            # 4.DTOマッピング
-            data_map = {data.item.element_id: data.value for data in financial_data}
-
-            dto = FinancialSummaryDTO(
-                company_name=company_info.company_name,
-                period_name=f"{financial_report.fiscal_year} {financial_report.quarter_type}",
-                fiscal_year=int(financial_report.fiscal_year),
-                quarter_type=financial_report.quarter_type,
-                net_sales=self._get_value_from_candidates(
-                    data_map, _SUMMARY_ITEMS.get("NetSales")
-                ),
-                operating_income=self._get_value_from_candidates(
-                    data_map, _SUMMARY_ITEMS.get("OperationIncome")
-                ),
-                ordinary_income=self._get_value_from_candidates(
-                    data_map, _SUMMARY_ITEMS.get("OrdinaryIncome")
-                ),
-                net_income=self._get_value_from_candidates(
-                    data_map, _SUMMARY_ITEMS.get("Profit")
-                ),
-                operation_profit_rate=None,
-                ordinary_profit_rate=None,
-                net_profit_rate=None,
+    def get_financial_summaries(
+        self, edinet_codes: Iterable[str] | None = None
+    ) -> list[FinancialSummaryDTO]:
+        """複数企業の最新の財務サマリーを、企業数によらず一定数のクエリで生成する。
+
+        企業ごとの最新の財務報告をウィンドウ関数で1回のクエリで特定し、
+        それらの報告書の主要指標（report_metrics）を1回のクエリでまとめて取得します。
+        主要指標が未作成の報告書がある場合のみ、主要財務データを追加で取得します。
+        スクリーニング用の一覧表など、多数の企業を横断して表示する用途を想定しています。
+
+        Args:
+            edinet_codes: 対象企業のEDINETコード。Noneの場合は全企業。
+
+        Returns:
+            財務サマリーのリスト（EDINETコード順）。財務報告がない企業は含まない。
+        """
+        with self.uow:
+            latest_reports = self.uow.financial_reports.find_latest_with_company(
+                edinet_codes
             )
-        # 5. ビジネスロジック（利益率計算）の実行
-        # 営業利益率
-        if dto.operating_income and dto.net_sales and dto.net_sales != 0:
-            dto.operation_profit_rate = dto.operating_income / dto.net_sales * 100
-        # 経常利益率
-        if dto.ordinary_income and dto.net_sales and dto.net_sales != 0:
-            dto.ordinary_profit_rate = dto.ordinary_income / dto.net_sales * 100
-        # 当期純利益率
-        if dto.net_income and dto.net_sales and dto.net_sales != 0:
-            dto.net_profit_rate = dto.net_income / dto.net_sales * 100
-        # 数字の桁を加工 100万円を基準に表示
-        dto.net_sales = dto.net_sales / 1000000
-        dto.operating_income = dto.operating_income / 1000000
-        dto.ordinary_income = dto.ordinary_income / 1000000
-        dto.net_income = dto.net_income / 1000000
-        return dto
+            report_ids = [report.report_id for _, report in latest_reports]
+            metrics_by_report = {
+                report_id: _metrics_as_dict(report_metrics)
+                for report_id, report_metrics in (
+                    self.uow.report_metrics.find_by_report_ids(report_ids).items()
+                )
+            }
+            # 主要指標が未作成の報告書のみ、主要財務データから計算する
+            missing_reports = [
+                report
+                for _, report in latest_reports
+                if report.report_id not in metrics_by_report
+            ]
+            missing_report_ids = [report.report_id for report in missing_reports]
+            if missing_report_ids:
+                facts_by_report = _group_facts_by_report(
+                    self.uow.financial_data.find_facts_by_report_ids_and_element_ids(
+                        missing_report_ids,
+                        _SUMMARY_ELEMENT_IDS,
+                        fiscal_years={
+                            int(report.fiscal_year) for report in missing_reports
+                        },
+                    )
+                )
+                for report_id in missing_report_ids:
+                    metrics_by_report[report_id] = _resolve_report_metrics(
+                        _build_data_map(facts_by_report[report_id])
+                    )
+
+            return [
+                _build_summary_dto(
+                    company.company_name, report, metrics_by_report[report.report_id]
+                )
+                for company, report in latest_reports
+            ]
+
+    def get_financial_timeseries(
+        self,
+        edinet_code: str,
+        metrics: Iterable[str] | None = None,
+        consolidated: bool = True,
+    ) -> pd.DataFrame:
+        """企業の複数の財務項目の推移を、期間×項目の表として1回のクエリで取得する。
+
+        各項目の候補element_id（`_SUMMARY_ITEMS`）をまとめて取得し、報告書（期間）ごとに
+        当期の値を選んで横持ちに変換します。同じ期間の報告書が複数ある場合は、
+        最後に登録された報告書の値を採用します。
+
+        Args:
+            edinet_code: 企業のEDINETコード。
+            metrics: 項目名（`_SUMMARY_ITEMS`のキー。例: "NetSales", "OperationIncome"）。
+                Noneの場合は全項目。
+            consolidated: Trueの場合は連結、Falseの場合は個別の値を取得する。
+
+        Returns:
+            `period_name`、`fiscal_year_end`と各項目（100万円単位）をカラムに持つ
+            DataFrame。時系列順。データがない場合は空のDataFrame。
+
+        Raises:
+            ValueError: 未知の項目名が指定された場合。
+        """
+        metrics = list(metrics) if metrics is not None else list(_SUMMARY_ITEMS)
+        unknown_metrics = [metric for metric in metrics if metric not in _SUMMARY_ITEMS]
+        if unknown_metrics:
+            raise ValueError(f"未知の項目名が指定されました: {unknown_metrics}")
+        element_ids = [
+            element_id for metric in metrics for element_id in _SUMMARY_ITEMS[metric]
+        ]
+
+        with self.uow:
+            rows = self.uow.financial_data.find_series_by_edinet_code_and_element_ids(
+                edinet_code,
+                element_ids,
+                _CONSOLIDATED_TYPES if consolidated else _NON_CONSOLIDATED_TYPES,
+            )
+
+        # 期間ごとに、最後に登録された報告書の値のみを残す（行は時系列・登録順）
+        periods: dict[tuple, tuple[int, list]] = {}
+        for (
+            report_id,
+            fiscal_year,
+            quarter_type,
+            fiscal_year_end,
+            element_id,
+            value,
+            context_id,
+        ) in rows:
+            period = (fiscal_year, quarter_type, fiscal_year_end)
+            if period not in periods or periods[period][0] < report_id:
+                periods[period] = (report_id, [])
+            periods[period][1].append((element_id, value, context_id))
+
+        records = []
+        for (fiscal_year, quarter_type, fiscal_year_end), (_, facts) in periods.items():
+            data_map = _build_data_map(facts, consolidated)
+            record = {
+                "period_name": f"{fiscal_year} {quarter_type}",
+                "fiscal_year_end": fiscal_year_end,
+            }
+            for metric in metrics:
+                value = _get_value_from_candidates(data_map, _SUMMARY_ITEMS[metric])
+                record[metric] = (
+                    float(_to_million(value)) if value is not None else None
+                )
+            records.append(record)
+        timeseries_df = pd.DataFrame(
+            records, columns=["period_name", "fiscal_year_end", *metrics]
+        )
+        return timeseries_df.astype({metric: float for metric in metrics})
+
+    def rebuild_report_metrics(
+        self, missing_only: bool = False, batch_size: int = 500
+    ) -> int:
+        """登録済みの主要財務データから、報告書ごとの主要指標を再構築する。
+
+        主要指標テーブルの導入前に取り込んだデータの移行や、`_SUMMARY_ITEMS`の
+        候補を変更した後の再計算に利用します。報告書を`batch_size`件ずつ
+        1トランザクションで処理するため、途中で失敗しても処理済みの分は残ります。
+
+        Args:
+            missing_only: Trueの場合は、主要指標が未作成の報告書のみを対象にする。
+            batch_size: 1トランザクションで処理する報告書の件数。
+
+        Returns:
+            主要指標を作成・更新した報告書の件数。
+        """
+        with self.uow:
+            report_ids = self.uow.report_metrics.find_report_ids(missing_only)
+
+        for start in range(0, len(report_ids), batch_size):
+            batch_report_ids = report_ids[start : start + batch_size]
+            with self.uow:
+                facts_by_report = _group_facts_by_report(
+                    self.uow.financial_data.find_facts_by_report_ids_and_element_ids(
+                        batch_report_ids, _SUMMARY_ELEMENT_IDS
+                    )
+                )
+                # 報告書ごとに既存の行を取得せず、バッチ単位で一括登録する
+                self.uow.report_metrics.save_many(
+                    {
+                        report_id: _resolve_report_metrics(
+                            _build_data_map(facts_by_report[report_id])
+                        )
+                        for report_id in batch_report_ids
+                    }
+                )
+        return len(report_ids)
 
     def get_company_selection_list(self) -> List[Tuple[str, str]]:
         """UIに企業名セレクションリストを渡すために担当リポジトリクラスに依頼するメソッド"""
@@ -174,13 +561,111 @@ class FinancialService:
             )
         return company_selection_list
 
-    def save_financial_data_from_dataframe(self, df: pd.DataFrame, config: dict):
-        standarized_df = data_mapper.standardize_raw_data(df)
-        # 1. data_mapperを呼び出し変数に格納する
-        model_data_bundle = data_mapper.map_data_to_models(standarized_df, config)
+    def get_data_version(self) -> str:
+        """DBのデータの版を表すトークンを返す。取り込みが成功するたびに値が変わる。
+
+        UIで読み取り結果をキャッシュする際のキーに含め、取り込み後に古い結果を
+        表示しないようにするために利用します。
+        """
+        with self.uow:
+            return self.uow.ingestion_ledger.get_version_token()
+
+    def find_ingested_doc_ids(self, doc_ids: Iterable[str]) -> set[str]:
+        """指定したdocIDのうち、取り込み台帳で取り込み成功済みのものを返す。"""
+        with self.uow:
+            return self.uow.ingestion_ledger.find_succeeded_doc_ids(doc_ids)
+
+    def find_ingested_sources(
+        self, sources: Iterable[IngestionSource]
+    ) -> set[tuple[str, str]]:
+        """指定した入力のうち、同じ(docID, ファイルハッシュ)で取り込み成功済みのキーを返す。"""
+        with self.uow:
+            return self.uow.ingestion_ledger.find_succeeded_keys(
+                (source.doc_id, source.file_hash) for source in sources
+            )
+
+    def record_ingestion_failure(self, source: IngestionSource, error: str) -> None:
+        """取り込みに失敗した入力を台帳に記録する。次回の実行で再取り込みの対象になる。"""
+        with self.uow:
+            self.uow.ingestion_ledger.record(
+                source.doc_id,
+                source.file_hash,
+                source_path=source.source_path,
+                status=INGESTION_FAILED,
+                row_count=None,
+                fact_count=None,
+                elapsed_ms=source.elapsed_ms,
+                error_message=error,
+            )
+
+    def save_financial_data_from_dataframe(
+        self,
+        df: pd.DataFrame,
+        config: dict,
+        source: IngestionSource | None = None,
+        staging_store: StagingStore | None = None,
+    ) -> int:
+        """CSVから読み込んだ生のDataFrameを標準化・マッピングし、DBに永続化する。
+
+        標準化・マッピング・DB登録の各ステージの処理時間、行数、SQL文の件数は
+        コンストラクタで指定した`metrics_sink`に送られます。
+
+        Args:
+            df: EDINETのCSVから読み込んだ生のDataFrame。
+            config: `config.toml`の内容。
+            source: 取り込み台帳に記録する取り込み元。Noneの場合は記録しない。
+            staging_store: 標準化済みDataFrameを`source.file_hash`をキーに保存・
+                再利用するストア。Noneの場合は毎回標準化する。
+
+        Returns:
+            登録した財務データ(Financial_data)の件数。
+
+        Raises:
+            ValueError: DataFrameが空の場合。
+        """
+        # 1. data_mapperで標準化・マッピングする
+        prepared = prepare_financial_data(
+            df,
+            config,
+            self.metrics,
+            doc_id=source.doc_id if source is not None else None,
+            staging_store=staging_store,
+            file_hash=source.file_hash if source is not None else None,
+        )
+        if prepared is None:
+            raise ValueError("取り込むデータがありません")
+        standarized_df, model_data_bundle = prepared
+        return self.save_mapped_financial_data(
+            standarized_df, model_data_bundle, source
+        )
+
+    def save_mapped_financial_data(
+        self,
+        standarized_df: pd.DataFrame,
+        model_data_bundle: dict,
+        source: IngestionSource | None = None,
+    ) -> int:
+        """標準化・マッピング済みのデータを1トランザクションでDBに永続化する。
+
+        標準化とマッピングを別プロセスで行い、DB書き込みのみを本メソッドに
+        任せる場合に利用します。`source`を指定した場合は、同じトランザクションで
+        取り込み台帳に成功を記録するため、データと台帳が食い違うことはありません。
+        企業・会計年度・四半期が一致する報告書が登録済みの場合は、報告書を更新し、
+        その財務データを今回の内容で置き換えます。
+
+        Args:
+            standarized_df: `data_mapper.standardize_raw_data`で標準化済みのDataFrame。
+            model_data_bundle: `data_mapper.map_data_to_models`の戻り値。
+            source: 取り込み台帳に記録する取り込み元。Noneの場合は記録しない。
+
+        Returns:
+            登録した財務データ(Financial_data)の件数。
+        """
+        doc_id = source.doc_id if source is not None else None
         # 2. unit of workを呼び出し、トランザクションの開始
         with self.uow:
             # 3. Companyオブジェクトに辞書を保存、テーブルにデータを登録
+            company_stage = self.metrics.begin("company_upsert", rows=1, doc_id=doc_id)
             company_data = model_data_bundle["company"]
             company = self.uow.companies.find_by_edinet_code(
                 company_data["edinet_code"]
@@ -205,36 +690,68 @@ class FinancialService:
                 self.uow.companies.add(company)
             self.uow.session.flush()
             company_id = company.company_id
+            company_stage.end()
 
-            # 4. Financial_itemのリストの存在チェックと登録処理
-            for financial_item in model_data_bundle["items"]:
-                if (
-                    self.uow.financial_items.find_by_element_id(
-                        financial_item["element_id"]
-                    )
-                    is None
-                ):
-                    financial_item_data = Financial_item(**financial_item)
-                    self.uow.financial_items.add(financial_item_data)
-            self.uow.session.flush()
-            # 5. Financial_itemからelement_idとitem_idのリストを作成してマッピング
-            element_ids = [item["element_id"] for item in model_data_bundle["items"]]
-            financial_items = self.uow.financial_items.find_by_element_ids(element_ids)
-            item_id_map = {
-                financial_item.element_id: financial_item.item_id
-                for financial_item in financial_items
-            }
+            # 4. Financial_itemを一括登録し、element_idとitem_idの対応を取得
+            items = model_data_bundle["items"]
+            with self.metrics.stage("item_resolution", len(items), doc_id):
+                item_id_map = self.uow.financial_items.bulk_get_or_create(items)
 
-            # 6. Financial_reportの登録
-            model_data_bundle["report"].update({"company_id": company_id})
-            financial_report = Financial_report(**model_data_bundle["report"])
-            financial_report = self.uow.financial_reports.upsert(financial_report)
-            self.uow.session.flush()
-            # 7. Financial_dataをマッピングするため、data_mapperを呼び出し、対応メソッドを実行
-            financial_data_map = data_mapper.financial_data_mapping(
-                standarized_df, financial_report.report_id, item_id_map
-            )
-            # 8. Financial_dataにループ処理して登録処理
-            for register_data_dict in financial_data_map:
-                financial_data = Financial_data(**register_data_dict)
-                self.uow.financial_data.add(financial_data)
+            # 4-2. コンテキストを一括登録し、自然キーとcontext_keyの対応を取得
+            contexts = model_data_bundle["contexts"]
+            with self.metrics.stage("context_resolution", len(contexts), doc_id):
+                context_key_map = self.uow.contexts.bulk_get_or_create(contexts)
+
+            # 5. Financial_reportの登録
+            with self.metrics.stage("report_upsert", 1, doc_id):
+                model_data_bundle["report"].update({"company_id": company_id})
+                financial_report = Financial_report(**model_data_bundle["report"])
+                financial_report, created = (
+                    self.uow.financial_reports.upsert_by_natural_key(financial_report)
+                )
+                self.uow.session.flush()
+                # 同じ報告書の再取り込み（訂正・ファイルの更新）では、財務データを置き換える
+                if not created:
+                    self.uow.financial_data.delete_by_report_id(
+                        financial_report.report_id,
+                        fiscal_year=int(financial_report.fiscal_year),
+                    )
+            # 6. Financial_dataをマッピングするため、data_mapperを呼び出し、対応メソッドを実行
+            with self.metrics.stage("fact_mapping", doc_id=doc_id) as stage:
+                financial_data_frame = data_mapper.financial_data_columnar_mapping(
+                    standarized_df,
+                    financial_report.report_id,
+                    item_id_map,
+                    fiscal_year=int(financial_report.fiscal_year),
+                    context_key_map=context_key_map,
+                )
+                stage.rows = len(financial_data_frame)
+            # 7. Financial_dataを一括登録（PostgreSQLではCOPYを利用）
+            with self.metrics.stage("fact_load", doc_id=doc_id) as stage:
+                fact_count = self.uow.financial_data.bulk_load(financial_data_frame)
+                stage.rows = fact_count
+            # 8. 主要指標を計算し、財務データと同じトランザクションで登録
+            with self.metrics.stage("report_metrics", 1, doc_id):
+                self.uow.report_metrics.save(
+                    financial_report.report_id,
+                    **_resolve_report_metrics(
+                        _build_data_map(_facts_from_dataframe(standarized_df))
+                    ),
+                )
+            # 9. 取り込み台帳に成功を記録
+            if source is not None:
+                with self.metrics.stage("ledger", 1, doc_id):
+                    self.uow.ingestion_ledger.record(
+                        source.doc_id,
+                        source.file_hash,
+                        source_path=source.source_path,
+                        status=INGESTION_SUCCEEDED,
+                        row_count=len(standarized_df),
+                        fact_count=fact_count,
+                        elapsed_ms=source.elapsed_ms,
+                        error_message=None,
+                    )
+            # uowを抜ける際のコミットまでを計測する
+            commit_stage = self.metrics.begin("commit", fact_count, doc_id)
+        commit_stage.end()
+        return fact_count
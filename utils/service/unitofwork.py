@@ -16,9 +16,13 @@ from typing import Optional, Type
 from sqlalchemy.orm import sessionmaker
 
 from utils.repositories.company_repository import CompanyRepository
+from utils.repositories.context_repository import ContextRepository
 from utils.repositories.financial_data_repository import FinancialDataRepository
 from utils.repositories.financial_item_repository import FinancialItemRepository
 from utils.repositories.financial_report_repository import FinancialReportRepository
+from utils.repositories.ingestion_ledger_repository import IngestionLedgerRepository
+from utils.repositories.item_id_cache import ItemIdCache, shared_item_id_cache
+from utils.repositories.report_metrics_repository import ReportMetricsRepository
 
 
 class UnitOfWork(ABC):
@@ -34,6 +38,9 @@ class UnitOfWork(ABC):
         financial_items(FinancialItemRepository): FinancialItemモデルを扱うリポジトリ
         financial_reports(FinancialReportRepository): FinancialReportモデルを扱うリポジトリ
         financial_data(FinancialDataRepository): FinancialDataモデルを扱うリポジトリ
+        ingestion_ledger(IngestionLedgerRepository): 取り込み台帳を扱うリポジトリ
+        report_metrics(ReportMetricsRepository): 報告書ごとの主要指標を扱うリポジトリ
+        contexts(ContextRepository): コンテキストの次元テーブルを扱うリポジトリ
 
     Example:
         with ConcreteUnitOfWork(session_factory) as uow:
@@ -85,20 +92,57 @@ class UnitOfWork(ABC):
     ) -> FinancialDataRepository:
         pass
 
+    @property
+    @abstractmethod
+    def ingestion_ledger(
+        self,
+    ) -> IngestionLedgerRepository:
+        pass
+
+    @property
+    @abstractmethod
+    def report_metrics(
+        self,
+    ) -> ReportMetricsRepository:
+        pass
+
+    @property
+    @abstractmethod
+    def contexts(
+        self,
+    ) -> ContextRepository:
+        pass
+
 
 class SqlAlchemyUnitOfWork(UnitOfWork):
-    """SQLAlchemyを用いたUnit of Workの具体的実装"""
+    """SQLAlchemyを用いたUnit of Workの具体的実装
 
-    def __init__(self, session_factory: sessionmaker):
+    Args:
+        session_factory (sessionmaker): SQLAlchemyのsessionmakerインスタンス
+        item_id_cache (ItemIdCache, optional): 財務項目のelement_id -> item_id
+            キャッシュ。省略時はプロセス全体で共有されるキャッシュを使用する。
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker, item_id_cache: ItemIdCache | None = None
+    ):
         super().__init__(session_factory)
+        self.item_id_cache = (
+            item_id_cache if item_id_cache is not None else shared_item_id_cache
+        )
 
     def __enter__(self) -> "SqlAlchemyUnitOfWork":
         """セッションを開始し、そのセッションを使ってリポジトリ群を初期化・準備すること"""
         self.session = self.session_factory()
         self._companies = CompanyRepository(self.session)
-        self._financial_items = FinancialItemRepository(self.session)
+        self._financial_items = FinancialItemRepository(
+            self.session, self.item_id_cache
+        )
         self._financial_reports = FinancialReportRepository(self.session)
         self._financial_data = FinancialDataRepository(self.session)
+        self._ingestion_ledger = IngestionLedgerRepository(self.session)
+        self._report_metrics = ReportMetricsRepository(self.session)
+        self._contexts = ContextRepository(self.session)
         return self
 
     @property
@@ -117,13 +161,30 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
     def financial_data(self) -> FinancialDataRepository:
         return self._financial_data
 
+    @property
+    def ingestion_ledger(self) -> IngestionLedgerRepository:
+        return self._ingestion_ledger
+
+    @property
+    def report_metrics(self) -> ReportMetricsRepository:
+        return self._report_metrics
+
+    @property
+    def contexts(self) -> ContextRepository:
+        return self._contexts
+
     def __exit__(
         self,
         execution_type: Optional[Type[BaseException]],
         execution_value: Optional[BaseException],
         traceback: Optional[TracebackType],
     ):
-        """トランザクションのコミットまたはロールバックを行い、セッションを閉じること"""
+        """トランザクションのコミットまたはロールバックを行い、セッションを閉じること
+
+        コミットに成功した場合のみ、トランザクション内で新たに解決した財務項目を
+        キャッシュに反映する。ロールバック時は、キャッシュが不整合の原因である
+        可能性を考慮してキャッシュを破棄し、次回はDBから再読み込みさせる。
+        """
 
         if execution_type is None:
             try:
@@ -136,8 +197,11 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
                     traceback,
                 )
                 self.session.rollback()
+                self.item_id_cache.invalidate()
                 raise
+            self.item_id_cache.update(self._financial_items.pending_item_ids)
         else:
             self.session.rollback()
+            self.item_id_cache.invalidate()
 
         self.session.close()
@@ -0,0 +1,106 @@
+"""
+標準化済みのXBRL DataFrameをParquet形式で保存・再利用するステージング層。
+
+`data_mapper.standardize_raw_data`の出力を、入力CSVの内容のハッシュをキーとして
+Parquetに保存します。同じ内容のCSVを再度取り込む際は、文字コード判定・UTF-16の
+デコード・値の数値変換を行わずに、保存済みのParquetを読み込むだけで済みます。
+
+Parquetはzstdで圧縮し、要素IDやコンテキストIDなど繰り返しの多い文字列カラムは
+辞書エンコーディングで保存するため、元のUTF-16のCSVより大幅に小さくなります。
+
+Example:
+    store = StagingStore("download/staging")
+    standardized_df = store.load(file_hash)
+    if standardized_df is None:
+        standardized_df = data_mapper.standardize_raw_data(company_df)
+        store.save(file_hash, standardized_df)
+"""
+
+import logging
+import os
+import tempfile
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class StagingStore:
+    """入力CSVのハッシュをキーに、標準化済みDataFrameをParquetで保存するストア。
+
+    Args:
+        staging_dir (str): Parquetを保存するディレクトリ。
+        compression (str, optional): Parquetの圧縮方式。既定値はzstd。
+    """
+
+    def __init__(self, staging_dir: str, compression: str = "zstd"):
+        self.staging_dir = staging_dir
+        self.compression = compression
+
+    def path_for(self, file_hash: str) -> str:
+        """ハッシュに対応するParquetのパスを返す。"""
+        return os.path.join(self.staging_dir, file_hash[:2], f"{file_hash}.parquet")
+
+    def exists(self, file_hash: str) -> bool:
+        return os.path.exists(self.path_for(file_hash))
+
+    def load(self, file_hash: str) -> pd.DataFrame | None:
+        """保存済みの標準化済みDataFrameを読み込む。
+
+        Args:
+            file_hash (str): 入力CSVのSHA-256ハッシュ。
+
+        Returns:
+            pd.DataFrame | None: 標準化済みのDataFrame。未保存または読み込めない場合はNone。
+        """
+        path = self.path_for(file_hash)
+        if not os.path.exists(path):
+            return None
+        try:
+            standardized_df = pd.read_parquet(path)
+        except (OSError, ValueError) as e:
+            # 破損したファイルはpyarrowのArrowInvalid（ValueErrorのサブクラス）になる
+            logger.warning(
+                "ステージングファイルを読み込めませんでした(%s): %s", path, e
+            )
+            return None
+        logger.info("ステージングファイルを読み込みました: %s", path)
+        return standardized_df
+
+    def save(self, file_hash: str, standardized_df: pd.DataFrame) -> str:
+        """標準化済みDataFrameをParquetで保存する。
+
+        書きかけのファイルを読み込まないよう、一時ファイルに書き込んでから置き換えます。
+
+        Args:
+            file_hash (str): 入力CSVのSHA-256ハッシュ。
+            standardized_df (pd.DataFrame): `standardize_raw_data`で標準化済みのDataFrame。
+
+        Returns:
+            str: 保存したParquetのパス。
+        """
+        path = self.path_for(file_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 文字列カラムのみ辞書エンコーディングを指定する（数値カラムは効果が薄いため）
+        string_columns = [
+            column
+            for column in standardized_df.columns
+            if pd.api.types.is_object_dtype(standardized_df[column])
+            or pd.api.types.is_string_dtype(standardized_df[column])
+        ]
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            standardized_df.to_parquet(
+                temp_path,
+                engine="pyarrow",
+                compression=self.compression,
+                index=False,
+                use_dictionary=string_columns,
+            )
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        logger.info("ステージングファイルを保存しました: %s", path)
+        return path